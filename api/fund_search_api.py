@@ -5,83 +5,53 @@
 提供前端搜索功能，支持多关键字查询
 """
 
-import json
-import os
 from flask import Blueprint, request, jsonify
+from core.fund_dataset import get_fund_dataset, start_fund_dataset_watcher
 
 fund_search_bp = Blueprint('fund_search', __name__)
 
-# 全局缓存基金信息
-FUND_DICT = None
+# 蓝图注册时启动基金信息热加载线程，基金信息更新后无需重启服务
+fund_search_bp.record_once(lambda state: start_fund_dataset_watcher())
 
 def load_fund_info():
     """
     加载基金信息缓存
     
     Returns:
-        dict: 基金信息字典
+        dict: 基金信息字典（当前数据集快照）
     """
-    global FUND_DICT
-    if FUND_DICT is not None:
-        return FUND_DICT
-    
-    try:
-        json_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            FUND_DICT = json.load(f)
-        print(f"成功加载 {len(FUND_DICT)} 只基金信息")
-        return FUND_DICT
-    except Exception as e:
-        print(f"加载基金信息失败: {e}")
+    dataset = get_fund_dataset()
+    if not dataset:
         return None
+    return dataset.fund_dict
 
-def search_funds(keyword):
+def search_funds(keyword, limit=None):
     """
     多关键字搜索基金
     
+    关键字按空白分隔，所有关键字都需匹配基金代码、简称或拼音缩写之一，
+    例如 "易方达 消费"、"yfd xf"
+    
     Args:
         keyword (str): 搜索关键字（基金代码、简称、拼音缩写）
+        limit (int): 最多返回的条数，默认不限制
         
     Returns:
         list: 匹配的基金列表
     """
-    fund_dict = load_fund_info()
-    if fund_dict is None:
+    dataset = get_fund_dataset()
+    if not dataset:
         return []
     
     results = []
-    keyword_lower = keyword.lower()
-    
-    for fund_code, fund_info in fund_dict.items():
-        # 检查基金代码
-        if keyword_lower in fund_code.lower():
-            results.append({
-                'code': fund_code,
-                'name': fund_info['名称'],
-                'pinyin': fund_info['拼音缩写'],
-                'type': fund_info['类型']
-            })
-            continue
-        
-        # 检查基金简称
-        if keyword_lower in fund_info['名称'].lower():
-            results.append({
-                'code': fund_code,
-                'name': fund_info['名称'],
-                'pinyin': fund_info['拼音缩写'],
-                'type': fund_info['类型']
-            })
-            continue
-        
-        # 检查拼音缩写
-        if keyword_lower in fund_info['拼音缩写'].lower():
-            results.append({
-                'code': fund_code,
-                'name': fund_info['名称'],
-                'pinyin': fund_info['拼音缩写'],
-                'type': fund_info['类型']
-            })
-            continue
+    for fund_code in dataset.search(keyword, limit=limit):
+        fund_info = dataset.get(fund_code)
+        results.append({
+            'code': fund_code,
+            'name': fund_info['名称'],
+            'pinyin': fund_info['拼音缩写'],
+            'type': fund_info['类型']
+        })
     
     return results
 
@@ -106,6 +76,39 @@ def api_search_funds():
         'results': results
     })
 
+# 自动补全默认/最大返回条数
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 20
+
+@fund_search_bp.route('/api/suggest', methods=['GET'])
+def api_suggest_funds():
+    """
+    基金自动补全API接口（精简返回格式）
+    
+    Query Parameters:
+        q (str): 搜索关键字
+        n (int): 返回条数，默认10，最多20
+        
+    Returns:
+        json: {"q": 关键字, "r": [[代码, 名称], ...]}
+    """
+    keyword = request.args.get('q', '').strip()
+    limit = request.args.get('n', SUGGEST_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+    
+    suggestions = []
+    dataset = get_fund_dataset()
+    if keyword and dataset:
+        suggestions = [
+            [fund_code, dataset.get_name(fund_code)]
+            for fund_code in dataset.search(keyword, limit=limit)
+        ]
+    
+    response = jsonify({'q': keyword, 'r': suggestions})
+    # 基金列表变化很慢，允许浏览器短时间缓存相同关键字的结果
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
 if __name__ == "__main__":
     # 测试API
     from flask import Flask
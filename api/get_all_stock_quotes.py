@@ -3,12 +3,25 @@
 支持腾讯证券、新浪财经、网易财经、雪球接口
 """
 
+import logging
 import requests
 import pandas as pd
 from datetime import datetime
 import random
+import threading
 import time
 
+try:
+    from core.log import get_logger
+    from core.metrics import observe
+    logger = get_logger(__name__)
+except ImportError:
+    # 作为独立脚本运行时不记录指标，日志使用标准 logging
+    logger = logging.getLogger(__name__)
+
+    def observe(stage, seconds, status='ok', **labels):
+        pass
+
 
 # User-Agent池，模拟不同浏览器
 USER_AGENTS = [
@@ -60,6 +73,73 @@ def random_delay(min_delay=0.1, max_delay=0.5):
     time.sleep(random.uniform(min_delay, max_delay))
 
 
+def to_tencent_symbol(code):
+    """
+    将股票代码转换为腾讯证券接口的代码格式
+
+    Parameters:
+    -----------
+    code : str
+        股票代码，如 '600519'、'00700'
+
+    Returns:
+    --------
+    str
+        带市场前缀的代码，如 'sh600519'、'hk00700'
+    """
+    if len(code) == 5 and code.startswith('0'):  # 港股
+        return f"hk{code}"
+    elif code.startswith('60') or code.startswith('90') or code.startswith('68'):  # 上海A股
+        return f"sh{code}"
+    elif code.startswith('8') or code.startswith('9'):  # 北交所股票
+        return f"bj{code}"
+    else:  # 深圳A股
+        return f"sz{code}"
+
+
+def format_tencent_quote(row):
+    """
+    将腾讯证券接口解析出的单只股票数据转换为统一的行情格式
+
+    Parameters:
+    -----------
+    row : dict or pd.Series
+        TencentRealtime._parse_line 返回的数据
+
+    Returns:
+    --------
+    dict
+        包含 代码、名称、最新价、涨跌、涨跌幅、时间、成交量、成交额 的行情数据
+    """
+    change_pct_str = row['change_pct']
+    if change_pct_str:
+        try:
+            change_pct = float(change_pct_str)
+        except:
+            change_pct = 0.0
+    else:
+        change_pct = 0.0
+
+    time_str = row['time']
+    if len(time_str) == 14 and time_str.isdigit():
+        try:
+            dt = datetime.strptime(time_str, '%Y%m%d%H%M%S')
+            time_str = dt.strftime('%Y/%m/%d %H:%M:%S')
+        except:
+            pass
+
+    return {
+        '代码': row['code'],
+        '名称': row['name'],
+        '最新价': row['current'],
+        '涨跌': row['change'],
+        '涨跌幅': f"{change_pct:.2f}%",
+        '时间': time_str,
+        '成交量': row['volume'],
+        '成交额': row['turnover']
+    }
+
+
 class TencentRealtime:
     """腾讯证券实时行情接口（支持港股和A股）"""
     
@@ -90,16 +170,7 @@ class TencentRealtime:
             return pd.DataFrame()
         
         # 一次性请求所有股票
-        symbols = []
-        for code in codes:
-            if len(code) == 5 and code.startswith('0'):  # 港股
-                symbols.append(f"hk{code}")
-            elif code.startswith('60') or code.startswith('90') or code.startswith('68'):  # 上海A股
-                symbols.append(f"sh{code}")
-            elif code.startswith('8') or code.startswith('9'):  # 北交所股票
-                symbols.append(f"bj{code}")
-            else:  # 深圳A股
-                symbols.append(f"sz{code}")
+        symbols = [to_tencent_symbol(code) for code in codes]
         
         query_str = ','.join(symbols)
         url = f"{self.base_url}{query_str}"
@@ -123,7 +194,7 @@ class TencentRealtime:
                         all_data.append(stock_data)
                     
         except Exception as e:
-            print(f"腾讯证券批量获取失败: {e}")
+            logger.warning("腾讯证券批量获取失败: %s", e)
         
         return pd.DataFrame(all_data) if all_data else pd.DataFrame()
     
@@ -242,7 +313,7 @@ class SinaRealtime:
                         all_data.append(stock_data)
                     
         except Exception as e:
-            print(f"新浪财经批量获取失败: {e}")
+            logger.warning("新浪财经批量获取失败: %s", e)
         
         return pd.DataFrame(all_data) if all_data else pd.DataFrame()
     
@@ -389,7 +460,7 @@ class NetEaseRealtime:
                             })
                     
         except Exception as e:
-            print(f"网易财经批量获取失败: {e}")
+            logger.warning("网易财经批量获取失败: %s", e)
         
         return pd.DataFrame(all_data) if all_data else pd.DataFrame()
     
@@ -496,7 +567,7 @@ class XueqiuRealtime:
                         })
                     
         except Exception as e:
-            print(f"雪球批量获取失败: {e}")
+            logger.warning("雪球批量获取失败: %s", e)
         
         return pd.DataFrame(all_data) if all_data else pd.DataFrame()
     
@@ -519,6 +590,84 @@ class XueqiuRealtime:
             return 0
 
 
+# 共享的行情接口实例（复用 requests.Session 连接池，避免每次请求重新建立连接）
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(provider_cls):
+    """
+    获取共享的行情接口实例
+
+    Parameters:
+    -----------
+    provider_cls : type
+        行情接口类，如 TencentRealtime
+
+    Returns:
+    --------
+    object
+        行情接口实例（进程内单例）
+    """
+    provider = _providers.get(provider_cls)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(provider_cls)
+            if provider is None:
+                provider = provider_cls()
+                _providers[provider_cls] = provider
+    return provider
+
+
+def warm_up_providers(sample_codes=('600519', '000858', '00700')):
+    """
+    预热行情接口：创建共享实例并发起一次小批量请求，提前建立连接
+
+    Parameters:
+    -----------
+    sample_codes : tuple
+        预热时请求的股票代码
+
+    Returns:
+    --------
+    bool
+        主接口（腾讯证券）是否返回了数据
+    """
+    for provider_cls in (TencentRealtime, SinaRealtime, NetEaseRealtime, XueqiuRealtime):
+        get_provider(provider_cls)
+    df = get_provider(TencentRealtime).get_multiple_stocks(list(sample_codes))
+    return not df.empty
+
+
+def fetch_from_provider(provider, name, stock_codes):
+    """
+    通过单个行情接口批量获取行情，并记录接口耗时
+    （各接口内部捕获异常后返回空表，因此抛出异常或未获取到任何数据时都记为 status="error"）
+
+    Parameters:
+    -----------
+    provider : object
+        行情接口实例（提供 get_multiple_stocks）
+    name : str
+        接口名称，作为 provider 标签
+    stock_codes : list
+        股票代码列表
+
+    Returns:
+    --------
+    pd.DataFrame
+        接口返回的行情数据
+    """
+    start = time.perf_counter()
+    df = None
+    try:
+        df = provider.get_multiple_stocks(stock_codes)
+        return df
+    finally:
+        status = 'ok' if df is not None and not df.empty else 'error'
+        observe('quote_provider', time.perf_counter() - start, status=status, provider=name)
+
+
 def get_all_stock_quotes(stock_codes, timeout=10):
     """
     获取混合股票实时行情（支持港股和A股）
@@ -537,67 +686,41 @@ def get_all_stock_quotes(stock_codes, timeout=10):
     pd.DataFrame
         股票实时行情数据
     """
-    print(f"正在获取 {len(stock_codes)} 只股票的实时行情...")
+    logger.debug("正在获取 %s 只股票的实时行情...", len(stock_codes))
     
     if ENABLE_PROXY and PROXY_POOL:
-        print(f"代理池已启用，共 {len(PROXY_POOL)} 个代理")
+        logger.debug("代理池已启用，共 %s 个代理", len(PROXY_POOL))
     
     all_results = []
     remaining_codes = stock_codes.copy()
     
     # 方法1: 腾讯证券
-    print("尝试腾讯证券接口...")
+    logger.debug("尝试腾讯证券接口...")
     try:
-        realtime = TencentRealtime()
-        df = realtime.get_multiple_stocks(remaining_codes)
+        realtime = get_provider(TencentRealtime)
+        df = fetch_from_provider(realtime, 'tencent', remaining_codes)
         
         if not df.empty:
             # 转换为统一格式
             for _, row in df.iterrows():
-                change_pct_str = row['change_pct']
-                if change_pct_str:
-                    try:
-                        change_pct = float(change_pct_str)
-                    except:
-                        change_pct = 0.0
-                else:
-                    change_pct = 0.0
-                
-                time_str = row['time']
-                if len(time_str) == 14 and time_str.isdigit():
-                    try:
-                        dt = datetime.strptime(time_str, '%Y%m%d%H%M%S')
-                        time_str = dt.strftime('%Y/%m/%d %H:%M:%S')
-                    except:
-                        pass
-                
-                all_results.append({
-                    '代码': row['code'],
-                    '名称': row['name'],
-                    '最新价': row['current'],
-                    '涨跌': row['change'],
-                    '涨跌幅': f"{change_pct:.2f}%",
-                    '时间': time_str,
-                    '成交量': row['volume'],
-                    '成交额': row['turnover']
-                })
+                all_results.append(format_tencent_quote(row))
             
             # 更新剩余未查询到的代码
             found_codes = set(row['code'] for _, row in df.iterrows())
             remaining_codes = [code for code in remaining_codes if code not in found_codes]
-            print(f"腾讯证券成功: 获取 {len(found_codes)}/{len(stock_codes)} 只股票行情")
+            logger.debug("腾讯证券成功: 获取 %s/%s 只股票行情", len(found_codes), len(stock_codes))
         else:
-            print("腾讯证券: 未获取到股票数据")
+            logger.debug("腾讯证券: 未获取到股票数据")
                 
     except Exception as e:
-        print(f"腾讯证券接口失败: {e}")
+        logger.warning("腾讯证券接口失败: %s", e)
     
     # 方法2: 新浪财经（查询剩余代码）
     if remaining_codes:
-        print(f"尝试新浪财经接口（剩余 {len(remaining_codes)} 只股票）...")
+        logger.debug("尝试新浪财经接口（剩余 %s 只股票）...", len(remaining_codes))
         try:
-            sina = SinaRealtime()
-            df = sina.get_multiple_stocks(remaining_codes)
+            sina = get_provider(SinaRealtime)
+            df = fetch_from_provider(sina, 'sina', remaining_codes)
             
             if not df.empty:
                 for _, row in df.iterrows():
@@ -620,19 +743,19 @@ def get_all_stock_quotes(stock_codes, timeout=10):
                 
                 found_codes = set(row['code'] for _, row in df.iterrows())
                 remaining_codes = [code for code in remaining_codes if code not in found_codes]
-                print(f"新浪财经成功: 获取 {len(found_codes)} 只股票行情")
+                logger.debug("新浪财经成功: 获取 %s 只股票行情", len(found_codes))
             else:
-                print("新浪财经: 未获取到股票数据")
+                logger.debug("新浪财经: 未获取到股票数据")
                 
         except Exception as e:
-            print(f"新浪财经接口失败: {e}")
+            logger.warning("新浪财经接口失败: %s", e)
     
     # 方法3: 网易财经（查询剩余代码）
     if remaining_codes:
-        print(f"尝试网易财经接口（剩余 {len(remaining_codes)} 只股票）...")
+        logger.debug("尝试网易财经接口（剩余 %s 只股票）...", len(remaining_codes))
         try:
-            netease = NetEaseRealtime()
-            df = netease.get_multiple_stocks(remaining_codes)
+            netease = get_provider(NetEaseRealtime)
+            df = fetch_from_provider(netease, 'netease', remaining_codes)
             
             if not df.empty:
                 for _, row in df.iterrows():
@@ -655,19 +778,19 @@ def get_all_stock_quotes(stock_codes, timeout=10):
                 
                 found_codes = set(row['code'] for _, row in df.iterrows())
                 remaining_codes = [code for code in remaining_codes if code not in found_codes]
-                print(f"网易财经成功: 获取 {len(found_codes)} 只股票行情")
+                logger.debug("网易财经成功: 获取 %s 只股票行情", len(found_codes))
             else:
-                print("网易财经: 未获取到股票数据")
+                logger.debug("网易财经: 未获取到股票数据")
                 
         except Exception as e:
-            print(f"网易财经接口失败: {e}")
+            logger.warning("网易财经接口失败: %s", e)
     
     # 方法4: 雪球（查询剩余代码）
     if remaining_codes:
-        print(f"尝试雪球接口（剩余 {len(remaining_codes)} 只股票）...")
+        logger.debug("尝试雪球接口（剩余 %s 只股票）...", len(remaining_codes))
         try:
-            xueqiu = XueqiuRealtime()
-            df = xueqiu.get_multiple_stocks(remaining_codes)
+            xueqiu = get_provider(XueqiuRealtime)
+            df = fetch_from_provider(xueqiu, 'xueqiu', remaining_codes)
             
             if not df.empty:
                 for _, row in df.iterrows():
@@ -690,22 +813,22 @@ def get_all_stock_quotes(stock_codes, timeout=10):
                 
                 found_codes = set(row['code'] for _, row in df.iterrows())
                 remaining_codes = [code for code in remaining_codes if code not in found_codes]
-                print(f"雪球成功: 获取 {len(found_codes)} 只股票行情")
+                logger.debug("雪球成功: 获取 %s 只股票行情", len(found_codes))
             else:
-                print("雪球: 未获取到股票数据")
+                logger.debug("雪球: 未获取到股票数据")
                 
         except Exception as e:
-            print(f"雪球接口失败: {e}")
+            logger.warning("雪球接口失败: %s", e)
     
     # 合并所有结果
     if all_results:
         result = pd.DataFrame(all_results)
-        print(f"\n总计成功获取 {len(result)}/{len(stock_codes)} 只股票行情")
+        logger.debug("总计成功获取 %s/%s 只股票行情", len(result), len(stock_codes))
         if remaining_codes:
-            print(f"未获取到的股票: {', '.join(remaining_codes)}")
+            logger.debug("未获取到的股票: %s", ', '.join(remaining_codes))
         return result
     else:
-        print("\n所有接口均未获取到股票数据")
+        logger.warning("所有接口均未获取到股票数据")
         return None
 
 
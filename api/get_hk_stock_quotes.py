@@ -3,11 +3,19 @@
 支持腾讯证券、新浪财经、网易财经等多个数据源
 """
 
+import logging
 import requests
 import pandas as pd
 import json
 from datetime import datetime
 
+try:
+    from core.log import get_logger
+    logger = get_logger(__name__)
+except ImportError:
+    # 作为独立脚本运行时使用标准 logging
+    logger = logging.getLogger(__name__)
+
 
 class HKTencentRealtime:
     """腾讯港股实时行情接口"""
@@ -51,7 +59,7 @@ class HKTencentRealtime:
                         all_data.append(stock_data)
                     
         except Exception as e:
-            print(f"批量获取失败: {e}")
+            logger.warning("批量获取失败: %s", e)
         
         return pd.DataFrame(all_data) if all_data else pd.DataFrame()
     
@@ -124,7 +132,7 @@ def get_hk_quotes_tencent(stock_codes, timeout=10):
     pd.DataFrame
         港股实时行情数据
     """
-    print(f"尝试腾讯证券接口获取港股行情...")
+    logger.debug("尝试腾讯证券接口获取港股行情...")
     
     try:
         hk_realtime = HKTencentRealtime()
@@ -158,14 +166,14 @@ def get_hk_quotes_tencent(stock_codes, timeout=10):
             
             result = pd.DataFrame(stock_list)
             matched_count = len(result)
-            print(f"腾讯证券成功: 获取 {matched_count}/{len(stock_codes)} 只港股行情")
+            logger.debug("腾讯证券成功: 获取 %s/%s 只港股行情", matched_count, len(stock_codes))
             return result
         else:
-            print("腾讯证券: 未获取到港股数据")
+            logger.debug("腾讯证券: 未获取到港股数据")
             return None
                 
     except Exception as e:
-        print(f"腾讯证券接口失败: {e}")
+        logger.warning("腾讯证券接口失败: %s", e)
         return None
 
 
@@ -185,7 +193,7 @@ def get_hk_quotes_sina(stock_codes, timeout=10):
     pd.DataFrame
         港股实时行情数据
     """
-    print(f"尝试新浪财经接口获取港股行情...")
+    logger.debug("尝试新浪财经接口获取港股行情...")
     stock_list = []
     
     try:
@@ -248,14 +256,14 @@ def get_hk_quotes_sina(stock_codes, timeout=10):
             if stock_list:
                 result = pd.DataFrame(stock_list)
                 matched_count = len(result)
-                print(f"新浪财经成功: 获取 {matched_count}/{len(stock_codes)} 只港股行情")
+                logger.debug("新浪财经成功: 获取 %s/%s 只港股行情", matched_count, len(stock_codes))
                 return result
             else:
-                print("新浪财经: 未获取到港股数据")
+                logger.debug("新浪财经: 未获取到港股数据")
                 return None
                 
     except Exception as e:
-        print(f"新浪财经接口失败: {e}")
+        logger.warning("新浪财经接口失败: %s", e)
         return None
 
 
@@ -275,7 +283,7 @@ def get_hk_quotes_163(stock_codes, timeout=10):
     pd.DataFrame
         港股实时行情数据
     """
-    print(f"尝试网易财经接口获取港股行情...")
+    logger.debug("尝试网易财经接口获取港股行情...")
     stock_list = []
     
     try:
@@ -332,21 +340,21 @@ def get_hk_quotes_163(stock_codes, timeout=10):
                 if stock_list:
                     result = pd.DataFrame(stock_list)
                     matched_count = len(result)
-                    print(f"网易财经成功: 获取 {matched_count}/{len(stock_codes)} 只港股行情")
+                    logger.debug("网易财经成功: 获取 %s/%s 只港股行情", matched_count, len(stock_codes))
                     return result
                 else:
-                    print("网易财经: 未获取到港股数据")
+                    logger.debug("网易财经: 未获取到港股数据")
                     return None
                     
             except Exception as e:
-                print(f"网易财经数据解析失败: {e}")
+                logger.warning("网易财经数据解析失败: %s", e)
                 return None
         else:
-            print("网易财经: 未获取到港股数据")
+            logger.debug("网易财经: 未获取到港股数据")
             return None
                 
     except Exception as e:
-        print(f"网易财经接口失败: {e}")
+        logger.warning("网易财经接口失败: %s", e)
         return None
 
 
@@ -366,7 +374,7 @@ def get_hk_quotes(stock_codes, timeout=10):
     pd.DataFrame
         港股实时行情数据
     """
-    print(f"正在获取 {len(stock_codes)} 只港股的实时行情...")
+    logger.debug("正在获取 %s 只港股的实时行情...", len(stock_codes))
     
     # 方法1: 腾讯证券
     result = get_hk_quotes_tencent(stock_codes, timeout)
@@ -383,7 +391,7 @@ def get_hk_quotes(stock_codes, timeout=10):
     if result is not None and not result.empty:
         return result
     
-    print("所有方法均未获取到港股行情数据")
+    logger.warning("所有方法均未获取到港股行情数据")
     return None
 
 
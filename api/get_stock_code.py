@@ -3,10 +3,15 @@ import akshare as ak
 import requests
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+# 并发收集各市场数据的线程数（各市场使用不同的上游接口，互不依赖）
+COLLECT_WORKERS = 4
+
 class AllStockCodeCollector:
     """全面股票代码收集器（A股、港股、北交所、指数）"""
     
@@ -15,9 +20,19 @@ class AllStockCodeCollector:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json, text/plain, */*',
         }
+        # 本轮收集中已获取的A股数据（沪深A股和北交所共用，避免重复下载全部A股）
+        self._a_shares = None
+        self._a_shares_lock = threading.Lock()
         
     def get_a_shares_comprehensive(self) -> pd.DataFrame:
-        """获取全面的A股数据（包括沪、深、京交易所）"""
+        """获取全面的A股数据（包括沪、深、京交易所），同一轮收集内只下载一次"""
+        with self._a_shares_lock:
+            if self._a_shares is None:
+                self._a_shares = self._fetch_a_shares()
+            return self._a_shares
+    
+    def _fetch_a_shares(self) -> pd.DataFrame:
+        """从东方财富、新浪下载A股列表并合并"""
         print("正在获取A股数据（上交所、深交所）...")
         
         all_a_stocks = []
@@ -413,9 +428,22 @@ class AllStockCodeCollector:
         print("=" * 60)
         
         result = {}
-        
-        # 1. 获取A股（沪深）
-        a_shares = self.get_a_shares_comprehensive()
+        start_time = time.time()
+        
+        # 每轮重新下载A股数据；各市场并发收集（北交所复用同一份A股数据，等待其下载完成）
+        with self._a_shares_lock:
+            self._a_shares = None
+        with ThreadPoolExecutor(max_workers=COLLECT_WORKERS, thread_name_prefix='stock-code') as executor:
+            a_shares_future = executor.submit(self.get_a_shares_comprehensive)
+            bjex_future = executor.submit(self.get_bjex_stocks_detailed)
+            hk_future = executor.submit(self.get_hk_stocks_detailed)
+            indices_future = executor.submit(self.get_all_indices_detailed)
+            a_shares = a_shares_future.result()
+            bjex_stocks = bjex_future.result()
+            hk_stocks = hk_future.result()
+            indices = indices_future.result()
+        
+        # 1. 沪深A股
         if not a_shares.empty:
             # 分离沪深和北交所
             sh_sz_stocks = a_shares[a_shares['交易所'].isin(['上交所', '深交所'])]
@@ -423,20 +451,17 @@ class AllStockCodeCollector:
                 result['沪深A股'] = sh_sz_stocks
                 print(f"✓ 沪深A股收集完成: {len(sh_sz_stocks)} 只股票")
         
-        # 2. 获取北交所
-        bjex_stocks = self.get_bjex_stocks_detailed()
+        # 2. 北交所
         if not bjex_stocks.empty:
             result['北交所'] = bjex_stocks
             print(f"✓ 北交所收集完成: {len(bjex_stocks)} 只股票")
         
-        # 3. 获取港股
-        hk_stocks = self.get_hk_stocks_detailed()
+        # 3. 港股
         if not hk_stocks.empty:
             result['港股'] = hk_stocks
             print(f"✓ 港股收集完成: {len(hk_stocks)} 只股票")
         
-        # 4. 获取指数
-        indices = self.get_all_indices_detailed()
+        # 4. 指数
         if not indices.empty:
             result['指数'] = indices
             print(f"✓ 指数收集完成: {len(indices)} 个指数")
@@ -445,7 +470,7 @@ class AllStockCodeCollector:
         
         # 统计汇总
         total_stocks = sum(len(df) for key, df in result.items() if key != '指数')
-        print(f"数据收集完成！总计：")
+        print(f"数据收集完成！耗时 {time.time() - start_time:.1f} 秒，总计：")
         print(f"  • 股票总数: {total_stocks} 只")
         print(f"  • 指数总数: {len(indices) if not indices.empty else 0} 个")
         print(f"  • 数据表: {list(result.keys())}")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+健康检查API接口
+提供负载均衡使用的存活探针、就绪探针以及 Prometheus 指标
+"""
+
+from flask import Blueprint, Response, jsonify
+from core.metrics import render_metrics
+from core.warmup import warm_up_state
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    存活探针：进程可以响应请求即返回200
+
+    Returns:
+        json: {"status": "ok"}
+    """
+    return jsonify({'status': 'ok'})
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    就绪探针：必需的预热步骤全部成功后返回200，否则返回503
+
+    Returns:
+        json: 预热状态、失败的步骤及各步骤结果
+    """
+    status_code = 200 if warm_up_state.ready else 503
+    return jsonify(warm_up_state.to_dict()), status_code
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    性能指标：各处理阶段耗时直方图（Prometheus 文本格式）
+
+    Returns:
+        text: fundbase_stage_duration_seconds 的 bucket/sum/count
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
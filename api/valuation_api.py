@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市场估值API接口
+基于全市场估值引擎提供基金估值排行、基金日内估值序列，以及自选组合估值
+"""
+
+import re
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from core.popularity import fund_popularity
+from core.portfolio_valuation import PORTFOLIO_MAX_FUNDS, value_portfolio
+from core.valuation_engine import valuation_engine
+from core.valuation_series import valuation_series
+
+valuation_bp = Blueprint('valuation', __name__)
+
+# 蓝图注册时启动估值序列保存线程，收盘后将当日序列写入磁盘
+valuation_bp.record_once(lambda state: valuation_series.start_persister())
+
+# 排行榜默认/最大返回数量
+RANKING_DEFAULT_LIMIT = 20
+RANKING_MAX_LIMIT = 200
+
+@valuation_bp.route('/api/valuation/ranking', methods=['GET'])
+def ranking():
+    """
+    基金估算涨跌幅排行
+
+    Query Parameters:
+        n (int): 返回数量，默认20，最多200
+        order (str): desc 涨幅榜（默认），asc 跌幅榜
+        min_coverage (float): 最低持仓覆盖率（0-1），默认0
+
+    Returns:
+        json: {"success": true, "data": [{"fund_code", "fund_name", "change", "coverage", "method"}], "total": 可估值基金数}
+    """
+    try:
+        n = min(max(int(request.args.get('n', RANKING_DEFAULT_LIMIT)), 1), RANKING_MAX_LIMIT)
+        min_coverage = float(request.args.get('min_coverage', 0))
+    except ValueError:
+        return jsonify({'success': False, 'message': '参数格式错误'}), 400
+    ascending = request.args.get('order', 'desc') == 'asc'
+
+    try:
+        top = valuation_engine.ranking(n=n, ascending=ascending, min_coverage=min_coverage)
+        total = len(valuation_engine.value_all())
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'估值计算失败: {str(e)}'}), 500
+
+    data = [
+        {
+            'fund_code': fund_code,
+            'fund_name': row['基金名称'],
+            'change': round(float(row['估算涨跌幅']) * 100, 4),
+            'coverage': round(float(row['持仓覆盖率']), 4),
+            'method': row['估值方式'],
+        }
+        for fund_code, row in top.iterrows()
+    ]
+    return jsonify({'success': True, 'data': data, 'total': total})
+
+@valuation_bp.route('/api/valuation/series', methods=['GET'])
+def series():
+    """
+    基金日内估值序列（只读取已记录的数据，不触发估值计算）
+
+    Query Parameters:
+        code (str): 基金代码
+        date (str): 日期，格式 YYYY-MM-DD，默认当日
+
+    Returns:
+        json: {"code": 基金代码, "date": 日期, "t": [当日零点起的秒数], "v": [估算涨跌幅(%)]}
+    """
+    fund_code = request.args.get('code', '').strip()
+    day = request.args.get('date') or datetime.now().strftime("%Y-%m-%d")
+    if not fund_code:
+        return jsonify({'success': False, 'message': '基金代码不能为空'}), 400
+    if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', day):
+        return jsonify({'success': False, 'message': '日期格式应为 YYYY-MM-DD'}), 400
+
+    times, changes = valuation_series.get_series(fund_code, day)
+    return jsonify({
+        'code': fund_code,
+        'date': day,
+        't': times.tolist(),
+        'v': [round(float(change) * 100, 4) for change in changes],
+    })
+
+@valuation_bp.route('/api/valuation/portfolio', methods=['POST'])
+def portfolio():
+    """
+    自选组合估值：一次请求估值组合内所有基金，并汇总每只基金、每个分组和整个组合的预估收益
+
+    Request Body:
+        json: {"funds": [{"code": 基金代码, "amount": 持仓金额, "group": 分组ID（可选）}, ...]}
+
+    Returns:
+        json: {"success": true, "data": {"funds": [...], "groups": [...], "total": {...}}}，
+              涨跌幅为百分数，估值失败的基金 error 字段为失败原因
+    """
+    data = request.get_json(silent=True) or {}
+    funds = data.get('funds')
+    if not isinstance(funds, list) or not funds:
+        return jsonify({'success': False, 'message': '基金列表不能为空'}), 400
+    if len(funds) > PORTFOLIO_MAX_FUNDS:
+        return jsonify({'success': False, 'message': f'单次最多估值 {PORTFOLIO_MAX_FUNDS} 只基金'}), 400
+
+    holdings = []
+    try:
+        for fund in funds:
+            code = str(fund['code']).strip()
+            if not code:
+                raise ValueError
+            holdings.append({'code': code, 'amount': float(fund.get('amount') or 0), 'group': fund.get('group')})
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': '参数格式错误'}), 400
+
+    for holding in holdings:
+        fund_popularity.hit(holding['code'])
+
+    try:
+        result = value_portfolio(holdings)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'估值计算失败: {str(e)}'}), 500
+    return jsonify({'success': True, 'data': result})
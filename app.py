@@ -2,26 +2,67 @@
 基金实时估值 Web 应用
 """
 
-from flask import Flask, render_template, jsonify, request
-from core.fund_realtime_calc import FundRealtimeCalculator, is_trading_time
+from flask import Flask, Response, render_template, jsonify, request, g
+from core.fund_realtime_calc import is_trading_time
 from api.fund_search_api import fund_search_bp
+from api.health_api import health_bp
+from api.valuation_api import valuation_bp
+from core.metrics import observe, span
+from core.popularity import fund_popularity
+from core.response_codec import COMPRESS_MIN_BYTES, choose_encoding, compress, dumps
+from core.valuation_service import format_valuation, format_valuation_compact, get_fund_valuation
+from core.warmup import start_warm_up
 import os
-import pandas as pd
+import time
 
 app = Flask(__name__)
 
 # 注册基金搜索API蓝图
 app.register_blueprint(fund_search_bp)
+# 注册健康检查API蓝图
+app.register_blueprint(health_bp)
+# 注册全市场估值API蓝图
+app.register_blueprint(valuation_bp)
 
 app.config['JSON_AS_ASCII'] = False
 
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_duration(response):
+    """记录每个接口的整体耗时（/metrics 中 stage="request"）"""
+    start = g.pop('request_start', None)
+    if start is not None and request.endpoint:
+        observe('request', time.perf_counter() - start,
+                status='ok' if response.status_code < 500 else 'error', endpoint=request.endpoint)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """按 Accept-Encoding 压缩较大的 JSON 响应（br 或 gzip）"""
+    if (response.direct_passthrough or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 # 配置模板路径
 template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
 app.template_folder = template_path
 
-# 创建计算器实例
-calculator = FundRealtimeCalculator()
-
 
 @app.route('/')
 def index():
@@ -32,70 +73,35 @@ def index():
 
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
-    """计算基金估值接口"""
+    """
+    计算基金估值接口
+
+    请求参数 format=compact（查询参数或 JSON 字段）时返回紧凑格式：
+    数值不格式化为字符串，持仓明细按列输出，见 format_valuation_compact
+    """
     try:
         data = request.get_json()
         fund_code = data.get('fund_code', '').strip()
+        compact = (request.args.get('format') or data.get('format')) == 'compact'
 
         if not fund_code:
             return jsonify({'success': False, 'message': '基金代码不能为空'})
 
-        # 重置计算器
-        global calculator
-        calculator = FundRealtimeCalculator()
-
-        # 1. 获取基金持仓
-        portfolio = calculator.get_fund_portfolio(fund_code, year=None, auto_detect_latest=True)
-        if portfolio is None:
-            return jsonify({'success': False, 'message': '获取基金持仓失败，请检查基金代码'})
-
-        # 2. 获取股票实时行情
-        quotes = calculator.get_stock_realtime_quotes()
-        if quotes is None:
-            return jsonify({'success': False, 'message': '获取股票行情失败'})
+        fund_popularity.hit(fund_code)
 
-        # 3. 计算估值
-        result = calculator.calculate_realtime_value()
+        # 同一基金的并发请求共享一次计算，短时间内的重复请求直接使用缓存结果
+        result, message, stale = get_fund_valuation(fund_code)
         if result is None:
-            return jsonify({'success': False, 'message': '计算估值失败'})
+            return jsonify({'success': False, 'message': message})
 
         # 格式化返回数据
-        stock_details = []
-        for _, row in result['stock_details'].iterrows():
-            change_str = str(row['涨跌幅'])  # 确保是字符串
-            # 处理 NaN 值，替换为 null
-            price = row['最新价']
-            if pd.isna(price):
-                price = None
-            ratio = row['占净值比例']
-            if pd.isna(ratio):
-                ratio = None
-            stock_details.append({
-                'code': row['股票代码'],
-                'name': row['股票名称'],
-                'ratio': ratio,
-                'price': price,
-                'change': change_str
-            })
-
-        # 格式化加权涨跌幅为字符串
-        weighted_change = result['weighted_change']
-        change_value = weighted_change * 100
-        if change_value >= 0:
-            weighted_change_str = f"+{change_value:.2f}%"
-        else:
-            weighted_change_str = f"{change_value:.2f}%"
-
-        return jsonify({
-            'success': True,
-            'data': {
-                'fund_code': result['fund_code'],
-                'fund_name': result['fund_name'],
-                'weighted_change': weighted_change_str,  # 确保是字符串格式
-                'calc_time': result['calc_time'],
-                'stock_details': stock_details
-            }
-        })
+        with span('serialize'):
+            if compact:
+                body = dumps({'success': True, 'data': format_valuation_compact(result, stale)})
+                response = Response(body, mimetype='application/json')
+            else:
+                response = jsonify({'success': True, 'data': format_valuation(result, stale)})
+        return response
 
     except Exception as e:
         return jsonify({'success': False, 'message': f'计算出错: {str(e)}'})
@@ -113,4 +119,6 @@ if __name__ == '__main__':
     if not os.path.exists('templates'):
         os.makedirs('templates')
 
+    # 开发模式下同样在后台预热，生产部署请使用 wsgi.py
+    start_warm_up(background=True)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,133 @@
+"""
+基金实时估值 Web 应用 - 异步（ASGI）入口
+
+提供与 app.py 相同的 /api/calculate、/api/search、/api/trading-time 接口及 /healthz、/readyz、/metrics 探针，
+估值请求在事件循环中等待上游行情，不再每个请求占用一个线程，适合开盘时的大量并发请求
+
+部署（pip install -r requirements-asgi.txt 安装 starlette、uvicorn、httpx；未安装 httpx 时行情请求在线程中同步执行）:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from api.fund_search_api import search_funds
+from core.async_valuation import ASYNC_BLOCKING_LIMIT, AsyncValuator, create_http_client
+from core.fund_dataset import start_fund_dataset_watcher
+from core.metrics import render_metrics, span
+from core.popularity import fund_popularity
+from core.response_codec import COMPRESS_MIN_BYTES, dumps
+from core.trading_calendar import is_trading_time
+from core.valuation_series import valuation_series
+from core.valuation_service import format_valuation, format_valuation_compact
+from core.warmup import start_warm_up, warm_up_state
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """启动时预热并创建共享的异步客户端，关闭时释放连接"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_LIMIT, thread_name_prefix='asgi-blocking')
+    )
+    start_fund_dataset_watcher()
+    valuation_series.start_persister()
+    start_warm_up(background=True)
+
+    client = create_http_client()
+    app.state.valuator = AsyncValuator(client=client)
+    try:
+        yield
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+async def calculate(request):
+    """计算基金估值接口（format=compact 时返回紧凑格式，与 app.py 一致）"""
+    try:
+        data = await request.json()
+        fund_code = data.get('fund_code', '').strip()
+        compact = (request.query_params.get('format') or data.get('format')) == 'compact'
+
+        if not fund_code:
+            return JSONResponse({'success': False, 'message': '基金代码不能为空'})
+
+        fund_popularity.hit(fund_code)
+        result, message, stale = await request.app.state.valuator.get_fund_valuation(fund_code)
+        if result is None:
+            return JSONResponse({'success': False, 'message': message})
+
+        with span('serialize'):
+            if compact:
+                body = dumps({'success': True, 'data': format_valuation_compact(result, stale)})
+                return Response(body, media_type='application/json')
+            return JSONResponse({'success': True, 'data': format_valuation(result, stale)})
+
+    except Exception as e:
+        return JSONResponse({'success': False, 'message': f'计算出错: {str(e)}'})
+
+
+async def search(request):
+    """基金搜索接口"""
+    keyword = request.query_params.get('keyword', '')
+    if not keyword:
+        return JSONResponse({'error': '缺少搜索关键字'}, status_code=400)
+
+    results = search_funds(keyword)
+    return JSONResponse({
+        'total': len(results),
+        'results': results
+    })
+
+
+async def trading_time(request):
+    """获取当前是否为交易时间"""
+    return JSONResponse({'is_trading': is_trading_time()})
+
+
+async def healthz(request):
+    """存活探针：进程可以响应请求即返回200"""
+    return JSONResponse({'status': 'ok'})
+
+
+async def readyz(request):
+    """就绪探针：必需的预热步骤全部成功后返回200，否则返回503（响应中列出失败的步骤）"""
+    return JSONResponse(warm_up_state.to_dict(), status_code=200 if warm_up_state.ready else 503)
+
+
+async def metrics(request):
+    """性能指标：各处理阶段耗时直方图（Prometheus 文本格式）"""
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
+
+app = Starlette(
+    routes=[
+        Route('/api/calculate', calculate, methods=['POST']),
+        Route('/api/search', search, methods=['GET']),
+        Route('/api/trading-time', trading_time, methods=['GET']),
+        Route('/healthz', healthz, methods=['GET']),
+        Route('/readyz', readyz, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    middleware=[Middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES)],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'asgi:app',
+        host=os.environ.get('FUNDBASE_HOST', '0.0.0.0'),
+        port=int(os.environ.get('FUNDBASE_PORT', '5000')),
+        workers=int(os.environ.get('FUNDBASE_WORKERS', '1')),
+    )
@@ -0,0 +1,201 @@
+"""
+异步估值
+供 asgi.py 使用：一个事件循环同时处理大量进行中的估值请求，不再为每个请求占用一个线程
+- 股票行情优先通过 httpx 异步请求腾讯证券批量接口（未安装 httpx 或未取全时回退到同步接口链）
+- 持仓获取等仍为同步实现的步骤在线程中执行，并用信号量限制同时占用的线程数
+- 与同步版本共用估值结果缓存（core/valuation_service.py），同一基金/同一股票集合的并发请求合并为一次计算
+"""
+
+import asyncio
+import time
+
+import pandas as pd
+
+from api.get_all_stock_quotes import (
+    TencentRealtime, format_tencent_quote, get_provider, get_random_headers, to_tencent_symbol,
+)
+from core.closing_snapshot import closing_snapshot
+from core.fund_realtime_calc import FundRealtimeCalculator
+from core.log import get_logger
+from core.metrics import observe, span
+from core.valuation_service import peek_valuation, store_valuation
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+logger = get_logger(__name__)
+
+# 同时在线程中执行的同步步骤数上限
+ASYNC_BLOCKING_LIMIT = 32
+# 异步行情请求超时（秒）
+ASYNC_QUOTE_TIMEOUT = 5
+TENCENT_QUOTE_URL = "http://qt.gtimg.cn/q="
+
+
+class AsyncSingleFlight:
+    """SingleFlight 的协程版本：同一 key 同时只执行一次协程，其他调用等待并共享结果"""
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, coro_fn, *args):
+        """
+        执行 coro_fn(*args)，同一 key 已有进行中的任务时等待其结果
+
+        调用方被取消时不会取消共享的任务
+
+        Returns:
+        --------
+        tuple
+            (结果, 是否共享了其他调用的结果)
+        """
+        task = self._tasks.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(coro_fn(*args))
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._tasks.pop(key) if self._tasks.get(key) is done else None)
+        return await asyncio.shield(task), False
+
+
+def create_http_client():
+    """
+    创建异步 HTTP 客户端（未安装 httpx 时返回None）
+
+    Returns:
+    --------
+    httpx.AsyncClient
+        复用连接的异步客户端
+    """
+    if not HAS_HTTPX:
+        return None
+    return httpx.AsyncClient(
+        timeout=ASYNC_QUOTE_TIMEOUT,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+
+
+class AsyncValuator:
+    """异步估值计算"""
+
+    def __init__(self, client=None, max_blocking=ASYNC_BLOCKING_LIMIT):
+        """
+        Parameters:
+        -----------
+        client : httpx.AsyncClient
+            异步 HTTP 客户端，为空时行情全部走同步接口链
+        max_blocking : int
+            同时在线程中执行的同步步骤数上限
+        """
+        self.client = client
+        self._blocking = asyncio.Semaphore(max_blocking)
+        self._valuation_flight = AsyncSingleFlight()
+        self._quote_flight = AsyncSingleFlight()
+
+    async def run_blocking(self, fn, *args):
+        """在线程中执行同步函数（受 max_blocking 限制）"""
+        async with self._blocking:
+            return await asyncio.to_thread(fn, *args)
+
+    async def get_fund_valuation(self, fund_code):
+        """
+        获取基金实时估值（与 valuation_service.get_fund_valuation 返回格式一致）
+
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+
+        Returns:
+        --------
+        tuple
+            (估值结果, 错误信息, 是否为过期结果)
+        """
+        cached = peek_valuation(fund_code)
+        if cached is not None:
+            result, stale = cached
+            return result, None, stale
+
+        (result, message), shared = await self._valuation_flight.do(fund_code, self._compute, fund_code)
+        if shared:
+            logger.debug("共享进行中的基金【%s】估值计算结果", fund_code)
+        return result, message, False
+
+    async def _compute(self, fund_code):
+        """执行一次完整的估值计算，返回 (结果, 错误信息)"""
+        calculator = FundRealtimeCalculator()
+
+        # 1. 获取基金持仓（持仓缓存和本地持仓库命中时很快返回）
+        portfolio = await self.run_blocking(calculator.get_fund_portfolio, fund_code, None, True)
+        if portfolio is None:
+            # 指数型基金没有持仓时，直接使用跟踪指数/ETF估算
+            if not calculator.is_index_fund():
+                return None, '获取基金持仓失败，请检查基金代码'
+            with span('calculate'):
+                result = await self.run_blocking(calculator.calculate_realtime_value)
+        else:
+            # 2. 获取股票实时行情
+            with span('quotes'):
+                quotes = await self._get_quotes(calculator)
+            if quotes is None:
+                return None, '获取股票行情失败'
+
+            # 3. 计算估值（pandas 计算和交易日历查询都是同步的，不在事件循环中执行）
+            with span('calculate'):
+                result = await self.run_blocking(calculator.calculate_realtime_value)
+
+        if result is None:
+            return None, '计算估值失败'
+        store_valuation(fund_code, result)
+        return result, None
+
+    async def _get_quotes(self, calculator):
+        """获取持仓股票行情：休市后优先使用收盘快照，其次异步接口，未取全时在线程中执行同步接口链"""
+        codes = calculator.portfolio['股票代码'].tolist()
+        quotes = closing_snapshot.get_quotes(codes)
+        if quotes is not None:
+            calculator.stock_quotes = quotes
+            return quotes
+        if self.client is not None:
+            quotes, shared = await self._quote_flight.do(frozenset(codes), self._fetch_tencent_quotes, codes)
+            if quotes is not None and set(codes) <= set(quotes['代码']):
+                if not shared:
+                    closing_snapshot.record_quotes(quotes)
+                calculator.stock_quotes = quotes
+                return quotes
+        return await self.run_blocking(calculator.get_stock_realtime_quotes)
+
+    async def _fetch_tencent_quotes(self, codes):
+        """
+        异步请求腾讯证券批量行情接口
+
+        Returns:
+        --------
+        pd.DataFrame
+            统一格式的行情数据，失败时返回None
+        """
+        url = TENCENT_QUOTE_URL + ','.join(to_tencent_symbol(code) for code in codes)
+        parser = get_provider(TencentRealtime)
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(url, headers=get_random_headers('http://gu.qq.com/'))
+            response.raise_for_status()
+        except Exception as e:
+            observe('quote_provider', time.perf_counter() - start, status='error', provider='tencent_async')
+            logger.warning("腾讯证券异步获取失败: %s", e)
+            return None
+
+        wanted = set(codes)
+        rows = []
+        for line in response.content.decode('gbk', errors='replace').strip().split(';'):
+            if '=' not in line:
+                continue
+            stock_data = parser._parse_line(line)
+            if stock_data and stock_data['code'] in wanted:
+                rows.append(format_tencent_quote(stock_data))
+        # 请求成功但没有解析出任何行情时同样记为失败
+        observe('quote_provider', time.perf_counter() - start, status='ok' if rows else 'error', provider='tencent_async')
+        return pd.DataFrame(rows) if rows else None
@@ -0,0 +1,131 @@
+"""
+进程内缓存工具
+"""
+
+import threading
+import time
+
+
+class TTLCache:
+    """线程安全的带过期时间的缓存"""
+
+    def __init__(self, ttl, maxsize=None):
+        """
+        Parameters:
+        -----------
+        ttl : float
+            默认过期时间（秒）
+        maxsize : int
+            最大条目数，超出时淘汰最早写入的条目，默认不限制
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """获取未过期的缓存值，不存在或已过期时返回 default"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expire_at = entry
+        if expire_at < time.time():
+            with self._lock:
+                if self._data.get(key) is entry:
+                    del self._data[key]
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        """写入缓存值，ttl 为空时使用默认过期时间"""
+        expire_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data.pop(key, None)
+            if self.maxsize is not None and len(self._data) >= self.maxsize:
+                # dict 保持插入顺序，第一个即最早写入的条目
+                del self._data[next(iter(self._data))]
+            self._data[key] = (value, expire_at)
+
+    def delete(self, key):
+        """删除缓存值"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """返回所有未过期条目的 (key, value) 列表快照"""
+        now = time.time()
+        with self._lock:
+            entries = list(self._data.items())
+        return [(key, value) for key, (value, expire_at) in entries if expire_at >= now]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Call:
+    """SingleFlight 中一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    并发调用合并：同一个 key 同时只执行一次函数，
+    执行期间到达的其他调用等待并共享这一次的结果（或异常）。
+    调用结束后不保留结果，下一次调用会重新执行
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        执行 fn(*args, **kwargs)，同一 key 已有进行中的调用时等待其结果
+
+        Parameters:
+        -----------
+        key : hashable
+            合并的键
+        fn : callable
+            实际执行的函数
+
+        Returns:
+        --------
+        tuple
+            (结果, 是否共享了其他调用的结果)；函数抛出异常时所有等待者都会收到该异常
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        """当前进行中的调用数"""
+        return len(self._calls)
@@ -0,0 +1,393 @@
+"""
+收盘快照
+记录交易日内获取过的每只股票的行情和计算过的每只基金的估值，
+交易时间内定期、收盘后再完整刷新一次保存到 cache/closing_snapshot.json.gz，服务启动时重新加载：
+- 非交易时间行情和估值不再变化，休市后获取的数据直接从快照返回，不再访问上游
+- 服务重启后立即恢复上一交易时段的收盘数据
+快照只保留最近两个交易日内请求过的股票和基金；多进程部署时各进程定期合并保存，
+收盘刷新只由一个进程执行，其他进程在快照文件更新后重新加载
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from core.log import get_logger
+from core.process_lock import ProcessLock
+from core.trading_calendar import is_trading_time, last_session_end
+
+logger = get_logger(__name__)
+
+CLOSING_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'closing_snapshot.json.gz'
+)
+
+# 交易时间内保存快照的间隔（秒）
+SNAPSHOT_SAVE_INTERVAL = 5 * 60
+# 后台线程检查间隔（秒）
+SNAPSHOT_CHECK_SECONDS = 60
+# 收盘后等待行情接口更新到收盘价的时间（秒），之后刷新全部股票行情和基金估值
+CLOSE_REFRESH_DELAY = 60
+# 收盘刷新时每批的基金数
+CLOSE_REFRESH_BATCH = 50
+
+
+def _retention_cutoff():
+    """
+    快照保留的起始时间戳：上一个交易日收盘之后（交易日内为前一交易日和当日，收盘后为当日）
+
+    Returns:
+    --------
+    float
+        早于该时间获取的行情和估值不再保留，没有交易日信息时返回0
+    """
+    session_end = last_session_end()
+    if session_end is None:
+        return 0.0
+    previous_close = last_session_end(datetime.combine(session_end.date(), datetime.min.time()))
+    return previous_close.timestamp() if previous_close is not None else 0.0
+
+
+def _to_records(frame):
+    """DataFrame 转为可 JSON 序列化的记录列表（NaN 替换为 None）"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def serialize_valuation(result, computed_at):
+    """
+    估值结果转为可 JSON 序列化的字典（持仓明细按列名和记录列表保存）
+
+    Parameters:
+    -----------
+    result : dict
+        calculate_realtime_value 返回的估值结果
+    computed_at : float
+        计算完成时间戳
+
+    Returns:
+    --------
+    dict
+        可由 deserialize_valuation 还原的字典
+    """
+    details = result['stock_details']
+    return {
+        'fund_code': result['fund_code'],
+        'fund_name': result['fund_name'],
+        'weighted_change': float(result['weighted_change']),
+        'calc_time': result['calc_time'],
+        'stock_details': {'columns': list(details.columns), 'data': _to_records(details)},
+        'computed_at': computed_at,
+    }
+
+
+def deserialize_valuation(entry):
+    """
+    还原 serialize_valuation 保存的估值结果
+
+    Returns:
+    --------
+    tuple
+        (估值结果, 计算完成时间戳)
+    """
+    details = entry['stock_details']
+    result = {
+        'fund_code': entry['fund_code'],
+        'fund_name': entry['fund_name'],
+        'weighted_change': entry['weighted_change'],
+        'calc_time': entry['calc_time'],
+        'stock_details': pd.DataFrame(details['data'], columns=details['columns']),
+    }
+    return result, entry['computed_at']
+
+
+class ClosingSnapshot:
+    """股票行情和基金估值的收盘快照"""
+
+    def __init__(self, path=CLOSING_SNAPSHOT_PATH):
+        self.path = path
+        self._quotes = {}      # 股票代码 -> (行情记录, 获取时间戳)
+        self._valuations = {}  # 基金代码 -> (估值结果, 计算时间戳)
+        self._dirty = False
+        self._saved_at = 0.0
+        self._closed_session = None  # 已完成收盘刷新的交易时段结束时间
+        self._lock = threading.Lock()
+        self._persister = None
+        self._file_mtime = None
+        self._refresher = ProcessLock('closing_snapshot')
+
+    @staticmethod
+    def _is_final(captured_at, session_end):
+        """数据是否在最近一个交易时段结束后获取（此后行情不再变化）"""
+        return session_end is not None and captured_at >= session_end.timestamp()
+
+    def record_quotes(self, quotes):
+        """
+        记录一批股票行情
+
+        Parameters:
+        -----------
+        quotes : pd.DataFrame
+            包含'代码'列的行情数据
+        """
+        if quotes is None or quotes.empty or '代码' not in quotes.columns:
+            return
+        now = time.time()
+        records = _to_records(quotes)
+        with self._lock:
+            for record in records:
+                self._quotes[str(record['代码'])] = (record, now)
+            self._dirty = True
+
+    def get_quotes(self, codes):
+        """
+        非交易时间获取收盘行情
+
+        Parameters:
+        -----------
+        codes : list
+            股票代码列表
+
+        Returns:
+        --------
+        pd.DataFrame
+            所有代码都有休市后获取的行情时返回行情数据，否则（或交易时间内）返回None
+        """
+        if is_trading_time():
+            return None
+        session_end = last_session_end()
+        records = []
+        for code in codes:
+            entry = self._quotes.get(code)
+            if entry is None or not self._is_final(entry[1], session_end):
+                return None
+            records.append(entry[0])
+        return pd.DataFrame(records)
+
+    def record_valuation(self, fund_code, result):
+        """
+        记录一只基金的估值结果
+
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+        result : dict
+            calculate_realtime_value 返回的估值结果
+        """
+        with self._lock:
+            self._valuations[fund_code] = (result, time.time())
+            self._dirty = True
+
+    def get_valuation(self, fund_code):
+        """
+        非交易时间获取收盘估值
+
+        Returns:
+        --------
+        dict
+            休市后计算的估值结果，没有时（或交易时间内）返回None
+        """
+        entry = self._valuations.get(fund_code)
+        if entry is None or is_trading_time():
+            return None
+        result, computed_at = entry
+        return result if self._is_final(computed_at, last_session_end()) else None
+
+    def symbols(self):
+        """快照中的所有股票代码"""
+        return list(self._quotes)
+
+    def fund_codes(self):
+        """快照中的所有基金代码"""
+        return list(self._valuations)
+
+    @staticmethod
+    def _serialize(quotes, valuations):
+        return {
+            'saved_at': time.time(),
+            'quotes': {code: {'quote': record, 'captured_at': captured_at}
+                       for code, (record, captured_at) in quotes.items()},
+            'valuations': {fund_code: serialize_valuation(result, computed_at)
+                           for fund_code, (result, computed_at) in valuations.items()},
+        }
+
+    @staticmethod
+    def _decode(data):
+        """
+        解析快照文件内容（不持有锁）
+
+        Returns:
+        --------
+        tuple
+            (股票代码 -> (行情记录, 获取时间戳), 基金代码 -> (估值结果, 计算时间戳))
+        """
+        quotes = {code: (entry['quote'], entry['captured_at']) for code, entry in data.get('quotes', {}).items()}
+        valuations = {fund_code: deserialize_valuation(entry)
+                      for fund_code, entry in data.get('valuations', {}).items()}
+        return quotes, valuations
+
+    def _merge(self, quotes, valuations):
+        """合并已解析的条目（调用方持有锁，只采用比内存中更新的条目）"""
+        for code, entry in quotes.items():
+            current = self._quotes.get(code)
+            if current is None or current[1] < entry[1]:
+                self._quotes[code] = entry
+        for fund_code, entry in valuations.items():
+            current = self._valuations.get(fund_code)
+            if current is None or current[1] < entry[1]:
+                self._valuations[fund_code] = entry
+
+    def _prune(self, cutoff):
+        """删除 cutoff 之前获取的行情和估值"""
+        self._quotes = {code: entry for code, entry in self._quotes.items() if entry[1] >= cutoff}
+        self._valuations = {code: entry for code, entry in self._valuations.items() if entry[1] >= cutoff}
+
+    def _read_file(self):
+        try:
+            self._file_mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            pass
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _read_entries(self):
+        """读取并解析快照文件（不持有锁），文件不存在或损坏时返回None"""
+        try:
+            return self._decode(self._read_file())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def load(self):
+        """
+        从磁盘加载快照
+
+        Returns:
+        --------
+        bool
+            是否加载成功
+        """
+        try:
+            data = self._read_file()
+            quotes, valuations = self._decode(data)
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("加载收盘快照失败: %s", e)
+            return False
+        with self._lock:
+            self._merge(quotes, valuations)
+            self._prune(_retention_cutoff())
+        # 文件已包含最近一个交易时段的收盘刷新结果时，启动后不再重复刷新
+        session_end = last_session_end()
+        if session_end is not None and data.get('saved_at', 0) >= session_end.timestamp() + CLOSE_REFRESH_DELAY:
+            self._closed_session = session_end
+        logger.info("成功加载收盘快照: %s 只股票行情，%s 只基金估值（保存于 %s）",
+                    len(self._quotes), len(self._valuations),
+                    datetime.fromtimestamp(data.get('saved_at', 0)).strftime("%Y-%m-%d %H:%M:%S"))
+        return True
+
+    def save(self):
+        """
+        将快照原子写入磁盘（先合并其他进程已保存的数据）
+
+        读取、解析、序列化和写入文件都不持有锁，锁内只合并已解析的条目并复制两个字典，
+        不阻塞请求路径上的 record_quotes / record_valuation
+        """
+        file_entries = self._read_entries()
+        with self._lock:
+            if file_entries is not None:
+                self._merge(*file_entries)
+            self._prune(_retention_cutoff())
+            quotes, valuations = dict(self._quotes), dict(self._valuations)
+            self._dirty = False
+            self._saved_at = time.time()
+        body = json.dumps(self._serialize(quotes, valuations), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.path)}.", suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(body))
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+            self._file_mtime = os.stat(self.path).st_mtime_ns
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        logger.info("已保存收盘快照: %s 只股票行情，%s 只基金估值", len(quotes), len(valuations))
+
+    def _reload_if_changed(self):
+        """快照文件被其他进程更新后重新加载（合并其中更新的条目）"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._file_mtime:
+            self.load()
+
+    def refresh_after_close(self):
+        """收盘后重新获取快照中全部股票的行情并重新计算全部基金的估值（此后休市期间直接使用）"""
+        from core.portfolio_valuation import refresh_valuations
+
+        # 先合并其他进程已保存的基金，刷新范围为最近两个交易日内请求过的基金
+        file_entries = self._read_entries()
+        with self._lock:
+            if file_entries is not None:
+                self._merge(*file_entries)
+            self._prune(_retention_cutoff())
+        fund_codes = self.fund_codes()
+        start = time.time()
+        for i in range(0, len(fund_codes), CLOSE_REFRESH_BATCH):
+            refresh_valuations(fund_codes[i:i + CLOSE_REFRESH_BATCH])
+        logger.info("收盘刷新完成: %s 只基金，耗时 %.2f 秒", len(fund_codes), time.time() - start)
+
+    def start_persister(self, interval=SNAPSHOT_CHECK_SECONDS):
+        """
+        启动后台保存线程（进程内只启动一次）：交易时间内每 SNAPSHOT_SAVE_INTERVAL 秒保存一次，
+        交易时段结束后由持有选主锁的进程刷新收盘数据并保存，其他进程重新加载快照文件
+
+        Parameters:
+        -----------
+        interval : int
+            检查间隔（秒）
+        """
+        with self._lock:
+            if self._persister is not None and self._persister.is_alive():
+                return
+            self._persister = threading.Thread(target=self._persist_loop, args=(interval,),
+                                               name='closing-snapshot-persister', daemon=True)
+            self._persister.start()
+
+    def _persist_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                if is_trading_time():
+                    if self._dirty and time.time() - self._saved_at >= SNAPSHOT_SAVE_INTERVAL:
+                        self.save()
+                    continue
+                if self._dirty:
+                    self.save()
+                session_end = last_session_end()
+                if (session_end is not None and session_end != self._closed_session
+                        and time.time() - session_end.timestamp() >= CLOSE_REFRESH_DELAY):
+                    if self._refresher.try_acquire():
+                        self._closed_session = session_end
+                        self.refresh_after_close()
+                        self.save()
+                    else:
+                        self._reload_if_changed()
+            except Exception as e:
+                logger.warning("保存收盘快照失败: %s", e)
+
+
+closing_snapshot = ClosingSnapshot()
@@ -0,0 +1,291 @@
+"""
+基金信息数据集
+在内存中维护 fund_info.json 的只读快照，后台线程监测数据集版本变化，
+重建完成后整体替换当前快照，读取方无需加锁，也不会看到半成品数据
+"""
+
+import json
+import os
+import threading
+import time
+
+from core.cache import TTLCache
+from core.log import get_logger
+from scripts.update_fund_info import FUND_INFO_JSON, load_metadata
+
+logger = get_logger(__name__)
+
+
+# 单个关键字候选集缓存的最大条目数（自动补全场景下前缀重复率很高），超出时淘汰最早写入的条目；
+# 缓存随数据集快照一起替换，快照只读，条目不需要过期
+TERM_CACHE_SIZE = 2048
+
+_EMPTY = frozenset()
+
+
+def _grams(text):
+    """返回文本中的所有单字和相邻双字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class FundDataset:
+    """基金信息数据集快照（构建完成后只读）"""
+
+    def __init__(self, fund_dict, version=0):
+        self.fund_dict = fund_dict
+        self.version = version
+        self.loaded_at = time.time()
+        self.codes = list(fund_dict)
+        self._build_search_index()
+
+    def __len__(self):
+        return len(self.fund_dict)
+
+    def __contains__(self, fund_code):
+        return fund_code in self.fund_dict
+
+    def get(self, fund_code):
+        """
+        获取基金信息
+
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+
+        Returns:
+        --------
+        dict
+            {'名称': ..., '拼音缩写': ..., '类型': ...}，不存在时返回None
+        """
+        fund_info = self.fund_dict.get(fund_code)
+        if fund_info is None:
+            return None
+        # 兼容旧格式缓存（值直接为基金名称）
+        if not isinstance(fund_info, dict):
+            return {'名称': fund_info, '拼音缩写': '', '类型': ''}
+        return fund_info
+
+    def get_name(self, fund_code):
+        """获取基金名称，不存在时返回None"""
+        fund_info = self.get(fund_code)
+        return fund_info.get('名称') if fund_info else None
+
+    def get_type(self, fund_code):
+        """获取基金类型，不存在时返回空字符串"""
+        fund_info = self.get(fund_code)
+        return fund_info.get('类型', '') if fund_info else ''
+
+    def _build_search_index(self):
+        """
+        构建搜索倒排索引
+
+        对每只基金的代码、简称、拼音缩写（小写）分别切分单字和双字，
+        记录 gram -> 基金序号集合。按字段切分，避免跨字段拼接出错误匹配。
+        """
+        self._search_fields = []
+        postings = {}
+        for ordinal, fund_code in enumerate(self.codes):
+            fund_info = self.get(fund_code)
+            fields = (
+                str(fund_code).lower(),
+                str(fund_info.get('名称', '')).lower(),
+                str(fund_info.get('拼音缩写', '')).lower(),
+            )
+            self._search_fields.append(fields)
+            grams = set()
+            for field in fields:
+                grams |= _grams(field)
+            for gram in grams:
+                postings.setdefault(gram, set()).add(ordinal)
+        self._postings = {gram: frozenset(ordinals) for gram, ordinals in postings.items()}
+        self._term_cache = TTLCache(ttl=float('inf'), maxsize=TERM_CACHE_SIZE)
+
+    def _term_candidates(self, term):
+        """
+        获取代码、简称或拼音缩写中包含 term 的基金序号集合
+
+        先对 term 的各个双字倒排表按从小到大求交集，长度超过2的关键字再逐一校验子串
+        """
+        cached = self._term_cache.get(term)
+        if cached is not None:
+            return cached
+
+        if len(term) == 1:
+            grams = [term]
+        else:
+            grams = {term[i:i + 2] for i in range(len(term) - 1)}
+        lists = sorted((self._postings.get(gram, _EMPTY) for gram in grams), key=len)
+        candidates = lists[0]
+        for ordinals in lists[1:]:
+            if not candidates:
+                break
+            candidates = candidates & ordinals
+
+        if len(term) > 2 and candidates:
+            fields = self._search_fields
+            candidates = frozenset(
+                ordinal for ordinal in candidates
+                if any(term in field for field in fields[ordinal])
+            )
+
+        self._term_cache.set(term, candidates)
+        return candidates
+
+    def search(self, keyword, limit=None):
+        """
+        多关键字搜索基金
+
+        关键字按空白切分，每个关键字需匹配基金代码、简称或拼音缩写之一（不区分大小写），
+        所有关键字同时满足才算匹配。各关键字候选集按从小到大的顺序求交集。
+
+        Parameters:
+        -----------
+        keyword : str
+            搜索关键字，如 "易方达 消费"、"yfd xf"
+        limit : int
+            最多返回的条数，默认不限制
+
+        Returns:
+        --------
+        list
+            匹配的基金代码列表（保持基金信息文件中的顺序）
+        """
+        terms = set(keyword.lower().split())
+        if not terms:
+            return []
+
+        candidate_sets = sorted((self._term_candidates(term) for term in terms), key=len)
+        matched = candidate_sets[0]
+        for candidates in candidate_sets[1:]:
+            if not matched:
+                break
+            matched = matched & candidates
+
+        ordinals = sorted(matched)
+        if limit is not None:
+            ordinals = ordinals[:limit]
+        return [self.codes[ordinal] for ordinal in ordinals]
+
+def _dataset_signature():
+    """
+    获取磁盘上数据集的版本标识
+
+    以元数据中的 dataset_version 为主，同时带上文件的修改时间和大小，
+    兼容手工替换 fund_info.json 的情况
+    """
+    try:
+        stat = os.stat(FUND_INFO_JSON)
+    except OSError:
+        return None
+    version = int(load_metadata().get('dataset_version', 0))
+    return (version, stat.st_mtime_ns, stat.st_size)
+
+
+def _build_dataset():
+    """从磁盘读取并构建新的数据集快照"""
+    signature = _dataset_signature()
+    with open(FUND_INFO_JSON, 'r', encoding='utf-8') as f:
+        fund_dict = json.load(f)
+    version = signature[0] if signature else 0
+    return FundDataset(fund_dict, version=version), signature
+
+
+# 当前快照；替换引用是原子操作，读取方直接读取即可
+_current_dataset = None
+_current_signature = None
+_load_lock = threading.Lock()
+_watcher = None
+
+
+def reload_fund_dataset(force=False):
+    """
+    重新加载基金信息数据集（数据集版本未变化时跳过）
+
+    Parameters:
+    -----------
+    force : bool
+        是否忽略版本号强制重新加载
+
+    Returns:
+    --------
+    FundDataset
+        当前生效的数据集快照
+    """
+    global _current_dataset, _current_signature
+    with _load_lock:
+        signature = _dataset_signature()
+        if not force and _current_dataset is not None and signature == _current_signature:
+            return _current_dataset
+        try:
+            dataset, signature = _build_dataset()
+        except Exception as e:
+            logger.warning("加载基金信息失败: %s", e)
+            if _current_dataset is None:
+                _current_dataset = FundDataset({}, version=0)
+            return _current_dataset
+        _current_dataset = dataset
+        _current_signature = signature
+        logger.info("成功加载 %s 只基金信息（数据集版本 %s）", len(dataset), dataset.version)
+        return dataset
+
+
+def get_fund_dataset():
+    """
+    获取当前基金信息数据集快照
+
+    仅首次调用时同步加载，之后始终直接返回当前快照，由后台监测线程负责更新
+
+    Returns:
+    --------
+    FundDataset
+        基金信息数据集快照
+    """
+    dataset = _current_dataset
+    if dataset is None:
+        dataset = reload_fund_dataset()
+    return dataset
+
+
+class FundDatasetWatcher(threading.Thread):
+    """基金信息文件版本监测线程"""
+
+    def __init__(self, interval=30):
+        super().__init__(name='fund-dataset-watcher', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if _dataset_signature() != _current_signature:
+                    reload_fund_dataset()
+            except Exception as e:
+                logger.warning("基金信息热加载失败: %s", e)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_fund_dataset_watcher(interval=30):
+    """
+    启动基金信息监测线程（进程内只启动一次）
+
+    Parameters:
+    -----------
+    interval : int
+        检查间隔（秒），默认30秒
+
+    Returns:
+    --------
+    FundDatasetWatcher
+        监测线程
+    """
+    global _watcher
+    with _load_lock:
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = FundDatasetWatcher(interval=interval)
+            _watcher.start()
+    return _watcher
@@ -5,9 +5,23 @@
 
 import akshare as ak
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, time
+from time import perf_counter
 import sys
 import os
+import re
+
+from core.cache import SingleFlight, TTLCache
+from core.closing_snapshot import closing_snapshot
+from core.fund_dataset import get_fund_dataset
+from core.holdings_store import get_holdings_store
+from core.index_fund_map import INDEX_FUND_TYPES, get_index_target
+from core.log import get_logger
+from core.market_snapshot import a_share_spot_snapshot, etf_spot_snapshot, index_spot_snapshot, to_quote_frame
+from core.metrics import observe
+from core.trading_calendar import get_trade_dates, is_trading_time
+from core.valuation_series import valuation_series
 
 try:
     import efinance as ef
@@ -27,46 +41,187 @@ try:
 except ImportError:
     HAS_ALL_QUOTES = False
 
+logger = get_logger(__name__)
+
+# 指数/ETF行情缓存（同一指数的基金共享一次行情请求）
+INDEX_QUOTE_TTL = 5
+_index_quote_cache = TTLCache(ttl=INDEX_QUOTE_TTL, maxsize=2000)
+
+# 基金持仓缓存（持仓来自季报，进程内共享，避免每个请求都重新下载）
+PORTFOLIO_CACHE_TTL = 6 * 60 * 60
+_portfolio_cache = TTLCache(ttl=PORTFOLIO_CACHE_TTL, maxsize=5000)
+
+# 行情请求合并（同一时刻请求相同股票集合的多个请求只访问一次上游）
+_quote_flight = SingleFlight()
+
+# akshare 备用接口缓存：按 (基金代码, 年份) 缓存已按季度索引的持仓，基金名称表按代码索引
+AKSHARE_HOLDINGS_TTL = 6 * 60 * 60
+AKSHARE_FUND_NAMES_TTL = 24 * 60 * 60
+# 未获取到数据时的缓存时间（秒），避免短时间内反复下载
+AKSHARE_EMPTY_TTL = 10 * 60
+_akshare_holdings_cache = TTLCache(ttl=AKSHARE_HOLDINGS_TTL, maxsize=2000)
+_akshare_fund_names_cache = TTLCache(ttl=AKSHARE_FUND_NAMES_TTL)
+_akshare_flight = SingleFlight()
+
+# efinance 逐只查询行情的并发线程数（所有请求共享，避免对上游造成突发压力）
+EFINANCE_QUOTE_WORKERS = 8
+_efinance_executor = ThreadPoolExecutor(max_workers=EFINANCE_QUOTE_WORKERS, thread_name_prefix='efinance-quote')
+
+
+def _fetch_efinance_quote(code):
+    """通过 efinance 获取单只A股的行情快照，返回统一格式的字典，失败时返回None"""
+    data = ef.stock.get_quote_snapshot(code)
+    if data is None:
+        return None
+    change_value = data.get('涨跌幅', 0)
+    return {
+        '代码': data.get('代码', code),
+        '名称': data.get('名称', code),
+        '最新价': data.get('最新价', 0),
+        '涨跌幅': f"{change_value:+.2f}%",
+        '成交量': data.get('成交量', 0),
+        '成交额': data.get('成交额', 0)
+    }
+
+
+def _fetch_efinance_quotes(codes, timeout):
+    """
+    并发获取多只A股的 efinance 行情快照
+
+    Parameters:
+    -----------
+    codes : list
+        A股代码列表
+    timeout : float
+        整批请求的截止时间（秒），超时未返回的代码视为缺失
+
+    Returns:
+    --------
+    tuple
+        (行情字典列表（按代码原顺序）, 缺失的代码列表)
+    """
+    futures = {code: _efinance_executor.submit(_fetch_efinance_quote, code) for code in codes}
+    wait(futures.values(), timeout=timeout)
+
+    stock_list = []
+    missing_codes = []
+    for code, future in futures.items():
+        if not future.done():
+            future.cancel()
+            missing_codes.append(code)
+            continue
+        try:
+            quote = future.result()
+        except Exception:
+            quote = None
+        if quote is None:
+            missing_codes.append(code)
+        else:
+            stock_list.append(quote)
+    return stock_list, missing_codes
+
 
-def is_trading_time():
+def _parse_quarter_label(label):
+    """将 "2024年第3季度" 形式的季度标签解析为 (2024, 3)，无法解析时返回None"""
+    match = re.match(r'\s*(\d{4})年\s*第?\s*(\d)\s*季度', str(label))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _index_quarters(raw_data):
     """
-    判断当前是否为交易时间（周一至周五 9:30-11:30, 13:00-15:00）
+    按季度拆分 akshare 持仓数据
 
     Returns:
-        bool: True表示交易时间
+    --------
+    dict
+        {'quarters': {季度标签: 持仓 DataFrame}, 'latest': 最新季度标签, 'all': 全部数据（无'季度'列时使用）}
+    """
+    if raw_data is None or raw_data.empty:
+        return {'quarters': {}, 'latest': None, 'all': None}
+    if '季度' not in raw_data.columns:
+        return {'quarters': {}, 'latest': None, 'all': raw_data}
+    quarters = {label: frame.reset_index(drop=True) for label, frame in raw_data.groupby('季度', sort=False)}
+    # 优先按解析出的年份和季度取最新，无法解析时沿用数据中的最后一个季度
+    parsed = {label: _parse_quarter_label(label) for label in quarters}
+    if all(parsed.values()):
+        latest = max(quarters, key=parsed.get)
+    else:
+        latest = raw_data['季度'].iloc[-1]
+    return {'quarters': quarters, 'latest': latest, 'all': raw_data}
+
+
+def _download_akshare_holdings(fund_code, year):
+    index = _index_quarters(ak.fund_portfolio_hold_em(symbol=fund_code, date=year))
+    ttl = AKSHARE_EMPTY_TTL if index['all'] is None else None
+    _akshare_holdings_cache.set((fund_code, year), index, ttl=ttl)
+    return index
+
+
+def get_akshare_holdings(fund_code, year):
     """
-    now = datetime.now()
+    获取 akshare 基金持仓（按 (基金代码, 年份) 缓存，已按季度索引）
 
-    # 检查是否为工作日（周一至周五）
-    if now.weekday() >= 5:  # 5=周六, 6=周日
-        return False
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+    year : str
+        年份，格式"YYYY"
 
-    # 检查是否在交易时间段
-    current_time = now.time()
-    morning_start = time(9, 30)
-    morning_end = time(11, 30)
-    afternoon_start = time(13, 0)
-    afternoon_end = time(15, 0)
+    Returns:
+    --------
+    dict
+        _index_quarters 的返回值，缓存对象只读共享
+    """
+    index = _akshare_holdings_cache.get((fund_code, year))
+    if index is None:
+        index, _ = _akshare_flight.do(('holdings', fund_code, year), _download_akshare_holdings, fund_code, year)
+    return index
 
-    if not ((morning_start <= current_time <= morning_end) or (afternoon_start <= current_time <= afternoon_end)):
-        return False
 
-    # 检查是否为法定节假日（使用 efinance）
-    if HAS_EFINANCE:
-        try:
-            # 获取交易日历
-            trade_date = now.strftime("%Y-%m-%d")
-            trade_calendar = ef.stock.get_trade_calendar()
-            if trade_calendar is not None and not trade_calendar.empty:
-                # 检查今天是否为交易日
-                is_trading_day = trade_date['交易日期'].apply(lambda x: x.strftime("%Y-%m-%d")).isin([trade_date]).any()
-                return is_trading_day
-        except Exception:
-            pass
+def _download_akshare_fund_names():
+    table = ak.fund_name_em()
+    names = dict(zip(table['基金代码'].astype(str), table['基金简称'])) if table is not None else {}
+    _akshare_fund_names_cache.set('names', names, ttl=None if names else AKSHARE_EMPTY_TTL)
+    return names
 
-    # 如果无法获取交易日历，返回当前时间判断结果
-    return True
 
+def get_akshare_fund_name(fund_code):
+    """
+    通过 akshare 基金名称表查询基金简称（全表按代码索引后缓存）
+
+    Returns:
+    --------
+    str
+        基金简称，未找到时返回None
+    """
+    names = _akshare_fund_names_cache.get('names')
+    if names is None:
+        names, _ = _akshare_flight.do('fund_names', _download_akshare_fund_names)
+    return names.get(fund_code)
+
+
+def get_known_portfolios():
+    """
+    获取进程内已加载的全部基金持仓（同一基金优先使用自动检测的最新季度）
+
+    Returns:
+    --------
+    dict
+        {基金代码: 重仓股持仓 DataFrame}
+    """
+    portfolios = {}
+    for (fund_code, year), (portfolio, *_) in _portfolio_cache.items():
+        if year is None or fund_code not in portfolios:
+            portfolios[fund_code] = portfolio
+    return portfolios
+
+
+def parse_percent(value):
+    """将 "1.23%" / 1.23 形式的百分数转换为小数，缺失时返回0"""
+    if pd.isna(value):
+        return 0
+    return float(str(value).rstrip('%').rstrip('％')) / 100
 
 
 class FundRealtimeCalculator:
@@ -79,9 +234,6 @@ class FundRealtimeCalculator:
         self.stock_quotes = None  # 股票实时行情
         self.last_nav = None  # 最新净值
         self.calc_result = None  # 计算结果
-        # 本地基金信息缓存
-        self.local_fund_info = None
-        self.local_fund_info_loaded = False
         # 缓存基金名称信息（带过期时间）
         self.fund_name_cache = {
             '110011': {'name': '易方达优质精选混合(QDII)', 'expire': 0},
@@ -136,13 +288,69 @@ class FundRealtimeCalculator:
             年份字符串，格式为 "YYYY"
         """
         latest = self.get_latest_quarter()
-        print(f"当前时间: {datetime.now().strftime('%Y-%m-%d')}")
-        print(f"最新可用季度: {latest['year']}年 第{latest['quarter']}季度")
+        logger.debug("当前时间: %s", datetime.now().strftime('%Y-%m-%d'))
+        logger.debug("最新可用季度: %s年 第%s季度", latest['year'], latest['quarter'])
         return str(latest['year'])
     
     def get_fund_portfolio(self, fund_code, year=None, auto_detect_latest=True):
         """
-        获取基金重仓股持仓信息
+        获取基金重仓股持仓信息（优先使用进程内持仓缓存和本地持仓库）
+        
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+        year : str
+            年份，格式"YYYY"，默认自动检测最新季度
+        auto_detect_latest : bool
+            是否自动检测最新季度，默认True；为False且未指定年份时按当年获取（与指定当年共用缓存）
+            
+        Returns:
+        --------
+        pd.DataFrame
+            重仓股持仓数据
+        """
+        start = perf_counter()
+        if year is None and not auto_detect_latest:
+            # 不自动检测时使用当年持仓，与显式指定当年等价；缓存键中 year 为 None 只表示自动检测的最新持仓
+            year = str(datetime.now().year)
+        cache_key = (fund_code, year)
+        cached = _portfolio_cache.get(cache_key)
+        # 本地持仓库已更新到新的报告期（见 core/holdings_refresh.py）时不再使用旧的缓存持仓
+        if cached is not None and year is None:
+            store_quarter = get_holdings_store().get_quarter(fund_code)
+            if store_quarter is not None and store_quarter != cached[2]:
+                cached = None
+        if cached is not None:
+            self.fund_code = fund_code
+            portfolio, self.fund_name, _ = cached
+            self.portfolio = portfolio.copy()
+            logger.debug("从持仓缓存获取基金【%s】的 %s 只重仓股数据", fund_code, len(self.portfolio))
+            observe('portfolio', perf_counter() - start, source='cache')
+            return self.portfolio
+        
+        # 最新持仓优先查本地持仓库（由 scripts/crawl_fund_holdings.py 批量生成）
+        if year is None:
+            portfolio = get_holdings_store().get_portfolio(fund_code)
+            if portfolio is not None and not portfolio.empty:
+                self.fund_code = fund_code
+                self.fund_name = get_fund_dataset().get_name(fund_code) or f'基金{fund_code}'
+                self.portfolio = portfolio
+                _portfolio_cache.set(cache_key, (portfolio.copy(), self.fund_name, portfolio['季度'].iloc[0]))
+                logger.debug("从本地持仓库获取基金【%s】的 %s 只重仓股数据（%s）", fund_code, len(portfolio), portfolio['季度'].iloc[0])
+                observe('portfolio', perf_counter() - start, source='store')
+                return self.portfolio
+        
+        portfolio = self._fetch_fund_portfolio(fund_code, year=year, auto_detect_latest=auto_detect_latest)
+        found = portfolio is not None and not portfolio.empty
+        if found:
+            _portfolio_cache.set(cache_key, (portfolio.copy(), self.fund_name, None))
+        observe('portfolio', perf_counter() - start, status='ok' if found else 'error', source='upstream')
+        return portfolio
+    
+    def _fetch_fund_portfolio(self, fund_code, year=None, auto_detect_latest=True):
+        """
+        从上游接口获取基金重仓股持仓信息
         
         Parameters:
         -----------
@@ -159,21 +367,22 @@ class FundRealtimeCalculator:
             重仓股持仓数据
         """
         try:
-            print(f"正在获取基金【{fund_code}】的最新持仓数据...")
+            logger.debug("正在获取基金【%s】的最新持仓数据...", fund_code)
             self.fund_code = fund_code
             
             # 优先使用 efinance 接口获取最新持仓数据
             if HAS_EFINANCE:
-                print(f"方法1: 尝试 efinance 接口获取基金持仓...")
+                logger.debug("方法1: 尝试 efinance 接口获取基金持仓...")
                 try:
                     # 直接获取最新持仓，不需要指定年份和季度
                     raw_data = ef.fund.get_invest_position(fund_code)
                     
                     if raw_data is not None and not raw_data.empty:
-                        print(f"efinance 接口成功获取持仓数据")
+                        logger.debug("efinance 接口成功获取持仓数据")
                         
                         # 获取基金名称
                         # 优化：缓存基金名称信息（带过期时间）
+                        name_start = perf_counter()
                         try:
                             # 优先使用本地缓存
                             cache_valid = False
@@ -195,54 +404,15 @@ class FundRealtimeCalculator:
                                 # 优先使用本地缓存的基金信息
                                 name_found = False
                                 
-                                # 方法0: 本地缓存（最快）
-                                if not self.local_fund_info_loaded:
-                                    try:
-                                        import json
-                                        cache_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info.json')
-                                        with open(cache_path, 'r', encoding='utf-8') as f:
-                                            self.local_fund_info = json.load(f)
-                                            self.local_fund_info_loaded = True
-                                        print(f"成功加载本地基金信息缓存，共 {len(self.local_fund_info)} 只基金")
-                                    except Exception as e:
-                                        print(f"加载本地基金信息缓存失败: {e}")
-                                        self.local_fund_info = None
-                                        self.local_fund_info_loaded = True
-                                
-                                # 检查基金代码是否在本地缓存中
-                                code_in_cache = False
-                                if self.local_fund_info and fund_code in self.local_fund_info:
-                                    fund_info = self.local_fund_info[fund_code]
-                                    # 如果是字典格式，提取名称字段
-                                    if isinstance(fund_info, dict):
-                                        self.fund_name = fund_info.get('名称', f'基金{fund_code}')
-                                    else:
-                                        self.fund_name = fund_info
+                                # 方法0: 本地基金信息数据集（最快，后台热加载，不会因缺失触发全量爬取）
+                                fund_dataset = get_fund_dataset()
+                                local_name = fund_dataset.get_name(fund_code)
+                                if local_name:
+                                    self.fund_name = local_name
                                     name_found = True
-                                    code_in_cache = True
-                                    print(f"从本地缓存获取基金名称: {self.fund_name}")
-                                
-                                # 如果基金代码不在缓存中，自动更新基金信息
-                                if not code_in_cache:
-                                    print(f"基金代码 {fund_code} 不在本地缓存中，开始更新基金信息...")
-                                    try:
-                                        # 导入更新脚本
-                                        from scripts.update_fund_info import update_fund_info
-                                        updated_fund_dict = update_fund_info()
-                                        if updated_fund_dict and fund_code in updated_fund_dict:
-                                            self.local_fund_info = updated_fund_dict
-                                            fund_info = updated_fund_dict[fund_code]
-                                            # 如果是字典格式，提取名称字段
-                                            if isinstance(fund_info, dict):
-                                                self.fund_name = fund_info.get('名称', f'基金{fund_code}')
-                                            else:
-                                                self.fund_name = fund_info
-                                            name_found = True
-                                            print(f"更新基金信息成功，获取基金名称: {self.fund_name}")
-                                        else:
-                                            print(f"更新基金信息后仍未找到 {fund_code}")
-                                    except Exception as e:
-                                        print(f"自动更新基金信息失败: {e}")
+                                    logger.debug("从本地缓存获取基金名称: %s", self.fund_name)
+                                else:
+                                    logger.debug("基金代码 %s 不在本地缓存中，尝试在线获取基金名称...", fund_code)
                                 
                                 # 方法1: efinance（次快）
                                 if not name_found:
@@ -257,14 +427,9 @@ class FundRealtimeCalculator:
                                 # 方法2: akshare基金名称接口（缓存优化）
                                 if not name_found:
                                     try:
-                                        # 缓存akshare基金名称数据
-                                        if not hasattr(self, 'akshare_name_cache'):
-                                            # 只在第一次调用时获取全部基金名称
-                                            self.akshare_name_cache = ak.fund_name_em()
-                                        
-                                        fund_name_match = self.akshare_name_cache[self.akshare_name_cache['基金代码'] == fund_code]
-                                        if not fund_name_match.empty:
-                                            self.fund_name = fund_name_match.iloc[0]['基金简称']
+                                        fund_name = get_akshare_fund_name(fund_code)
+                                        if fund_name:
+                                            self.fund_name = fund_name
                                             name_found = True
                                     except:
                                         pass
@@ -300,10 +465,11 @@ class FundRealtimeCalculator:
                                     'expire': datetime.now().timestamp() + 7 * 24 * 60 * 60  # 7天有效期
                                 }
                             
-                            print(f"基金名称: {self.fund_name}")
+                            logger.debug("基金名称: %s", self.fund_name)
                         except Exception as e:
                             self.fund_name = f'基金{fund_code}'
-                            print(f"基金名称: {self.fund_name}")
+                            logger.debug("基金名称: %s", self.fund_name)
+                        observe('fund_name', perf_counter() - name_start)
                         
                         # 重命名列以匹配后续处理逻辑
                         column_mapping = {}
@@ -330,71 +496,70 @@ class FundRealtimeCalculator:
                             raw_data = raw_data.rename(columns=column_mapping)
                         
                         self.portfolio = raw_data.copy()
-                        print(f"成功获取 {len(self.portfolio)} 只重仓股数据")
+                        logger.debug("成功获取 %s 只重仓股数据", len(self.portfolio))
                         return self.portfolio
                     else:
-                        print("efinance 接口未获取到持仓数据，尝试其他方法...")
+                        logger.debug("efinance 接口未获取到持仓数据，尝试其他方法...")
                 except Exception as e:
-                    print(f"efinance 接口失败: {e}，尝试其他方法...")
+                    logger.warning("efinance 接口失败: %s，尝试其他方法...", e)
             
             # 备用方法：使用 akshare 接口获取持仓数据
-            print(f"方法2: 尝试 akshare 接口获取基金持仓...")
+            logger.debug("方法2: 尝试 akshare 接口获取基金持仓...")
             # 自动检测最新季度
             if year is None and auto_detect_latest:
                 year = self.get_latest_report_date()
             elif year is None:
                 year = str(datetime.now().year)
             
-            raw_data = ak.fund_portfolio_hold_em(symbol=fund_code, date=year)
+            holdings = get_akshare_holdings(fund_code, year)
             
-            if raw_data is not None and not raw_data.empty:
+            if holdings['all'] is not None:
                 # 筛选最新季度的数据
                 quarter_info = self.get_latest_quarter()
                 target_quarter = f"{quarter_info['year']}年第{quarter_info['quarter']}季度"
                 
                 # 检查数据中是否有'季度'字段
-                if '季度' in raw_data.columns:
+                if holdings['quarters']:
                     # 筛选目标季度
-                    self.portfolio = raw_data[raw_data['季度'] == target_quarter].copy()
+                    portfolio = holdings['quarters'].get(target_quarter)
                     
-                    if self.portfolio.empty:
-                        print(f"警告：未找到{target_quarter}的数据")
-                        print(f"可用季度: {raw_data['季度'].unique()}")
+                    if portfolio is None:
+                        logger.warning("未找到%s的数据", target_quarter)
+                        logger.debug("可用季度: %s", list(holdings['quarters']))
                         
                         # 如果找不到目标季度，使用最新的可用季度
-                        latest_available = raw_data['季度'].iloc[-1]
-                        print(f"使用最新可用季度: {latest_available}")
-                        self.portfolio = raw_data[raw_data['季度'] == latest_available].copy()
+                        logger.debug("使用最新可用季度: %s", holdings['latest'])
+                        portfolio = holdings['quarters'][holdings['latest']]
+                    self.portfolio = portfolio.copy()
                 else:
                     # 如果没有季度字段，直接使用全部数据
-                    print("警告：数据中未找到'季度'字段，使用全部数据")
-                    self.portfolio = raw_data.copy()
+                    logger.warning("数据中未找到'季度'字段，使用全部数据")
+                    self.portfolio = holdings['all'].copy()
                 
                 if not self.portfolio.empty:
-                    print(f"成功获取 {len(self.portfolio)} 只重仓股数据")
+                    logger.debug("成功获取 %s 只重仓股数据", len(self.portfolio))
                     
                     # 显示使用的季度信息
                     if '季度' in self.portfolio.columns:
                         used_quarter = self.portfolio['季度'].iloc[0]
-                        print(f"使用季度数据: {used_quarter}")
+                        logger.debug("使用季度数据: %s", used_quarter)
                     
                     # 获取基金名称
-                    fund_info = ak.fund_name_em()
-                    fund_name_match = fund_info[fund_info['基金代码'] == fund_code]
-                    if not fund_name_match.empty:
-                        self.fund_name = fund_name_match.iloc[0]['基金简称']
-                        print(f"基金名称: {self.fund_name}")
+                    fund_name = get_akshare_fund_name(fund_code)
+                    if fund_name:
+                        self.fund_name = fund_name
+                        logger.debug("基金名称: %s", self.fund_name)
                     
                     return self.portfolio
                 else:
-                    print("未获取到重仓股数据")
+                    logger.debug("未获取到重仓股数据")
                     return None
             else:
-                print("未获取到重仓股数据")
+                logger.debug("未获取到重仓股数据")
                 return None
                 
         except Exception as e:
-            print(f"获取基金持仓失败: {e}")
+            logger.warning("获取基金持仓失败: %s", e)
             return None
     
     def get_stock_realtime_quotes(self, stock_codes=None, timeout=10):
@@ -421,18 +586,42 @@ class FundRealtimeCalculator:
         try:
             if stock_codes is None:
                 if self.portfolio is None or self.portfolio.empty:
-                    print("请先获取基金持仓数据")
+                    logger.debug("请先获取基金持仓数据")
                     return None
                 stock_codes = self.portfolio['股票代码'].tolist()
 
+            # 休市期间行情不再变化，收盘快照中已有休市后获取的行情时不访问上游
+            quotes = closing_snapshot.get_quotes(stock_codes)
+            if quotes is not None:
+                logger.debug("从收盘快照获取 %s 只股票行情", len(quotes))
+                self.stock_quotes = quotes
+                return quotes
+
+            # 相同股票集合的并发请求合并为一次上游获取，结果只读共享
+            key = (frozenset(stock_codes), timeout)
+            quotes, shared = _quote_flight.do(key, self._fetch_stock_realtime_quotes, stock_codes, timeout)
+            if shared:
+                logger.debug("共享进行中的行情请求结果（%s 只股票）", len(stock_codes))
+            else:
+                closing_snapshot.record_quotes(quotes)
+            self.stock_quotes = quotes
+            return quotes
+
+        except Exception as e:
+            logger.warning("获取股票行情失败: %s", e, exc_info=True)
+            return None
+
+    def _fetch_stock_realtime_quotes(self, stock_codes, timeout):
+        """依次尝试各行情接口获取股票行情，全部失败时返回None"""
+        try:
             # 判断是否为交易时间
             trading = is_trading_time()
             if trading:
-                print(f"\n当前为交易时间，将获取分时实时行情")
+                logger.debug("当前为交易时间，将获取分时实时行情")
             else:
-                print(f"\n当前为非交易时间，将获取最新收盘价信息")
+                logger.debug("当前为非交易时间，将获取最新收盘价信息")
 
-            print(f"正在获取 {len(stock_codes)} 只股票的实时行情...")
+            logger.debug("正在获取 %s 只股票的实时行情...", len(stock_codes))
 
             # 分离港股和A股代码
             hk_codes = [code for code in stock_codes if len(code) == 5 and code.isdigit()]
@@ -440,154 +629,126 @@ class FundRealtimeCalculator:
             
             # 优先使用统一接口获取所有股票行情
             if HAS_ALL_QUOTES:
-                print(f"尝试使用统一接口获取所有股票行情...")
+                logger.debug("尝试使用统一接口获取所有股票行情...")
                 all_quotes = get_all_stock_quotes(stock_codes, timeout=timeout)
                 if all_quotes is not None and not all_quotes.empty:
                     self.stock_quotes = all_quotes
-                    print(f"统一接口成功获取 {len(self.stock_quotes)}/{len(stock_codes)} 只股票行情")
+                    logger.debug("统一接口成功获取 %s/%s 只股票行情", len(self.stock_quotes), len(stock_codes))
                     return self.stock_quotes
                 else:
-                    print("统一接口未获取到股票行情数据，尝试其他方法...")
+                    logger.debug("统一接口未获取到股票行情数据，尝试其他方法...")
             
             # 备用方案：分离处理港股和A股
             # 处理港股
             hk_quotes = None
             if hk_codes and HAS_HK_QUOTES:
-                print(f"检测到 {len(hk_codes)} 只港股，使用港股专用接口获取行情...")
+                logger.debug("检测到 %s 只港股，使用港股专用接口获取行情...", len(hk_codes))
                 hk_quotes = get_hk_quotes(hk_codes, timeout=timeout)
                 if hk_quotes is not None and not hk_quotes.empty:
-                    print(f"港股接口成功获取 {len(hk_quotes)} 只港股行情")
+                    logger.debug("港股接口成功获取 %s 只港股行情", len(hk_quotes))
 
             # 处理A股
             a_quotes = None
             if a_codes:
-                print(f"\n处理 {len(a_codes)} 只A股...")
+                logger.debug("处理 %s 只A股...", len(a_codes))
 
                 # 优先尝试A股腾讯接口
                 try:
                     from get_a_stock_quotes import get_a_quotes_tencent
-                    print(f"方法1: 尝试 A股腾讯接口（超时{timeout}秒）...")
+                    logger.debug("方法1: 尝试 A股腾讯接口（超时%s秒）...", timeout)
                     a_quotes = get_a_quotes_tencent(a_codes, timeout=timeout)
                     if a_quotes is not None and not a_quotes.empty:
-                        print(f"A股腾讯接口成功获取 {len(a_quotes)}/{len(a_codes)} 只A股的实时行情")
+                        logger.debug("A股腾讯接口成功获取 %s/%s 只A股的实时行情", len(a_quotes), len(a_codes))
                         if trading:
-                            print("注: 当前为交易时间，价格和涨跌幅为实时数据")
+                            logger.debug("注: 当前为交易时间，价格和涨跌幅为实时数据")
                         else:
-                            print("注: 当前为非交易时间，价格为最新收盘价，涨跌幅为日涨跌幅")
+                            logger.debug("注: 当前为非交易时间，价格为最新收盘价，涨跌幅为日涨跌幅")
                 except ImportError:
-                    print("A股腾讯接口未安装，跳过")
+                    logger.debug("A股腾讯接口未安装，跳过")
 
                 # 方法2: efinance 接口
                 if (a_quotes is None or a_quotes.empty) and HAS_EFINANCE:
-                    print(f"方法2: 尝试 efinance 接口（超时{timeout}秒）...")
+                    logger.debug("方法2: 尝试 efinance 接口（超时%s秒）...", timeout)
                     try:
-                        stock_list = []
-                        missing_codes = []
-
-                        for code in a_codes:
-                            try:
-                                # 尝试获取股票实时行情
-                                data = ef.stock.get_quote_snapshot(code)
-
-                                if data is not None:
-                                    change_value = data.get('涨跌幅', 0)
-                                    if change_value >= 0:
-                                        change_str = f"+{change_value:.2f}%"
-                                    else:
-                                        change_str = f"{change_value:.2f}%"
-                                    stock_list.append({
-                                                '代码': data.get('代码', code),
-                                                '名称': data.get('名称', code),
-                                                '最新价': data.get('最新价', 0),
-                                                '涨跌幅': change_str,
-                                                '成交量': data.get('成交量', 0),
-                                                '成交额': data.get('成交额', 0)
-                                            })
-                                else:
-                                    missing_codes.append(code)
-                            except Exception as e:
-                                missing_codes.append(code)
-                                continue
+                        stock_list, missing_codes = _fetch_efinance_quotes(a_codes, timeout)
 
                         if stock_list:
                             a_quotes = pd.DataFrame(stock_list)
                             matched_count = len(a_quotes)
                             total_count = len(a_codes)
-                            print(f"方法2成功: 获取 {matched_count}/{total_count} 只A股的实时行情")
+                            logger.debug("方法2成功: 获取 %s/%s 只A股的实时行情", matched_count, total_count)
 
                             if matched_count < total_count and missing_codes:
-                                print(f"未找到的A股代码: {missing_codes}")
+                                logger.debug("未找到的A股代码: %s", missing_codes)
 
                             if trading:
-                                print("注: 当前为交易时间，价格和涨跌幅为实时数据")
+                                logger.debug("注: 当前为交易时间，价格和涨跌幅为实时数据")
                             else:
-                                print("注: 当前为非交易时间，价格为最新收盘价，涨跌幅为日涨跌幅")
+                                logger.debug("注: 当前为非交易时间，价格为最新收盘价，涨跌幅为日涨跌幅")
                         else:
-                            print("方法2: 未匹配到任何A股")
+                            logger.debug("方法2: 未匹配到任何A股")
                     except Exception as e1:
-                        print(f"方法2失败: {e1}")
+                        logger.warning("方法2失败: %s", e1)
                 else:
-                    print("方法2: efinance 未安装，跳过")
+                    logger.debug("方法2: efinance 未安装，跳过")
 
-                # 方法3: 东方财富实时行情接口
-                if (a_quotes is None or a_quotes.empty) and HAS_AKSHARE:
-                    print(f"方法3: 尝试东方财富接口（超时{timeout}秒）...")
+                # 方法3: 东方财富全市场A股快照（后台每个 tick 刷新一次，按代码在内存中查询）
+                if a_quotes is None or a_quotes.empty:
+                    logger.debug("方法3: 尝试东方财富全市场A股快照...")
                     try:
-                        all_stocks = ak.stock_zh_a_spot_em()
-                        a_quotes = all_stocks[all_stocks['代码'].isin(a_codes)]
+                        a_share_spot_snapshot.start_background_refresh()
+                        snapshot = a_share_spot_snapshot.lookup_many(a_codes)
 
-                        if a_quotes is not None and not a_quotes.empty:
+                        if snapshot is not None and not snapshot.empty:
+                            a_quotes = to_quote_frame(snapshot)
                             matched_count = len(a_quotes)
                             total_count = len(a_codes)
-                            print(f"方法3成功: 获取 {matched_count}/{total_count} 只A股的实时行情")
+                            logger.debug("方法3成功: 获取 %s/%s 只A股的实时行情", matched_count, total_count)
 
                             if matched_count < total_count:
-                                matched_codes = set(a_quotes['代码'].tolist())
-                                missing_codes = set(a_codes) - matched_codes
+                                missing_codes = set(a_codes) - set(a_quotes['代码'])
                                 if missing_codes:
-                                    print(f"未找到的股票代码: {missing_codes}")
+                                    logger.debug("未找到的股票代码: %s", missing_codes)
 
                             if trading:
-                                print("注: 当前为交易时间，价格和涨跌幅为实时数据")
+                                logger.debug("注: 当前为交易时间，价格和涨跌幅为实时数据")
                             else:
-                                print("注: 当前为非交易时间，价格为最新收盘价，涨跌幅为日涨跌幅")
+                                logger.debug("注: 当前为非交易时间，价格为最新收盘价，涨跌幅为日涨跌幅")
                         else:
-                            print("方法3: 未匹配到任何A股")
+                            logger.debug("方法3: 未匹配到任何A股")
                     except Exception as e2:
-                        print(f"方法3失败: {e2}")
+                        logger.warning("方法3失败: %s", e2)
 
             # 合并港股和A股行情
             if hk_quotes is not None and not hk_quotes.empty and a_quotes is not None and not a_quotes.empty:
                 self.stock_quotes = pd.concat([hk_quotes, a_quotes], ignore_index=True)
-                print(f"\n总计获取 {len(self.stock_quotes)} 只股票的实时行情")
+                logger.debug("总计获取 %s 只股票的实时行情", len(self.stock_quotes))
                 return self.stock_quotes
             elif hk_quotes is not None and not hk_quotes.empty:
                 self.stock_quotes = hk_quotes
-                print(f"\n总计获取 {len(self.stock_quotes)} 只股票的实时行情")
+                logger.debug("总计获取 %s 只股票的实时行情", len(self.stock_quotes))
                 return self.stock_quotes
             elif a_quotes is not None and not a_quotes.empty:
                 self.stock_quotes = a_quotes
-                print(f"\n总计获取 {len(self.stock_quotes)} 只股票的实时行情")
+                logger.debug("总计获取 %s 只股票的实时行情", len(self.stock_quotes))
                 return self.stock_quotes
             else:
                 # 备用方案：使用统一接口获取所有股票行情
                 if HAS_ALL_QUOTES:
-                    print(f"\n尝试使用统一接口获取所有股票行情...")
+                    logger.debug("尝试使用统一接口获取所有股票行情...")
                     all_quotes = get_all_stock_quotes(stock_codes, timeout=timeout)
                     if all_quotes is not None and not all_quotes.empty:
                         self.stock_quotes = all_quotes
-                        print(f"统一接口成功获取 {len(self.stock_quotes)}/{len(stock_codes)} 只股票行情")
+                        logger.debug("统一接口成功获取 %s/%s 只股票行情", len(self.stock_quotes), len(stock_codes))
                         return self.stock_quotes
                     else:
-                        print("统一接口也未获取到股票行情数据")
+                        logger.debug("统一接口也未获取到股票行情数据")
                 
-                print("所有方法均未获取到股票行情数据")
+                logger.warning("所有方法均未获取到股票行情数据")
                 return None
 
         except Exception as e:
-            print(f"获取股票行情失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("获取股票行情失败: %s", e, exc_info=True)
             return None
 
     def is_index_fund(self):
@@ -599,35 +760,43 @@ class FundRealtimeCalculator:
         bool
             True表示是指数型基金
         """
-        if not self.local_fund_info_loaded:
-            # 尝试加载本地基金信息
-            try:
-                import json
-                cache_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info.json')
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    self.local_fund_info = json.load(f)
-                    self.local_fund_info_loaded = True
-            except Exception as e:
-                print(f"加载本地基金信息失败: {e}")
-                return False
+        fund_type = get_fund_dataset().get_type(self.fund_code)
+        return fund_type.startswith(INDEX_FUND_TYPES)
 
-        if self.fund_code in self.local_fund_info:
-            fund_info = self.local_fund_info[self.fund_code]
-            if isinstance(fund_info, dict):
-                fund_type = fund_info.get('类型', '')
-            else:
-                fund_type = ''
-            return fund_type.startswith('指数型-股票') or fund_type.startswith('指数型-海外股票')
-        return False
+    def get_index_etf_quotes(self, index_code, kind='index'):
+        """
+        获取指数或ETF的实时行情（短时间内复用缓存）
+
+        Parameters:
+        -----------
+        index_code : str
+            指数或ETF代码
+        kind : str
+            'index'（指数）或 'etf'，与跟踪标的映射表一致
 
-    def get_index_etf_quotes(self, index_code):
+        Returns:
+        --------
+        dict
+            指数或ETF的实时行情数据
+        """
+        cache_key = (kind, index_code)
+        quote = _index_quote_cache.get(cache_key)
+        if quote is None:
+            quote = self._fetch_index_etf_quotes(index_code, kind)
+            if quote is not None:
+                _index_quote_cache.set(cache_key, quote)
+        return quote
+
+    def _fetch_index_etf_quotes(self, index_code, kind='index'):
         """
-        获取指数或ETF的实时行情
+        从上游接口获取指数或ETF的实时行情
 
         Parameters:
         -----------
         index_code : str
             指数或ETF代码
+        kind : str
+            'index'（指数）或 'etf'
 
         Returns:
         --------
@@ -635,10 +804,11 @@ class FundRealtimeCalculator:
             指数或ETF的实时行情数据
         """
         try:
-            print(f"正在获取指数/ETF【{index_code}】的实时行情...")
+            logger.debug("正在获取%s【%s】的实时行情...", '指数' if kind == 'index' else 'ETF', index_code)
             
-            # 优先使用 efinance 接口
-            if HAS_EFINANCE:
+            # ETF 代码全市场唯一，优先使用 efinance 接口；
+            # 指数代码（如 000905、000016）与深市股票代码重复，efinance 按裸代码会查到同代码的股票，只查指数快照
+            if HAS_EFINANCE and kind == 'etf':
                 try:
                     data = ef.stock.get_quote_snapshot(index_code)
                     if data is not None:
@@ -649,40 +819,25 @@ class FundRealtimeCalculator:
                             '涨跌幅': f"{data.get('涨跌幅', 0):+.2f}%"
                         }
                 except Exception as e:
-                    print(f"efinance 接口获取指数行情失败: {e}")
+                    logger.warning("efinance 接口获取ETF行情失败: %s", e)
             
-            # 备用方法：使用 akshare 接口
+            # 查询共享的指数/ETF全市场快照（每个 tick 最多下载一次）
             try:
-                if index_code.startswith('000') or index_code.startswith('399'):
-                    # 大盘指数
-                    index_data = ak.stock_zh_index_spot_em()
-                    index_data = index_data[index_data['代码'] == index_code]
-                    if not index_data.empty:
-                        row = index_data.iloc[0]
-                        return {
-                            '代码': index_code,
-                            '名称': row['名称'],
-                            '最新价': row['最新价'],
-                            '涨跌幅': f"{row['涨跌幅']:+.2f}%"
-                        }
-                else:
-                    # ETF
-                    etf_data = ak.fund_etf_spot_em()
-                    etf_data = etf_data[etf_data['代码'] == index_code]
-                    if not etf_data.empty:
-                        row = etf_data.iloc[0]
-                        return {
-                            '代码': index_code,
-                            '名称': row['名称'],
-                            '最新价': row['最新价'],
-                            '涨跌幅': f"{row['涨跌幅']:+.2f}%"
-                        }
+                snapshot = index_spot_snapshot if kind == 'index' else etf_spot_snapshot
+                row = snapshot.lookup(index_code)
+                if row is not None and pd.notna(row.get('涨跌幅')):
+                    return {
+                        '代码': index_code,
+                        '名称': row.get('名称', index_code),
+                        '最新价': row.get('最新价'),
+                        '涨跌幅': f"{row['涨跌幅']:+.2f}%"
+                    }
             except Exception as e:
-                print(f"akshare 接口获取指数行情失败: {e}")
+                logger.warning("akshare 接口获取指数行情失败: %s", e)
             
             return None
         except Exception as e:
-            print(f"获取指数/ETF行情失败: {e}")
+            logger.warning("获取指数/ETF行情失败: %s", e)
             return None
 
     def calculate_realtime_value(self):
@@ -697,45 +852,21 @@ class FundRealtimeCalculator:
         if self.portfolio is None or self.portfolio.empty:
             # 检查是否为指数型基金
             if self.is_index_fund():
-                print("\n" + "="*60)
-                print("基金为指数型，尝试使用指数/ETF估算估值...")
-                print("="*60)
+                logger.debug("基金为指数型，尝试使用指数/ETF估算估值...")
                 
-                # 这里可以根据基金代码映射对应的指数或ETF代码
-                # 简单起见，我们假设指数型基金名称中包含对应的指数名称
+                # 查预先生成的跟踪标的映射表（未覆盖时按基金名称匹配常用指数）
                 index_code = None
-                if self.fund_name:
-                    # 示例：根据基金名称提取指数代码
-                    fund_name_lower = self.fund_name.lower()
-                    if '沪深300' in self.fund_name or 'hs300' in fund_name_lower:
-                        index_code = '000300'
-                    elif '中证500' in self.fund_name or 'zz500' in fund_name_lower:
-                        index_code = '000905'
-                    elif '上证指数' in self.fund_name or 'sh000001' in fund_name_lower or '上证指数etf' in fund_name_lower:
-                        index_code = '000001'
-                    elif '深证成指' in self.fund_name or 'sz399001' in fund_name_lower:
-                        index_code = '399001'
-                    elif '创业板指' in self.fund_name or 'cyb' in fund_name_lower or '创业板' in self.fund_name:
-                        index_code = '399006'
-                    elif '医药100' in self.fund_name or '中证医药100' in self.fund_name:
-                        index_code = '000933'  # 中证医药100指数
-                    elif '上证50' in self.fund_name or 'sh000016' in fund_name_lower:
-                        index_code = '000016'  # 上证50指数
-                    elif '中证100' in self.fund_name or 'zz100' in fund_name_lower:
-                        index_code = '000903'  # 中证100指数
-                    elif '中证800' in self.fund_name or 'zz800' in fund_name_lower:
-                        index_code = '000906'  # 中证800指数
-                    elif '中小板指' in self.fund_name or 'sz399005' in fund_name_lower:
-                        index_code = '399005'  # 中小板指数
-                    elif '科创50' in self.fund_name or 'kcb50' in fund_name_lower:
-                        index_code = '000688'  # 科创50指数
+                target = get_index_target(self.fund_code, self.fund_name)
+                if target:
+                    index_code = target['code']
+                    logger.debug("跟踪标的: %s（%s）", target.get('name', index_code), index_code)
                 
                 if index_code:
-                    index_data = self.get_index_etf_quotes(index_code)
+                    index_data = self.get_index_etf_quotes(index_code, target.get('kind', 'index'))
                     if index_data:
-                        print(f"成功获取指数【{index_code}】的实时行情")
-                        print(f"指数名称: {index_data['名称']}")
-                        print(f"指数涨跌幅: {index_data['涨跌幅']}")
+                        logger.debug("成功获取指数【%s】的实时行情", index_code)
+                        logger.debug("指数名称: %s", index_data['名称'])
+                        logger.debug("指数涨跌幅: %s", index_data['涨跌幅'])
                         
                         # 使用指数涨跌幅作为基金估值
                         weighted_change = float(index_data['涨跌幅'].rstrip('%')) / 100
@@ -750,21 +881,20 @@ class FundRealtimeCalculator:
                         }
                         
                         self.calc_result = result
+                        self._record_series(weighted_change)
                         return result
                 
-                print("未找到对应指数/ETF代码，无法估算估值")
+                logger.debug("未找到对应指数/ETF代码，无法估算估值")
                 return None
             else:
-                print("请先获取基金持仓数据")
+                logger.debug("请先获取基金持仓数据")
                 return None
 
         if self.stock_quotes is None or self.stock_quotes.empty:
-            print("请先获取股票实时行情")
+            logger.debug("请先获取股票实时行情")
             return None
 
-        print("\n" + "="*60)
-        print("开始计算基金实时估值（重仓股涨跌幅加权）...")
-        print("="*60)
+        logger.debug("开始计算基金实时估值（重仓股涨跌幅加权）...")
 
         # 合并持仓和行情数据
         merged = pd.merge(
@@ -776,24 +906,20 @@ class FundRealtimeCalculator:
         )
 
         if merged.empty:
-            print("持仓和行情数据合并失败")
+            logger.warning("持仓和行情数据合并失败")
             return None
 
         # 处理涨跌幅数据（去掉%符号并转换为数值）
-        merged['涨跌幅_num'] = merged['涨跌幅'].apply(
-            lambda x: float(str(x).rstrip('%').rstrip('％')) / 100 if pd.notna(x) else 0
-        )
+        merged['涨跌幅_num'] = merged['涨跌幅'].apply(parse_percent)
 
         # 加权平均法：根据持仓比例加权
-        merged['持仓比例_num'] = merged['占净值比例'].apply(
-            lambda x: float(str(x).rstrip('%').rstrip('％')) / 100 if pd.notna(x) else 0
-        )
+        merged['持仓比例_num'] = merged['占净值比例'].apply(parse_percent)
 
         # 加权平均涨跌幅
         weighted_change = (merged['涨跌幅_num'] * merged['持仓比例_num']).sum()
 
-        print(f"\n重仓股加权平均涨跌幅: {weighted_change*100:.2f}%")
-        print(f"重仓股合计持仓比例: {merged['持仓比例_num'].sum()*100:.2f}%")
+        logger.debug("重仓股加权平均涨跌幅: %.2f%%", weighted_change*100)
+        logger.debug("重仓股合计持仓比例: %.2f%%", merged['持仓比例_num'].sum()*100)
 
         # 整理输出结果，确保涨跌幅带有+/-号
         result = merged[['股票代码', '股票名称', '最新价']].copy()
@@ -825,8 +951,14 @@ class FundRealtimeCalculator:
             'calc_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
+        self._record_series(weighted_change)
         return self.calc_result
 
+    def _record_series(self, weighted_change):
+        """交易时间内将估值记录到当日估值序列"""
+        if is_trading_time():
+            valuation_series.record(self.fund_code, weighted_change)
+
     def print_result(self, result=None):
         """
         打印计算结果
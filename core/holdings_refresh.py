@@ -0,0 +1,198 @@
+"""
+报告季持仓刷新
+基金季报在季度结束后的数周内陆续公布，报告季（1、4、7、10月的前 REPORT_SEASON_END_DAY 天）内
+后台线程按请求热度从高到低逐只探测持仓尚未更新到最新报告期的基金：只查询持仓公布日期列表，
+公布了新一期持仓的基金才重新下载持仓并写回本地持仓库（各 worker 进程按文件修改时间自动重新加载），
+其余基金不再重复下载。每只基金的持仓报告期、最近探测和更新时间记录在 cache/holdings_meta.json
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    import efinance as ef
+    HAS_EFINANCE = True
+except ImportError:
+    HAS_EFINANCE = False
+
+from core.fund_realtime_calc import FundRealtimeCalculator, get_known_portfolios
+from core.holdings_store import get_holdings_store, update_holdings_store
+from core.log import get_logger
+from core.popularity import fund_popularity, shared_popularity
+from core.process_lock import ProcessLock
+from scripts.crawl_fund_holdings import RateLimiter, fetch_holdings, normalize_quarter
+from scripts.update_fund_info import CACHE_DIR, atomic_write
+
+logger = get_logger(__name__)
+
+HOLDINGS_META_PATH = os.path.join(CACHE_DIR, 'holdings_meta.json')
+
+# 报告季：季度结束后的第一个月（季报在季度结束后15个工作日内公布）的前若干天
+REPORT_SEASON_MONTHS = (1, 4, 7, 10)
+REPORT_SEASON_END_DAY = 25
+# 两轮探测之间的间隔（秒）
+REFRESH_CYCLE_SECONDS = 10 * 60
+# 同一只基金两次探测的最小间隔（秒）
+PROBE_INTERVAL = 6 * 60 * 60
+# 每轮最多探测的基金数，及每秒最多请求数
+PROBE_BATCH = 200
+PROBE_RATE = 2.0
+
+# 报告期末日期（与本地持仓库中的报告期格式一致）
+QUARTER_END_DATES = ('03-31', '06-30', '09-30', '12-31')
+
+
+def is_report_season(day=None):
+    """判断是否处于报告季"""
+    day = day or datetime.now()
+    return day.month in REPORT_SEASON_MONTHS and day.day <= REPORT_SEASON_END_DAY
+
+
+def expected_report_date():
+    """报告季内应公布的持仓报告期，格式 YYYY-MM-DD"""
+    latest = FundRealtimeCalculator.get_latest_quarter()
+    return f"{latest['year']}-{QUARTER_END_DATES[latest['quarter'] - 1]}"
+
+
+class HoldingsRefresher:
+    """报告季持仓刷新线程"""
+
+    def __init__(self, meta_path=HOLDINGS_META_PATH, batch=PROBE_BATCH, rate=PROBE_RATE):
+        self.meta_path = meta_path
+        self.batch = batch
+        self.limiter = RateLimiter(rate)
+        self._meta = None
+        self._leader = ProcessLock('holdings_refresh')
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _load_meta(self):
+        if self._meta is None:
+            try:
+                with open(self.meta_path, 'r', encoding='utf-8') as f:
+                    self._meta = json.load(f)
+            except (OSError, ValueError):
+                self._meta = {}
+        return self._meta
+
+    def _save_meta(self):
+        atomic_write(self.meta_path, lambda f: json.dump(self._meta, f, ensure_ascii=False))
+
+    def get_as_of(self, fund_code):
+        """
+        获取基金持仓的报告期
+
+        Returns:
+        --------
+        str
+            报告期（YYYY-MM-DD），未知时返回None
+        """
+        entry = self._load_meta().get(fund_code) or {}
+        known = [date for date in (entry.get('as_of'), get_holdings_store().get_quarter(fund_code)) if date]
+        return max(known) if known else None
+
+    def candidates(self, report_date, now=None):
+        """
+        需要探测的基金（按所有进程合并后的热度从高到低，其后是持仓库中的其他基金）：
+        持仓报告期早于 report_date，且 PROBE_INTERVAL 内没有探测过
+
+        Returns:
+        --------
+        list
+            最多 batch 个基金代码
+        """
+        now = now or time.time()
+        meta = self._load_meta()
+        store = get_holdings_store()
+        scores = shared_popularity(fund_popularity, limit=len(fund_popularity))
+        popular = sorted(scores, key=scores.get, reverse=True)
+        ordered = dict.fromkeys(popular + list(get_known_portfolios()) + store.fund_codes)
+
+        funds = []
+        for fund_code in ordered:
+            if (self.get_as_of(fund_code) or '') >= report_date:
+                continue
+            if now - meta.get(fund_code, {}).get('checked_at', 0) < PROBE_INTERVAL:
+                continue
+            funds.append(fund_code)
+            if len(funds) >= self.batch:
+                break
+        return funds
+
+    def _probe(self, fund_code):
+        """
+        查询基金最新公布的持仓报告期
+
+        Returns:
+        --------
+        tuple
+            (报告期, 持仓)，未安装 efinance 时直接下载最新持仓（持仓不为None），否则持仓为None
+        """
+        self.limiter.wait()
+        if HAS_EFINANCE:
+            dates = ef.fund.get_public_dates(fund_code)
+            return (max(normalize_quarter(date) for date in dates) if dates else None), None
+        quarter, holdings = fetch_holdings(fund_code)
+        return quarter or None, holdings
+
+    def refresh(self, report_date=None):
+        """
+        执行一轮探测，公布了新一期持仓的基金重新下载并写回本地持仓库
+
+        Returns:
+        --------
+        dict
+            {'probed': 探测基金数, 'updated': 更新持仓的基金数}
+        """
+        report_date = report_date or expected_report_date()
+        meta = self._load_meta()
+        funds = self.candidates(report_date)
+        updates = {}
+        for fund_code in funds:
+            as_of = self.get_as_of(fund_code) or ''
+            entry = meta.setdefault(fund_code, {'as_of': as_of or None})
+            entry['checked_at'] = time.time()
+            try:
+                latest, holdings = self._probe(fund_code)
+                if latest is None or latest <= as_of:
+                    continue
+                if holdings is None:
+                    self.limiter.wait()
+                    latest, holdings = fetch_holdings(fund_code)
+            except Exception as e:
+                logger.warning("探测基金【%s】持仓失败: %s", fund_code, e)
+                continue
+            if holdings and latest > as_of:
+                updates[fund_code] = {'quarter': latest, 'holdings': holdings}
+                entry.update({'as_of': latest, 'updated_at': time.time()})
+
+        if updates:
+            update_holdings_store(updates)
+        if funds:
+            self._save_meta()
+        logger.info("报告期 %s 持仓探测: %s 只基金，%s 只更新", report_date, len(funds), len(updates))
+        return {'probed': len(funds), 'updated': len(updates)}
+
+    def start(self, interval=REFRESH_CYCLE_SECONDS):
+        """启动刷新线程（进程内只启动一次）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                            name='holdings-refresher', daemon=True)
+            self._thread.start()
+
+    def _loop(self, interval):
+        while True:
+            try:
+                if is_report_season() and self._leader.try_acquire():
+                    self.refresh()
+            except Exception as e:
+                logger.warning("报告季持仓刷新失败: %s", e)
+            time.sleep(interval)
+
+
+holdings_refresher = HoldingsRefresher()
@@ -0,0 +1,257 @@
+"""
+本地基金持仓库
+由 scripts/crawl_fund_holdings.py 批量抓取后以列式 npz 文件保存（基金代码、季度、股票代码、股票名称、占净值比例），
+服务进程加载后按基金代码直接切片，用户请求不再等待持仓下载
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.log import get_logger
+from core.process_lock import file_lock
+
+logger = get_logger(__name__)
+
+HOLDINGS_NPZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'fund_holdings.npz')
+
+# 修改持仓库（读取-合并-写回）时持有的文件锁名称
+HOLDINGS_LOCK = 'holdings_store'
+
+# 持仓库的列（按基金代码排序保存）
+HOLDINGS_COLUMNS = ('fund_code', 'quarter', 'stock_code', 'stock_name', 'weight')
+
+# 检查持仓库文件是否更新的最小间隔（秒）
+STORE_CHECK_SECONDS = 60
+
+
+class HoldingsStore:
+    """列式基金持仓库"""
+
+    def __init__(self, columns, built_at=''):
+        """
+        Parameters:
+        -----------
+        columns : dict
+            HOLDINGS_COLUMNS 各列对应的 np.ndarray，行按基金代码排序
+        built_at : str
+            生成时间
+        """
+        self.columns = columns
+        self.built_at = built_at
+        fund_codes = columns['fund_code']
+        funds, starts = np.unique(fund_codes, return_index=True)
+        ends = np.append(starts[1:], len(fund_codes))
+        self._slices = {str(code): (start, end) for code, start, end in zip(funds, starts, ends)}
+
+    @classmethod
+    def empty(cls):
+        return cls({name: np.array([], dtype=str if name != 'weight' else np.float32) for name in HOLDINGS_COLUMNS})
+
+    def __len__(self):
+        return len(self._slices)
+
+    def __contains__(self, fund_code):
+        return fund_code in self._slices
+
+    @property
+    def fund_codes(self):
+        return list(self._slices)
+
+    def get_quarter(self, fund_code):
+        """获取基金持仓的报告期，不存在时返回None"""
+        bounds = self._slices.get(fund_code)
+        if bounds is None:
+            return None
+        return str(self.columns['quarter'][bounds[0]])
+
+    def get_portfolio(self, fund_code):
+        """
+        获取单只基金的重仓股持仓
+
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+
+        Returns:
+        --------
+        pd.DataFrame
+            包含 股票代码、股票名称、占净值比例、季度 列的持仓数据，不存在时返回None
+        """
+        bounds = self._slices.get(fund_code)
+        if bounds is None:
+            return None
+        start, end = bounds
+        return pd.DataFrame({
+            '股票代码': self.columns['stock_code'][start:end].astype(str),
+            '股票名称': self.columns['stock_name'][start:end].astype(str),
+            '占净值比例': self.columns['weight'][start:end].astype(np.float64),
+            '季度': self.columns['quarter'][start:end].astype(str),
+        })
+
+
+def save_holdings_store(columns, path=HOLDINGS_NPZ):
+    """
+    原子写入持仓库（按基金代码稳定排序后以压缩 npz 保存）
+
+    Parameters:
+    -----------
+    columns : dict
+        HOLDINGS_COLUMNS 各列对应的序列，长度一致
+    path : str
+        保存路径
+    """
+    arrays = {
+        name: np.asarray(columns[name], dtype=np.float32 if name == 'weight' else str)
+        for name in HOLDINGS_COLUMNS
+    }
+    order = np.argsort(arrays['fund_code'], kind='stable')
+    arrays = {name: array[order] for name, array in arrays.items()}
+    arrays['built_at'] = np.array(time.strftime("%Y-%m-%d %H:%M:%S"))
+    atomic_savez(path, arrays)
+
+
+def update_holdings_store(records, path=HOLDINGS_NPZ):
+    """
+    替换持仓库中部分基金的持仓（其余基金保持不变），写入后重新加载
+
+    Parameters:
+    -----------
+    records : dict
+        {基金代码: {'quarter': 报告期, 'holdings': [[股票代码, 股票名称, 占净值比例], ...]}}
+    path : str
+        保存路径
+
+    Returns:
+    --------
+    HoldingsStore
+        更新后的持仓库
+    """
+    # 读取与写回之间持有持仓库文件锁，与批量抓取脚本的写入互斥，避免互相覆盖
+    with file_lock(HOLDINGS_LOCK):
+        try:
+            store = load_holdings_store(path)
+        except FileNotFoundError:
+            store = HoldingsStore.empty()
+        keep = ~np.isin(store.columns['fund_code'], list(records))
+        columns = {name: list(store.columns[name][keep]) for name in HOLDINGS_COLUMNS}
+        for fund_code, record in records.items():
+            for stock_code, stock_name, weight in record['holdings']:
+                columns['fund_code'].append(fund_code)
+                columns['quarter'].append(record['quarter'])
+                columns['stock_code'].append(stock_code)
+                columns['stock_name'].append(stock_name)
+                columns['weight'].append(weight)
+        save_holdings_store(columns, path)
+    if os.path.abspath(path) != os.path.abspath(HOLDINGS_NPZ):
+        return load_holdings_store(path)
+    return reload_holdings_store(force=True)
+
+
+def atomic_savez(path, arrays):
+    """
+    原子写入压缩 npz 文件：先写入同目录临时文件，再通过 os.replace 替换目标文件
+
+    Parameters:
+    -----------
+    path : str
+        保存路径
+    arrays : dict
+        数组名 -> np.ndarray
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_holdings_store(path=HOLDINGS_NPZ):
+    """
+    从磁盘加载持仓库
+
+    Returns:
+    --------
+    HoldingsStore
+        持仓库，文件不存在时抛出 FileNotFoundError
+    """
+    with np.load(path, allow_pickle=False) as data:
+        columns = {name: data[name] for name in HOLDINGS_COLUMNS}
+        built_at = str(data['built_at']) if 'built_at' in data.files else ''
+    return HoldingsStore(columns, built_at=built_at)
+
+
+_current_store = None
+_current_mtime = None
+_checked_at = 0.0
+_load_lock = threading.Lock()
+
+
+def reload_holdings_store(force=False):
+    """
+    重新加载持仓库（文件未变化时跳过）
+
+    Parameters:
+    -----------
+    force : bool
+        是否忽略文件修改时间强制重新加载
+
+    Returns:
+    --------
+    HoldingsStore
+        当前生效的持仓库
+    """
+    global _current_store, _current_mtime, _checked_at
+    with _load_lock:
+        _checked_at = time.time()
+        try:
+            mtime = os.stat(HOLDINGS_NPZ).st_mtime_ns
+        except OSError:
+            mtime = None
+        if not force and _current_store is not None and mtime == _current_mtime:
+            return _current_store
+        if mtime is None:
+            if _current_store is None:
+                logger.warning("未找到本地持仓库，请运行 scripts/crawl_fund_holdings.py 生成")
+                _current_store = HoldingsStore.empty()
+            return _current_store
+        try:
+            store = load_holdings_store()
+        except Exception as e:
+            logger.warning("加载本地持仓库失败: %s", e)
+            if _current_store is None:
+                _current_store = HoldingsStore.empty()
+            return _current_store
+        _current_store = store
+        _current_mtime = mtime
+        logger.info("成功加载 %s 只基金的本地持仓（生成时间 %s）", len(store), store.built_at)
+        return store
+
+
+def get_holdings_store():
+    """
+    获取当前持仓库（每 STORE_CHECK_SECONDS 秒最多检查一次文件是否更新）
+
+    Returns:
+    --------
+    HoldingsStore
+        持仓库
+    """
+    store = _current_store
+    if store is None or time.time() - _checked_at >= STORE_CHECK_SECONDS:
+        store = reload_holdings_store()
+    return store
@@ -0,0 +1,160 @@
+"""
+指数型基金跟踪标的映射表
+由 scripts/build_index_fund_map.py 离线生成 cache/index_fund_map.json，
+服务启动时加载，估值时按基金代码 O(1) 查找跟踪的指数或目标ETF
+"""
+
+import json
+import os
+import re
+import threading
+
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_FUND_MAP_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'index_fund_map.json')
+
+# 指数型基金的类型前缀
+INDEX_FUND_TYPES = ('指数型-股票', '指数型-海外股票')
+
+# 内置的常用指数名称 -> 代码（映射表缺失或未覆盖时按基金名称匹配）
+BUILTIN_INDEX_TARGETS = {
+    '沪深300': {'code': '000300', 'kind': 'index'},
+    '中证500': {'code': '000905', 'kind': 'index'},
+    '中证800': {'code': '000906', 'kind': 'index'},
+    '中证100': {'code': '000903', 'kind': 'index'},
+    '中证1000': {'code': '000852', 'kind': 'index'},
+    '上证指数': {'code': '000001', 'kind': 'index'},
+    '上证50': {'code': '000016', 'kind': 'index'},
+    '上证180': {'code': '000010', 'kind': 'index'},
+    '科创50': {'code': '000688', 'kind': 'index'},
+    '深证成指': {'code': '399001', 'kind': 'index'},
+    '深证100': {'code': '399330', 'kind': 'index'},
+    '创业板指': {'code': '399006', 'kind': 'index'},
+    '创业板': {'code': '399006', 'kind': 'index'},
+    '创业板50': {'code': '399673', 'kind': 'index'},
+    '中小板指': {'code': '399005', 'kind': 'index'},
+    '医药100': {'code': '000933', 'kind': 'index'},
+    '中证红利': {'code': '000922', 'kind': 'index'},
+    # 海外指数没有A股行情代码，使用跟踪同一指数的场内ETF代替
+    '纳斯达克100': {'code': '513100', 'kind': 'etf'},
+    '标普500': {'code': '513500', 'kind': 'etf'},
+    '恒生科技': {'code': '513180', 'kind': 'etf'},
+    '恒生指数': {'code': '159920', 'kind': 'etf'},
+    '中概互联': {'code': '513050', 'kind': 'etf'},
+    '日经225': {'code': '513520', 'kind': 'etf'},
+}
+
+# 名称归一化时去掉的修饰词（只用于从数据源获取的指数名称表）
+_NAME_NOISE = re.compile(r'(指数|价格|全收益|净收益|人民币|\(.*?\)|（.*?）|\s)')
+_WHITESPACE = re.compile(r'\s')
+
+
+def normalize_index_name(name):
+    """
+    归一化指数名称，便于跨数据源比较
+
+    Parameters:
+    -----------
+    name : str
+        指数或跟踪标的名称，如 "沪深300指数"
+
+    Returns:
+    --------
+    str
+        归一化后的名称，如 "沪深300"
+    """
+    return _NAME_NOISE.sub('', str(name)).lower()
+
+
+def _raw_index_name(name):
+    """只去掉空白并转为小写（内置常用指数按原名匹配，"上证指数"、"恒生指数"不会被截成"上证"、"恒生"）"""
+    return _WHITESPACE.sub('', str(name)).lower()
+
+
+# 内置常用指数的原名 -> 目标信息（模块加载时生成一次）
+_BUILTIN_NAME_TABLE = {_raw_index_name(name): dict(target, name=name) for name, target in BUILTIN_INDEX_TARGETS.items()}
+
+
+def match_index_by_name(fund_name, name_table=None):
+    """
+    按基金名称匹配跟踪指数（取名称中包含的最长指数名）
+
+    Parameters:
+    -----------
+    fund_name : str
+        基金名称或跟踪标的名称
+    name_table : dict
+        归一化指数名称 -> 目标信息（由 normalize_index_name 生成）；
+        默认使用内置常用指数，此时按原名（只去掉空白）匹配，不做归一化
+
+    Returns:
+    --------
+    dict
+        {'code': ..., 'kind': 'index'|'etf', 'name': ...}，未匹配时返回None
+    """
+    if not fund_name:
+        return None
+    if name_table is None:
+        name_table, normalized = _BUILTIN_NAME_TABLE, _raw_index_name(fund_name)
+    else:
+        normalized = normalize_index_name(fund_name)
+    best = None
+    for index_name, target in name_table.items():
+        if index_name and index_name in normalized and (best is None or len(index_name) > len(best[0])):
+            best = (index_name, target)
+    return best[1] if best else None
+
+
+_index_fund_map = None
+_load_lock = threading.Lock()
+
+
+def reload_index_fund_map():
+    """
+    加载指数型基金跟踪标的映射表
+
+    Returns:
+    --------
+    dict
+        基金代码 -> {'code': ..., 'kind': ..., 'name': ...}
+    """
+    global _index_fund_map
+    with _load_lock:
+        try:
+            with open(INDEX_FUND_MAP_JSON, 'r', encoding='utf-8') as f:
+                _index_fund_map = json.load(f).get('funds', {})
+            logger.info("成功加载 %s 只指数型基金的跟踪标的", len(_index_fund_map))
+        except FileNotFoundError:
+            logger.warning("未找到指数型基金跟踪标的映射表，请运行 scripts/build_index_fund_map.py 生成")
+            _index_fund_map = {}
+        except Exception as e:
+            logger.warning("加载指数型基金跟踪标的映射表失败: %s", e)
+            _index_fund_map = {}
+        return _index_fund_map
+
+
+def get_index_target(fund_code, fund_name=None):
+    """
+    获取指数型基金跟踪的指数或目标ETF
+
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+    fund_name : str
+        基金名称，映射表中不存在时用于按内置常用指数名称匹配
+
+    Returns:
+    --------
+    dict
+        {'code': ..., 'kind': 'index'|'etf', 'name': ...}，无法确定时返回None
+    """
+    index_fund_map = _index_fund_map
+    if index_fund_map is None:
+        index_fund_map = reload_index_fund_map()
+    target = index_fund_map.get(fund_code)
+    if target is not None:
+        return target
+    return match_index_by_name(fund_name)
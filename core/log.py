@@ -0,0 +1,97 @@
+"""
+日志工具
+所有诊断信息通过 fundbase.* 命名 logger 输出：
+- 级别由环境变量 FUNDBASE_LOG_LEVEL 控制（默认 INFO，预发布环境可设为 DEBUG 打开逐请求的详细过程）
+- 低于 WARNING 的记录可按 FUNDBASE_LOG_SAMPLE_RATE（0-1，默认1即全部输出）采样
+- 请求线程只把日志记录放入队列（QueueHandler），由后台 QueueListener 线程写出，不在请求路径上等待输出
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+LOGGER_NAME = 'fundbase'
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s'
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样低级别日志，WARNING 及以上始终保留"""
+
+    def __init__(self, rate, min_level=logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.min_level = min_level
+
+    def filter(self, record):
+        return record.levelno >= self.min_level or random.random() < self.rate
+
+
+def setup_logging(level=None, sample_rate=None, stream=None):
+    """
+    初始化 fundbase 日志（进程内只初始化一次）
+
+    Parameters:
+    -----------
+    level : str
+        日志级别，默认读取 FUNDBASE_LOG_LEVEL，未设置时为 INFO
+    sample_rate : float
+        低于 WARNING 的日志采样比例，默认读取 FUNDBASE_LOG_SAMPLE_RATE，未设置时为1
+    stream : file
+        输出流，默认 sys.stderr
+
+    Returns:
+    --------
+    logging.Logger
+        fundbase 根 logger
+    """
+    global _listener
+    root = logging.getLogger(LOGGER_NAME)
+    with _setup_lock:
+        if _listener is not None:
+            return root
+        if level is None:
+            level = os.environ.get('FUNDBASE_LOG_LEVEL', 'INFO')
+        if sample_rate is None:
+            sample_rate = float(os.environ.get('FUNDBASE_LOG_SAMPLE_RATE', '1'))
+
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        root.propagate = False
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        if sample_rate < 1:
+            queue_handler.addFilter(SamplingFilter(sample_rate))
+        root.addHandler(queue_handler)
+
+        stream_handler = logging.StreamHandler(stream or sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+    return root
+
+
+def get_logger(name):
+    """
+    获取 fundbase 下的命名 logger
+
+    Parameters:
+    -----------
+    name : str
+        模块名，通常传入 __name__
+
+    Returns:
+    --------
+    logging.Logger
+        名为 fundbase.<name> 的 logger
+    """
+    setup_logging()
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
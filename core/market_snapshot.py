@@ -0,0 +1,347 @@
+"""
+全市场行情快照缓存
+将指数、ETF、A股等全市场行情表按代码索引后在进程内共享：
+交易时间内每个 tick 最多刷新一次，收盘后保持不变，
+并发的估值请求共用同一次下载，而不是各自拉取整张行情表；
+多进程部署时快照通过共享行情表（见 core/shared_quotes.py）在进程间共享，只由一个进程负责下载；
+按持仓股票向主行情接口（get_all_stock_quotes）发起的请求不经过共享行情表，仍按进程分别发出
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+from core.log import get_logger
+from core.shared_quotes import open_shared_table
+from core.trading_calendar import is_trading_time
+
+logger = get_logger(__name__)
+
+# 行情快照刷新间隔（秒）
+TICK_SECONDS = 5
+
+# 快照中保留的字段
+SNAPSHOT_COLUMNS = ['名称', '最新价', '涨跌幅']
+
+# 后台刷新线程在无人查询超过该时长（秒）后暂停刷新
+BACKGROUND_IDLE_TIMEOUT = 10 * 60
+
+# 共享行情表默认容量（行数）
+SHARED_TABLE_CAPACITY = 4096
+# 共享行情表超过该数量的 tick 未更新时，非刷新进程自行下载
+SHARED_STALE_TICKS = 3
+
+
+class SpotSnapshot:
+    """按代码索引的全市场行情快照"""
+
+    def __init__(self, name, fetch_func, tick_seconds=TICK_SECONDS, columns=None,
+                 shared_name=None, capacity=SHARED_TABLE_CAPACITY):
+        """
+        Parameters:
+        -----------
+        name : str
+            快照名称，用于日志
+        fetch_func : callable
+            下载全市场行情表的函数，返回包含'代码'列的 DataFrame
+        tick_seconds : float
+            交易时间内的刷新间隔（秒）
+        columns : list
+            保留的字段，默认 SNAPSHOT_COLUMNS
+        shared_name : str
+            共享行情表名称（ASCII），为空时快照只在进程内共享
+        capacity : int
+            共享行情表最大行数
+        """
+        self.name = name
+        self.fetch_func = fetch_func
+        self.tick_seconds = tick_seconds
+        self.columns = columns or SNAPSHOT_COLUMNS
+        self._table = None
+        self._fetched_at = 0.0
+        self._fetched_in_session = False
+        self._last_access = 0.0
+        self._lock = threading.Lock()  # 刷新锁（下载期间持有）
+        self._refresher = None
+        self._refresher_lock = threading.Lock()  # 只保护后台线程的启动，不在下载期间持有
+        self.shared_name = shared_name
+        self.capacity = capacity
+        self._shared = None
+        self._shared_opened = False
+        self._shared_seq = None
+
+    def _get_shared(self):
+        """首次使用时打开共享行情表（未启用或打开失败时返回None）"""
+        if not self._shared_opened:
+            self._shared_opened = True
+            if self.shared_name:
+                self._shared = open_shared_table(self.shared_name, self.columns, self.capacity)
+        return self._shared
+
+    def _sync_shared(self):
+        """载入其他进程发布到共享行情表的新快照（版本号未变化时不做任何拷贝）"""
+        shared = self._get_shared()
+        if shared is None:
+            return
+        if shared.is_refresher or shared.seq == self._shared_seq:
+            return
+        snapshot = shared.read()
+        if snapshot is None:
+            return
+        seq, table, fetched_at, in_session = snapshot
+        if fetched_at > self._fetched_at:
+            self._table = table
+            self._fetched_at = fetched_at
+            self._fetched_in_session = in_session
+        self._shared_seq = seq
+
+    def _wait_shared(self, timeout):
+        """等待负责刷新的进程发布新快照，超时返回False"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self._sync_shared()
+            if self._is_fresh():
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _is_fresh(self):
+        """判断当前快照是否仍然有效"""
+        if self._table is None:
+            return False
+        if is_trading_time():
+            return time.time() - self._fetched_at < self.tick_seconds
+        # 非交易时间：收盘后拉取过一次即保持不变，直到下一个交易时段
+        return not self._fetched_in_session
+
+    def _refresh(self):
+        """下载并替换快照（启用共享行情表时，只有负责刷新的进程下载并发布）"""
+        shared = self._get_shared()
+        if shared is not None and not shared.try_become_refresher():
+            # 其他进程负责刷新：已有快照且过期不久时继续使用，没有快照时等待其首次发布；
+            # 长时间没有更新（负责刷新的进程卡住）时才由本进程自行下载
+            if self._table is not None:
+                if time.time() - self._fetched_at < self.tick_seconds * SHARED_STALE_TICKS:
+                    return
+            elif self._wait_shared(self.tick_seconds * 2):
+                return
+            logger.warning("%s快照: 共享行情表未及时更新，本进程自行下载", self.name)
+            shared = None
+
+        trading = is_trading_time()
+        start = time.time()
+        try:
+            raw = self.fetch_func()
+        except Exception as e:
+            logger.warning("%s快照刷新失败: %s", self.name, e)
+            return
+        if raw is None or raw.empty or '代码' not in raw.columns:
+            logger.warning("%s快照刷新失败: 未获取到数据", self.name)
+            return
+
+        columns = [col for col in self.columns if col in raw.columns]
+        table = raw[['代码', *columns]].copy()
+        table['代码'] = table['代码'].astype(str)
+        for col in columns:
+            if col != '名称':
+                table[col] = pd.to_numeric(table[col], errors='coerce')
+        table = table.drop_duplicates(subset='代码', keep='first').set_index('代码')
+
+        self._table = table
+        self._fetched_at = time.time()
+        self._fetched_in_session = trading
+        if shared is not None:
+            self._shared_seq = shared.publish(table, self._fetched_at, trading)
+        logger.debug("%s快照已刷新: %s 条，耗时 %.2f 秒", self.name, len(table), self._fetched_at - start)
+
+    def get_table(self):
+        """
+        获取当前快照（必要时刷新）
+
+        正在被其他线程刷新时直接返回旧快照，仅在没有任何快照时等待首次下载完成
+
+        Returns:
+        --------
+        pd.DataFrame
+            以'代码'为索引的行情表，无数据时返回None
+        """
+        self._last_access = time.time()
+        if self._get_shared() is not None:
+            self._shared.touch()
+            self._sync_shared()
+        if self._is_fresh():
+            return self._table
+        if self._table is not None:
+            if not self._lock.acquire(blocking=False):
+                return self._table
+        else:
+            self._lock.acquire()
+        try:
+            if not self._is_fresh():
+                self._refresh()
+        finally:
+            self._lock.release()
+        if self._shared is not None and self._shared.is_refresher:
+            # 负责刷新的进程在后台持续刷新（其他进程有查询时同样视为活跃）
+            self.start_background_refresh()
+        return self._table
+
+    def lookup(self, code):
+        """
+        按代码查询行情
+
+        Parameters:
+        -----------
+        code : str
+            证券代码
+
+        Returns:
+        --------
+        dict
+            {'代码': ..., '名称': ..., '最新价': ..., '涨跌幅': ...}，不存在时返回None
+        """
+        table = self.get_table()
+        if table is None or code not in table.index:
+            return None
+        row = table.loc[code]
+        return {'代码': code, **row.to_dict()}
+
+    def lookup_many(self, codes):
+        """
+        批量按代码查询行情
+
+        Parameters:
+        -----------
+        codes : list
+            证券代码列表
+
+        Returns:
+        --------
+        pd.DataFrame
+            以'代码'为索引的行情子表（只包含快照中存在的代码），无快照时返回None
+        """
+        table = self.get_table()
+        if table is None:
+            return None
+        return table[table.index.isin(codes)]
+
+    def start_background_refresh(self, idle_timeout=BACKGROUND_IDLE_TIMEOUT):
+        """
+        启动后台刷新线程（每个快照只启动一次）
+
+        交易时间内每个 tick 在后台刷新一次，查询方始终直接读取内存；
+        超过 idle_timeout 秒无人查询时暂停刷新，有查询后自动恢复
+
+        Parameters:
+        -----------
+        idle_timeout : float
+            无人查询后暂停刷新的时长（秒）
+        """
+        self._last_access = time.time()
+        # 查询路径上调用：线程已在运行时不取任何锁，也不等待正在进行的下载
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self._background_loop, args=(idle_timeout,),
+                name=f'spot-snapshot-{self.name}', daemon=True,
+            )
+            self._refresher.start()
+
+    def _background_loop(self, idle_timeout):
+        while True:
+            try:
+                last_access = self._last_access
+                if self._shared is not None:
+                    last_access = max(last_access, self._shared.last_access)
+                    self._sync_shared()
+                if time.time() - last_access < idle_timeout and not self._is_fresh():
+                    with self._lock:
+                        if not self._is_fresh():
+                            self._refresh()
+            except Exception as e:
+                logger.warning("%s快照后台刷新失败: %s", self.name, e)
+            time.sleep(self.tick_seconds)
+
+    @property
+    def fetched_at(self):
+        return self._fetched_at
+
+
+# 指数行情分多个系列下载，合并为一张表
+INDEX_SPOT_SYMBOLS = ('沪深重要指数', '上证系列指数', '深证系列指数', '中证系列指数')
+
+
+def _fetch_index_spot():
+    """下载指数实时行情表"""
+    import akshare as ak
+
+    frames = []
+    for symbol in INDEX_SPOT_SYMBOLS:
+        try:
+            frames.append(ak.stock_zh_index_spot_em(symbol=symbol))
+        except Exception as e:
+            logger.warning("获取%s行情失败: %s", symbol, e)
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def _fetch_etf_spot():
+    """下载ETF实时行情表"""
+    import akshare as ak
+    return ak.fund_etf_spot_em()
+
+
+def _fetch_a_share_spot():
+    """下载沪深京A股实时行情表"""
+    import akshare as ak
+    return ak.stock_zh_a_spot_em()
+
+
+def _fetch_hk_spot():
+    """下载港股实时行情表"""
+    import akshare as ak
+    return ak.stock_hk_spot_em()
+
+
+def to_quote_frame(table):
+    """
+    将快照子表转换为统一的股票行情格式（与 get_all_stock_quotes 返回的列一致）
+
+    Parameters:
+    -----------
+    table : pd.DataFrame
+        以'代码'为索引的快照子表
+
+    Returns:
+    --------
+    pd.DataFrame
+        包含 代码、名称、最新价、涨跌、涨跌幅、成交量、成交额 列的行情数据
+    """
+    table = table.dropna(subset=['涨跌幅'])
+    quotes = pd.DataFrame({
+        '代码': table.index,
+        '名称': table['名称'].values,
+        '最新价': table['最新价'].values,
+    })
+    if '涨跌额' in table.columns:
+        quotes['涨跌'] = table['涨跌额'].values
+    quotes['涨跌幅'] = [f"{change:+.2f}%" for change in table['涨跌幅'].values]
+    for col in ('成交量', '成交额'):
+        if col in table.columns:
+            quotes[col] = table[col].values
+    return quotes
+
+
+index_spot_snapshot = SpotSnapshot('指数', _fetch_index_spot, shared_name='index_spot')
+etf_spot_snapshot = SpotSnapshot('ETF', _fetch_etf_spot, shared_name='etf_spot')
+a_share_spot_snapshot = SpotSnapshot(
+    'A股', _fetch_a_share_spot,
+    columns=['名称', '最新价', '涨跌幅', '涨跌额', '成交量', '成交额'],
+    shared_name='a_share_spot', capacity=8192,
+)
+hk_spot_snapshot = SpotSnapshot('港股', _fetch_hk_spot, shared_name='hk_spot', capacity=8192)
@@ -0,0 +1,153 @@
+"""
+进程内性能指标
+以计时 span 记录各处理阶段的耗时并聚合为直方图，按 Prometheus 文本格式导出（见 /metrics）
+多进程部署时每个 worker 进程各自统计
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+    """按标签分组的直方图"""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        记录一次观测值
+
+        Parameters:
+        -----------
+        value : float
+            观测值
+        **labels
+            标签
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        """按 Prometheus 文本格式输出"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, dict(series, buckets=list(series['buckets']))) for key, series in self._series.items()]
+        for key, series in sorted(snapshot):
+            labels = dict(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=repr(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le='+Inf'))} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return '\n'.join(lines)
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """获取或创建直方图"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help_text, buckets)
+            return metric
+
+    def render(self):
+        """输出所有指标（Prometheus 文本格式）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    'fundbase_stage_duration_seconds', 'Duration of request processing stages in seconds'
+)
+
+
+def observe(stage, seconds, status='ok', **labels):
+    """
+    直接记录一个阶段的耗时（不便使用 span 包裹的代码块，如有多个返回分支时）
+
+    Parameters:
+    -----------
+    stage : str
+        阶段名称
+    seconds : float
+        耗时（秒）
+    status : str
+        ok 或 error
+    **labels
+        附加标签
+    """
+    STAGE_DURATION.observe(seconds, stage=stage, status=status, **labels)
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    计时 span：记录代码块耗时到 fundbase_stage_duration_seconds，
+    并以 status 标签区分正常结束（ok）和抛出异常（error）
+
+    Parameters:
+    -----------
+    stage : str
+        阶段名称，如 "portfolio"、"quote_provider"
+    **labels
+        附加标签，如 provider="tencent"
+    """
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, status=status, **labels)
+
+
+def render_metrics():
+    """
+    导出所有指标
+
+    Returns:
+    --------
+    str
+        Prometheus 文本格式的指标
+    """
+    return registry.render()
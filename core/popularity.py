@@ -0,0 +1,304 @@
+"""
+基金热度统计与热门基金预取
+按基金代码统计请求次数（指数衰减，近期请求权重更高），交易时间内持续为最热门的基金
+预先计算估值（持仓常驻缓存、行情定时拉取），开盘（9:30）和午后开市（13:00）前提前预热，
+大部分请求直接读取内存中的估值结果，无需等待上游
+
+多进程部署时各进程定期把本进程的请求热度发布到共享目录（按用户和部署区分的私有目录，见 core/shared_quotes.py），需要按热度排序的后台任务（热门基金预取、
+报告季持仓刷新）合并所有进程的热度；只由持有选主锁的进程预取，预取进程把热门基金的估值结果发布到共享目录，
+其他进程载入到各自的估值缓存
+"""
+
+import atexit
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from core.log import get_logger
+from core.process_lock import ProcessLock
+from core.closing_snapshot import deserialize_valuation, serialize_valuation
+from core.shared_quotes import SHARED_DIR, ensure_shared_dir, is_trusted_file
+from core.trading_calendar import is_trading_day, is_trading_time
+
+logger = get_logger(__name__)
+
+# 热度半衰期（秒）：30分钟前的一次请求权重减半
+POPULARITY_HALF_LIFE = 30 * 60
+# 最多跟踪的基金数，超出后丢弃热度最低的一半
+POPULARITY_MAX_KEYS = 20000
+# 持续预取的热门基金数，可通过环境变量 FUNDBASE_HOT_FUND_COUNT 覆盖
+HOT_FUND_COUNT = int(os.environ.get('FUNDBASE_HOT_FUND_COUNT', '50'))
+# 交易时间内预取间隔（秒），与估值结果软过期时间一致
+PREFETCH_INTERVAL = 5
+# 开盘前预热时刻（集合竞价结束后、连续竞价开始前）及允许的延迟
+PRE_OPEN_TIMES = ('09:25', '12:55')
+PRE_OPEN_WINDOW = timedelta(minutes=5)
+# 各进程发布请求热度的间隔（秒），超过 3 倍间隔未更新的热度文件视为进程已退出
+POPULARITY_SHARE_SECONDS = 30
+# 每个进程发布的热度最高的基金数
+POPULARITY_SHARE_COUNT = 500
+POPULARITY_FILE_PREFIX = 'fundbase_popularity_'
+# 预取进程发布的热门基金估值结果（JSON，格式与收盘快照中的估值一致）
+HOT_VALUATIONS_PATH = os.path.join(SHARED_DIR, 'hot_valuations.json')
+
+
+def _atomic_dump(path, data):
+    """原子写入共享目录中的 JSON 文件（临时文件权限为 0600）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _load_shared(path):
+    """读取其他进程写入的共享 JSON 文件（不是当前用户拥有的普通文件时忽略）"""
+    if not is_trusted_file(path):
+        raise OSError(f"不受信任的共享文件: {path}")
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class DecayingCounter:
+    """
+    指数衰减计数器（线程安全）
+
+    内部以 权重 × 2^((t - t0) / 半衰期) 累加，所有计数共用同一基准时间 t0，
+    比较大小时无需逐个衰减；数值过大时整体缩放并重置基准时间
+    """
+
+    # 距基准时间超过该数量的半衰期时重新缩放，避免浮点溢出
+    RESCALE_HALF_LIVES = 64
+
+    def __init__(self, half_life=POPULARITY_HALF_LIFE, max_keys=POPULARITY_MAX_KEYS):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._scores = {}
+        self._base = time.time()
+        self._lock = threading.Lock()
+
+    def hit(self, key, weight=1.0):
+        """记录一次请求"""
+        now = time.time()
+        with self._lock:
+            exponent = (now - self._base) / self.half_life
+            if exponent > self.RESCALE_HALF_LIVES:
+                factor = 2.0 ** -exponent
+                self._scores = {k: v * factor for k, v in self._scores.items()}
+                self._base = now
+                exponent = 0.0
+            self._scores[key] = self._scores.get(key, 0.0) + weight * 2.0 ** exponent
+            if len(self._scores) > self.max_keys:
+                keep = heapq.nlargest(self.max_keys // 2, self._scores.items(), key=lambda item: item[1])
+                self._scores = dict(keep)
+
+    def top(self, n):
+        """
+        获取热度最高的 n 个键
+
+        Parameters:
+        -----------
+        n : int
+            数量
+
+        Returns:
+        --------
+        list
+            [(键, 当前热度)]，按热度从高到低排列
+        """
+        now = time.time()
+        with self._lock:
+            items = heapq.nlargest(n, self._scores.items(), key=lambda item: item[1])
+            factor = 2.0 ** (-(now - self._base) / self.half_life)
+        return [(key, score * factor) for key, score in items]
+
+    def __len__(self):
+        return len(self._scores)
+
+
+fund_popularity = DecayingCounter()
+
+
+def _popularity_file():
+    return f"{POPULARITY_FILE_PREFIX}{os.getpid()}.json"
+
+
+def _remove_popularity_file():
+    """进程退出时删除本进程发布的热度文件"""
+    try:
+        os.unlink(os.path.join(SHARED_DIR, _popularity_file()))
+    except OSError:
+        pass
+
+
+def shared_popularity(counter, limit=POPULARITY_SHARE_COUNT):
+    """
+    合并本进程与其他进程发布的请求热度
+
+    Parameters:
+    -----------
+    counter : DecayingCounter
+        本进程的热度计数器
+    limit : int
+        本进程参与合并的基金数
+
+    Returns:
+    --------
+    dict
+        基金代码 -> 所有进程的热度之和
+    """
+    scores = dict(counter.top(limit))
+    if not ensure_shared_dir():
+        return scores
+    now = time.time()
+    for name in os.listdir(SHARED_DIR):
+        if not name.startswith(POPULARITY_FILE_PREFIX) or name == _popularity_file():
+            continue
+        path = os.path.join(SHARED_DIR, name)
+        try:
+            if now - os.stat(path).st_mtime > POPULARITY_SHARE_SECONDS * 3:
+                # 进程已退出（未能在退出时清理），删除其热度文件
+                os.unlink(path)
+                continue
+            for code, score in _load_shared(path):
+                scores[code] = scores.get(code, 0.0) + score
+        except (OSError, ValueError):
+            continue
+    return scores
+
+
+class HotFundPrefetcher:
+    """热门基金预取线程"""
+
+    def __init__(self, counter, top_n=HOT_FUND_COUNT, interval=PREFETCH_INTERVAL):
+        self.counter = counter
+        self.top_n = top_n
+        self.interval = interval
+        self._warmed = set()  # 已完成的开盘前预热 (日期, 时刻)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._leader = ProcessLock('hot_fund_prefetcher')
+        self._shared_at = 0.0
+        self._adopted_mtime = None
+
+    def publish_popularity(self):
+        """发布本进程的请求热度（供其他进程合并）"""
+        if time.time() - self._shared_at < POPULARITY_SHARE_SECONDS:
+            return
+        if not ensure_shared_dir():
+            return
+        if not self._shared_at:
+            atexit.register(_remove_popularity_file)
+        self._shared_at = time.time()
+        _atomic_dump(os.path.join(SHARED_DIR, _popularity_file()), self.counter.top(POPULARITY_SHARE_COUNT))
+
+    def hot_funds(self):
+        """当前的热门基金（合并所有进程的请求热度，还没有请求记录时使用预热基金列表）"""
+        scores = shared_popularity(self.counter)
+        codes = [code for code, _ in heapq.nlargest(self.top_n, scores.items(), key=lambda item: item[1])]
+        if not codes:
+            from core.warmup import get_warm_funds
+            codes = get_warm_funds()[:self.top_n]
+        return codes
+
+    def prefetch(self):
+        """为热门基金重新计算估值（估值缓存仍未软过期的基金跳过，其余合并为一次行情请求），并发布结果"""
+        from core.portfolio_valuation import refresh_valuations
+        from core.valuation_service import cached_valuation, is_valuation_fresh
+
+        codes = self.hot_funds()
+        stale = [code for code in codes if not is_valuation_fresh(code)]
+        start = time.time()
+        if stale:
+            valuations = refresh_valuations(stale)
+            ok = sum(1 for result, _, _ in valuations.values() if result is not None)
+            logger.debug("预取 %s/%s 只热门基金估值（%s 只未过期跳过），耗时 %.2f 秒",
+                         ok, len(stale), len(codes) - len(stale), time.time() - start)
+        published = {}
+        for code in codes:
+            cached = cached_valuation(code)
+            if cached is not None:
+                published[code] = serialize_valuation(*cached)
+        if published and ensure_shared_dir():
+            _atomic_dump(HOT_VALUATIONS_PATH, published)
+
+    def adopt_published(self):
+        """载入预取进程发布的热门基金估值（文件未更新时跳过）"""
+        from core.valuation_service import adopt_valuation
+
+        try:
+            mtime = os.stat(HOT_VALUATIONS_PATH).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._adopted_mtime:
+            return
+        published = _load_shared(HOT_VALUATIONS_PATH)
+        self._adopted_mtime = mtime
+        for fund_code, entry in published.items():
+            adopt_valuation(fund_code, *deserialize_valuation(entry))
+
+    def warm(self, label):
+        """开盘前预热：重新建立行情连接，加载热门基金持仓并按集合竞价价格计算一次估值"""
+        from api.get_all_stock_quotes import warm_up_providers
+
+        start = time.time()
+        try:
+            warm_up_providers()
+        except Exception as e:
+            logger.warning("开盘前预热行情连接失败: %s", e)
+        self.prefetch()
+        logger.info("%s 开盘前预热完成: %s 只热门基金，耗时 %.2f 秒", label, len(self.hot_funds()), time.time() - start)
+
+    def _due_pre_open(self, now):
+        """判断是否到了开盘前预热时刻，返回预热时刻（HH:MM），未到时返回None"""
+        self._warmed = {key for key in self._warmed if key[0] == now.date()}
+        for label in PRE_OPEN_TIMES:
+            key = (now.date(), label)
+            if key in self._warmed:
+                continue
+            hour, minute = map(int, label.split(':'))
+            scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if scheduled <= now < scheduled + PRE_OPEN_WINDOW and is_trading_day(now):
+                self._warmed.add(key)
+                return label
+        return None
+
+    def start(self):
+        """启动预取线程（进程内只启动一次）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name='hot-fund-prefetcher', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            start = time.time()
+            try:
+                # 所有进程都发布请求热度（持仓刷新进程不一定是预取进程）
+                self.publish_popularity()
+                if not self._leader.try_acquire():
+                    # 由其他进程预取：载入预取结果
+                    if is_trading_time():
+                        self.adopt_published()
+                elif is_trading_time():
+                    self.prefetch()
+                else:
+                    label = self._due_pre_open(datetime.now())
+                    if label:
+                        self.warm(label)
+            except Exception as e:
+                logger.warning("热门基金预取失败: %s", e)
+            time.sleep(max(self.interval - (time.time() - start), 0.5))
+
+
+hot_fund_prefetcher = HotFundPrefetcher(fund_popularity)
@@ -0,0 +1,169 @@
+"""
+自选组合估值
+一次请求对用户的整个自选组合（基金代码、持仓金额、分组）估值：
+所有需要重新计算的基金合并为一次行情请求，在同一份行情上计算，
+并汇总每只基金、每个分组以及整个组合的预估收益
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from core.fund_realtime_calc import FundRealtimeCalculator
+from core.log import get_logger
+from core.metrics import span
+from core.valuation_service import compute_valuation_shared, peek_valuation
+
+logger = get_logger(__name__)
+
+# 单次请求最多估值的基金数
+PORTFOLIO_MAX_FUNDS = 200
+# 并发加载基金持仓的线程数（持仓缓存和本地持仓库未命中时需要访问上游）
+PORTFOLIO_LOAD_WORKERS = 8
+
+_load_executor = ThreadPoolExecutor(max_workers=PORTFOLIO_LOAD_WORKERS, thread_name_prefix='portfolio-load')
+
+
+def _load_calculator(fund_code):
+    """加载基金持仓，返回持有持仓的计算器"""
+    calculator = FundRealtimeCalculator()
+    calculator.get_fund_portfolio(fund_code, year=None, auto_detect_latest=True)
+    return calculator
+
+
+def _value_funds(fund_codes):
+    """
+    估值一组基金：优先使用估值缓存，其余基金共用一次行情请求
+
+    Returns:
+    --------
+    dict
+        基金代码 -> (估值结果, 错误信息, 是否为过期结果)
+    """
+    valuations = {}
+    pending = []
+    for fund_code in fund_codes:
+        cached = peek_valuation(fund_code)
+        if cached is not None:
+            valuations[fund_code] = (cached[0], None, cached[1])
+        else:
+            pending.append(fund_code)
+    if pending:
+        valuations.update(refresh_valuations(pending))
+    return valuations
+
+
+def refresh_valuations(fund_codes):
+    """
+    重新计算一组基金的估值并写入估值缓存（所有基金的持仓股合并为一次行情请求）
+
+    Parameters:
+    -----------
+    fund_codes : list
+        基金代码列表
+
+    Returns:
+    --------
+    dict
+        基金代码 -> (估值结果, 错误信息, 是否为过期结果)
+    """
+    valuations = {}
+    calculators = dict(zip(fund_codes, _load_executor.map(_load_calculator, fund_codes)))
+    stock_codes = sorted({
+        code
+        for calculator in calculators.values() if calculator.portfolio is not None
+        for code in calculator.portfolio['股票代码']
+    })
+
+    quotes = None
+    if stock_codes:
+        with span('quotes'):
+            quotes = FundRealtimeCalculator().get_stock_realtime_quotes(stock_codes)
+
+    for fund_code, calculator in calculators.items():
+        if calculator.portfolio is None:
+            # 指数型基金没有持仓时，直接使用跟踪指数/ETF估算
+            if not calculator.is_index_fund():
+                valuations[fund_code] = (None, '获取基金持仓失败', False)
+                continue
+        elif quotes is None:
+            valuations[fund_code] = (None, '获取股票行情失败', False)
+            continue
+        else:
+            calculator.stock_quotes = quotes
+        # 与单只基金估值共用进行中的计算，同一基金并发请求时只计算一次
+        result, message = compute_valuation_shared(fund_code, _calculate, calculator)
+        valuations[fund_code] = (result, message, False)
+    return valuations
+
+
+def _calculate(calculator):
+    """在已加载的持仓和行情上计算估值，返回 (结果, 错误信息)"""
+    with span('calculate'):
+        result = calculator.calculate_realtime_value()
+    if result is None:
+        return None, '计算估值失败'
+    return result, None
+
+
+def _summarize(amount, profit):
+    return {
+        'amount': round(amount, 2),
+        'profit': round(profit, 2),
+        'change': round(profit / amount * 100, 4) if amount else None,
+    }
+
+
+def value_portfolio(holdings):
+    """
+    估值整个自选组合
+
+    Parameters:
+    -----------
+    holdings : list
+        [{"code": 基金代码, "amount": 持仓金额, "group": 分组（可为空）}, ...]
+
+    Returns:
+    --------
+    dict
+        {"funds": [{"code", "name", "group", "amount", "change", "profit", "as_of", "stale", "error"}],
+         "groups": [{"group", "amount", "profit", "change"}],
+         "total": {"amount", "profit", "change"}}
+        涨跌幅为百分数，预估收益按 持仓金额 × 估算涨跌幅 计算；估值失败的基金不计入汇总
+    """
+    valuations = _value_funds(list(dict.fromkeys(item['code'] for item in holdings)))
+
+    funds = []
+    groups = {}
+    total_amount = total_profit = 0.0
+    for item in holdings:
+        result, message, stale = valuations[item['code']]
+        amount = item['amount']
+        entry = {'code': item['code'], 'group': item['group'], 'amount': amount}
+        if result is None:
+            entry.update({'name': None, 'change': None, 'profit': None,
+                          'as_of': None, 'stale': False, 'error': message})
+            funds.append(entry)
+            continue
+
+        change = float(result['weighted_change'])
+        profit = amount * change
+        entry.update({
+            'name': result['fund_name'],
+            'change': round(change * 100, 4),
+            'profit': round(profit, 2),
+            'as_of': result['calc_time'],
+            'stale': stale,
+            'error': None,
+        })
+        funds.append(entry)
+
+        group = groups.setdefault(item['group'], [0.0, 0.0])
+        group[0] += amount
+        group[1] += profit
+        total_amount += amount
+        total_profit += profit
+
+    return {
+        'funds': funds,
+        'groups': [{'group': group, **_summarize(amount, profit)} for group, (amount, profit) in groups.items()],
+        'total': _summarize(total_amount, total_profit),
+    }
@@ -0,0 +1,94 @@
+"""
+进程间文件锁
+- ProcessLock：多进程部署时后台任务（收盘刷新、热门基金预取、报告季持仓刷新）只需一个进程执行，
+  各进程以非阻塞方式尝试获取同一文件的排他锁，获取成功的进程负责执行并一直持有到进程退出，
+  该进程退出后由其他进程在下次尝试时接替
+- file_lock：多个写入方（服务进程、离线脚本）修改同一文件时的临界区
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+LOCK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache')
+
+
+def lock_path(name):
+    """锁文件路径"""
+    return os.path.join(LOCK_DIR, f'{name}.lock')
+
+
+class ProcessLock:
+    """进程选主锁（获取成功后持有到进程退出）"""
+
+    def __init__(self, name):
+        """
+        Parameters:
+        -----------
+        name : str
+            锁名称，同名的锁在所有进程间互斥
+        """
+        self.name = name
+        self._fd = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """
+        尝试成为执行后台任务的进程（不支持文件锁的平台上每个进程都执行）
+
+        Returns:
+        --------
+        bool
+            当前进程是否持有锁
+        """
+        if not HAS_FCNTL or self._fd is not None:
+            return True
+        with self._lock:
+            if self._fd is not None:
+                return True
+            os.makedirs(LOCK_DIR, exist_ok=True)
+            fd = os.open(lock_path(self.name), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+        logger.info("当前进程（pid=%s）负责执行 %s", os.getpid(), self.name)
+        return True
+
+
+@contextmanager
+def file_lock(name):
+    """
+    阻塞获取排他文件锁，退出 with 块时释放
+
+    Parameters:
+    -----------
+    name : str
+        锁名称
+    """
+    if not HAS_FCNTL:
+        yield
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    fd = os.open(lock_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
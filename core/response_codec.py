@@ -0,0 +1,95 @@
+"""
+接口响应编码
+- JSON 序列化：安装了 orjson 时使用 orjson，否则使用标准库 json
+- 压缩：按请求的 Accept-Encoding 协商 br（需安装 brotli）或 gzip，过小的响应不压缩
+"""
+
+import gzip
+import json
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# 小于该字节数的响应不压缩（压缩收益小于 CPU 开销）
+COMPRESS_MIN_BYTES = 1024
+# gzip 压缩级别（兼顾压缩率和 CPU）
+GZIP_LEVEL = 5
+# brotli 压缩质量（0-11，动态响应使用较低质量）
+BROTLI_QUALITY = 4
+
+
+def dumps(obj):
+    """
+    序列化为 UTF-8 编码的 JSON
+
+    Parameters:
+    -----------
+    obj : object
+        可序列化的对象（NaN 需事先替换为 None）
+
+    Returns:
+    --------
+    bytes
+        JSON 字节串
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def choose_encoding(accept_encoding):
+    """
+    根据 Accept-Encoding 选择压缩方式（优先 br，其次 gzip）
+
+    Parameters:
+    -----------
+    accept_encoding : str
+        请求头 Accept-Encoding 的值
+
+    Returns:
+    --------
+    str
+        'br'、'gzip'，不压缩时返回None
+    """
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if params in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    if HAS_BROTLI and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    """
+    压缩响应内容
+
+    Parameters:
+    -----------
+    body : bytes
+        原始内容
+    encoding : str
+        'br' 或 'gzip'
+
+    Returns:
+    --------
+    bytes
+        压缩后的内容
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
@@ -0,0 +1,294 @@
+"""
+跨进程共享的行情快照表
+多 worker 进程部署时，全市场行情快照保存在共享内存中的定长表（/dev/shm 下本部署私有目录中的内存映射文件）：
+- 通过文件锁选出一个进程负责刷新并写入，其余进程只读，上游请求数与进程数无关
+- 表头带版本号（seqlock）：写入前后各加一，读取方比较前后两次版本号判断是否读到一致的数据，读取不加锁；
+  写入进程在写入途中退出时版本号停在奇数，读取方不再等待，下一次写入先恢复为偶数
+- 负责刷新的进程退出后文件锁自动释放，其他进程在下一次刷新时接替
+"""
+
+import os
+import stat
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from core.log import get_logger
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+logger = get_logger(__name__)
+
+# 共享表文件目录：优先使用内存文件系统 /dev/shm，可通过 FUNDBASE_SHM_DIR 指定
+SHARED_QUOTES_DIR = os.environ.get(
+    'FUNDBASE_SHM_DIR',
+    '/dev/shm' if os.path.isdir('/dev/shm') else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache'),
+)
+# 同一部署的各进程之间交换数据（请求热度、预取结果）的私有目录：按用户和项目路径区分，
+# 同一主机上的其他用户和其他部署无法读写，可通过 FUNDBASE_DEPLOYMENT 指定部署名称
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DEPLOYMENT_NAME = os.environ.get('FUNDBASE_DEPLOYMENT') or '{}-{:08x}'.format(
+    os.getuid() if hasattr(os, 'getuid') else 0, zlib.crc32(PROJECT_ROOT.encode('utf-8')),
+)
+SHARED_DIR = os.path.join(SHARED_QUOTES_DIR, f"fundbase-{DEPLOYMENT_NAME}")
+
+
+def ensure_shared_dir():
+    """
+    创建私有共享目录（权限 0700）
+
+    Returns:
+    --------
+    bool
+        目录可用时返回True；目录不属于当前用户、不是目录或其他用户可访问时返回False
+    """
+    try:
+        os.makedirs(SHARED_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(SHARED_DIR)
+    except OSError as e:
+        logger.warning("创建共享目录 %s 失败: %s", SHARED_DIR, e)
+        return False
+    if not stat.S_ISDIR(st.st_mode) or not _owned(st) or st.st_mode & 0o077:
+        logger.warning("共享目录 %s 不属于当前用户或权限过宽，不使用跨进程共享", SHARED_DIR)
+        return False
+    return True
+
+
+def is_trusted_file(path):
+    """文件是否为当前用户拥有的普通文件（读取其他进程写入的共享文件前检查）"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and _owned(st)
+
+
+def _owned(st):
+    return not hasattr(os, 'getuid') or st.st_uid == os.getuid()
+
+
+# 是否启用跨进程共享（FUNDBASE_SHARED_QUOTES=0 时每个进程各自刷新快照）
+SHARED_QUOTES_ENABLED = os.environ.get('FUNDBASE_SHARED_QUOTES', '1') != '0' and HAS_FCNTL
+
+# 代码、名称字段的最大字节数（UTF-8）
+CODE_BYTES = 16
+NAME_BYTES = 64
+
+# 读取时遇到写入中的数据的最大重试次数
+READ_RETRIES = 100
+# 一次写入的最长耗时（秒）：版本号停在同一个奇数超过该时间时视为写入进程已中途退出
+WRITE_TIMEOUT = 0.05
+
+HEADER_DTYPE = np.dtype([
+    ('seq', '<u8'),          # 版本号，奇数表示正在写入，0 表示尚未写入
+    ('count', '<u8'),        # 有效行数
+    ('fetched_at', '<f8'),   # 快照下载完成时间
+    ('in_session', '<u8'),   # 是否在交易时段内下载
+    ('last_access', '<f8'),  # 任一进程最近一次查询时间（负责刷新的进程据此判断是否空闲）
+])
+
+
+class SharedQuoteTable:
+    """共享内存中的定长行情表"""
+
+    def __init__(self, name, columns, capacity):
+        """
+        Parameters:
+        -----------
+        name : str
+            表名（ASCII），不同快照使用不同的表
+        columns : list
+            字段，'名称' 以字符串保存，其余字段以 float64 保存
+        capacity : int
+            最大行数，超出部分丢弃
+        """
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.dtype = np.dtype(
+            [('代码', f'S{CODE_BYTES}')]
+            + [(col, f'S{NAME_BYTES}' if col == '名称' else '<f8') for col in self.columns]
+        )
+        # 文件名包含表结构摘要，字段或容量变化后自动使用新文件
+        layout = zlib.crc32(repr((self.dtype.descr, capacity)).encode('utf-8'))
+        self.path = os.path.join(SHARED_DIR, f"{name}_{layout:08x}.quotes")
+        self.is_refresher = False
+        self._fd = None
+        self._header = None
+        self._records = None
+        self._stuck_seq = None  # 写入进程中途退出时停留的奇数版本号
+
+    def open(self):
+        """
+        创建或打开共享表文件并映射到内存
+
+        Returns:
+        --------
+        bool
+            是否成功
+        """
+        size = HEADER_DTYPE.itemsize + self.dtype.itemsize * self.capacity
+        if not ensure_shared_dir():
+            return False
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+            if not _owned(os.fstat(fd)):
+                os.close(fd)
+                logger.warning("共享行情表 %s 不属于当前用户，不使用跨进程共享", self.path)
+                return False
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            mapping = np.memmap(self.path, dtype=np.uint8, mode='r+', shape=(size,))
+        except OSError as e:
+            logger.warning("打开共享行情表 %s 失败: %s", self.path, e)
+            return False
+        self._fd = fd
+        self._header = mapping[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+        self._records = mapping[HEADER_DTYPE.itemsize:].view(self.dtype)
+        return True
+
+    def try_become_refresher(self):
+        """
+        尝试成为负责刷新的进程（非阻塞文件锁，持有到进程退出）
+
+        Returns:
+        --------
+        bool
+            当前进程是否负责刷新
+        """
+        if self.is_refresher:
+            return True
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        self.is_refresher = True
+        logger.info("当前进程（pid=%s）负责刷新共享行情表 %s", os.getpid(), os.path.basename(self.path))
+        return True
+
+    @property
+    def seq(self):
+        return int(self._header['seq'][0])
+
+    @property
+    def last_access(self):
+        return float(self._header['last_access'][0])
+
+    def touch(self):
+        """记录一次查询"""
+        self._header['last_access'][0] = time.time()
+
+    def publish(self, table, fetched_at, in_session):
+        """
+        写入新快照（只能由负责刷新的进程调用）
+
+        Parameters:
+        -----------
+        table : pd.DataFrame
+            以'代码'为索引的行情表
+        fetched_at : float
+            下载完成时间
+        in_session : bool
+            是否在交易时段内下载
+
+        Returns:
+        --------
+        int
+            写入后的版本号
+        """
+        if len(table) > self.capacity:
+            logger.warning("共享行情表容量不足: %s 条，只保存前 %s 条", len(table), self.capacity)
+            table = table.iloc[:self.capacity]
+        rows = np.zeros(len(table), dtype=self.dtype)
+        rows['代码'] = [code.encode('utf-8')[:CODE_BYTES] for code in table.index]
+        for col in self.columns:
+            if col not in table.columns:
+                rows[col] = b'' if col == '名称' else np.nan
+            elif col == '名称':
+                rows[col] = [str(name).encode('utf-8')[:NAME_BYTES] for name in table[col]]
+            else:
+                rows[col] = table[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        header = self._header
+        seq = int(header['seq'][0])
+        # 上一个写入进程中途退出时版本号为奇数，先恢复为偶数
+        seq += seq & 1
+        header['seq'][0] = seq + 1
+        self._records[:len(rows)] = rows
+        header['count'][0] = len(rows)
+        header['fetched_at'][0] = fetched_at
+        header['in_session'][0] = int(bool(in_session))
+        header['seq'][0] = seq + 2
+        return seq + 2
+
+    def read(self):
+        """
+        读取当前快照（不加锁，读到写入中的数据时重试）
+
+        Returns:
+        --------
+        tuple
+            (版本号, 以'代码'为索引的行情表, 下载完成时间, 是否在交易时段内下载)，尚未写入时返回None
+        """
+        header = self._header
+        odd_seq, odd_since = None, 0.0
+        for _ in range(READ_RETRIES):
+            seq = int(header['seq'][0])
+            if seq == 0:
+                return None
+            if seq % 2:
+                if seq == self._stuck_seq:
+                    return None
+                now = time.monotonic()
+                if seq != odd_seq:
+                    odd_seq, odd_since = seq, now
+                elif now - odd_since > WRITE_TIMEOUT:
+                    # 写入进程中途退出，直到下一次写入前都读不到一致的数据，此后的读取不再等待
+                    self._stuck_seq = seq
+                    return None
+                time.sleep(0.001)
+                continue
+            count = int(header['count'][0])
+            fetched_at = float(header['fetched_at'][0])
+            in_session = bool(header['in_session'][0])
+            rows = np.array(self._records[:count])
+            if int(header['seq'][0]) != seq:
+                continue
+            return seq, self._to_frame(rows), fetched_at, in_session
+        return None
+
+    def _to_frame(self, rows):
+        table = pd.DataFrame({
+            col: np.char.decode(rows[col], 'utf-8') if col == '名称' else rows[col]
+            for col in self.columns
+        }, index=pd.Index(np.char.decode(rows['代码'], 'utf-8'), name='代码'))
+        return table
+
+
+def open_shared_table(name, columns, capacity):
+    """
+    打开共享行情表（未启用跨进程共享或打开失败时返回None）
+
+    Parameters:
+    -----------
+    name : str
+        表名
+    columns : list
+        字段
+    capacity : int
+        最大行数
+
+    Returns:
+    --------
+    SharedQuoteTable
+        共享行情表
+    """
+    if not SHARED_QUOTES_ENABLED:
+        return None
+    table = SharedQuoteTable(name, columns, capacity)
+    return table if table.open() else None
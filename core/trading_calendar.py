@@ -0,0 +1,140 @@
+"""
+交易日历与交易时段判断
+"""
+
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+
+from core.cache import SingleFlight, TTLCache
+from core.log import get_logger
+
+try:
+    import efinance as ef
+    HAS_EFINANCE = True
+except ImportError:
+    HAS_EFINANCE = False
+
+logger = get_logger(__name__)
+
+
+# 交易日历缓存（按天变化，缓存半天；获取失败时短时间内不再重试）
+TRADE_CALENDAR_TTL = 12 * 60 * 60
+TRADE_CALENDAR_RETRY_TTL = 10 * 60
+_trade_calendar_cache = TTLCache(ttl=TRADE_CALENDAR_TTL)
+# 缓存过期时多个线程同时未命中只下载一次交易日历
+_trade_calendar_flight = SingleFlight()
+
+
+def get_trade_dates():
+    """
+    获取交易日集合（带缓存）
+
+    Returns:
+        set: 交易日字符串集合（YYYY-MM-DD），获取失败时返回空集合
+    """
+    trade_dates = _trade_calendar_cache.get('trade_dates')
+    if trade_dates is not None:
+        return trade_dates
+    trade_dates, _ = _trade_calendar_flight.do('trade_dates', _download_trade_dates)
+    return trade_dates
+
+
+def _download_trade_dates():
+    """下载交易日历并写入缓存"""
+    trade_dates = _trade_calendar_cache.get('trade_dates')
+    if trade_dates is not None:
+        # 等待进入 SingleFlight 期间其他调用已完成下载
+        return trade_dates
+
+    trade_dates = frozenset()
+    if HAS_EFINANCE:
+        try:
+            trade_calendar = ef.stock.get_trade_calendar()
+            if trade_calendar is not None and not trade_calendar.empty:
+                trade_dates = frozenset(
+                    pd.to_datetime(trade_calendar['交易日期']).dt.strftime("%Y-%m-%d")
+                )
+        except Exception as e:
+            logger.warning("获取交易日历失败: %s", e)
+
+    ttl = TRADE_CALENDAR_TTL if trade_dates else TRADE_CALENDAR_RETRY_TTL
+    _trade_calendar_cache.set('trade_dates', trade_dates, ttl=ttl)
+    return trade_dates
+
+
+def is_trading_day(day=None):
+    """
+    判断是否为交易日（无法获取交易日历时按工作日判断）
+
+    Args:
+        day (datetime): 日期，默认今天
+
+    Returns:
+        bool: True表示交易日
+    """
+    day = day or datetime.now()
+    if day.weekday() >= 5:
+        return False
+    trade_dates = get_trade_dates()
+    if trade_dates:
+        return day.strftime("%Y-%m-%d") in trade_dates
+    return True
+
+
+def is_trading_time():
+    """
+    判断当前是否为交易时间（周一至周五 9:30-11:30, 13:00-15:00）
+
+    Returns:
+        bool: True表示交易时间
+    """
+    now = datetime.now()
+
+    # 检查是否为工作日（周一至周五）
+    if now.weekday() >= 5:  # 5=周六, 6=周日
+        return False
+
+    # 检查是否在交易时间段
+    current_time = now.time()
+    morning_start = time(9, 30)
+    morning_end = time(11, 30)
+    afternoon_start = time(13, 0)
+    afternoon_end = time(15, 0)
+
+    if not ((morning_start <= current_time <= morning_end) or (afternoon_start <= current_time <= afternoon_end)):
+        return False
+
+    # 检查是否为法定节假日（使用缓存的交易日历）
+    trade_dates = get_trade_dates()
+    if trade_dates:
+        return now.strftime("%Y-%m-%d") in trade_dates
+
+    # 如果无法获取交易日历，返回当前时间判断结果
+    return True
+
+
+# 每个交易日的收盘时刻（午间休市、收盘）
+SESSION_ENDS = (time(11, 30), time(15, 0))
+
+
+def last_session_end(now=None):
+    """
+    获取最近一次已经结束的交易时段的结束时间
+
+    Args:
+        now (datetime): 当前时间，默认现在
+
+    Returns:
+        datetime: 最近一个交易日 11:30 或 15:00 中不晚于 now 的最大值，最近两周没有交易日时返回None
+    """
+    now = now or datetime.now()
+    for days_ago in range(15):
+        day = now - timedelta(days=days_ago)
+        if not is_trading_day(day):
+            continue
+        for session_end in reversed(SESSION_ENDS):
+            end = datetime.combine(day.date(), session_end)
+            if end <= now:
+                return end
+    return None
@@ -0,0 +1,309 @@
+"""
+全市场基金估值引擎
+将所有已知持仓组织为 基金×证券 的稀疏权重矩阵，每个 tick 只取一次全市场行情向量，
+通过一次稀疏矩阵-向量乘法得到所有基金的估算涨跌幅（加权方式与 calculate_realtime_value 一致）。
+稀疏矩阵使用 scipy（已列入 requirements.txt）；未安装时回退到 np.bincount 按行累加，结果相同但较慢
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.fund_dataset import get_fund_dataset
+from core.fund_realtime_calc import get_known_portfolios, parse_percent
+from core.holdings_store import get_holdings_store
+from core.index_fund_map import INDEX_FUND_TYPES, get_index_target
+from core.log import get_logger
+from core.market_snapshot import a_share_spot_snapshot, etf_spot_snapshot, hk_spot_snapshot, index_spot_snapshot
+
+try:
+    from scipy import sparse
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+logger = get_logger(__name__)
+
+# 权重矩阵的重建间隔（秒），持仓来自季报，无需每个 tick 重建
+MATRIX_REBUILD_SECONDS = 60
+
+# 各类证券对应的行情快照
+KIND_SNAPSHOTS = {
+    'stock': a_share_spot_snapshot,
+    'hk': hk_spot_snapshot,
+    'index': index_spot_snapshot,
+    'etf': etf_spot_snapshot,
+}
+
+
+def holding_kind(stock_code):
+    """持仓股票的证券类型：5位数字代码为港股（与 get_stock_realtime_quotes 的划分一致），其余为A股"""
+    return 'hk' if len(stock_code) == 5 and stock_code.isdigit() else 'stock'
+
+
+class HoldingsMatrix:
+    """基金×证券 稀疏权重矩阵"""
+
+    def __init__(self, fund_codes, methods, securities, rows, cols, weights):
+        """
+        Parameters:
+        -----------
+        fund_codes : list
+            行对应的基金代码
+        methods : list
+            每只基金的估值方式，'holdings'（重仓股加权）或 'index'（跟踪指数/ETF）
+        securities : list
+            列对应的证券，(类型, 代码) 元组，类型为 KIND_SNAPSHOTS 的键
+        rows, cols, weights : np.ndarray
+            非零元素的行号、列号和权重（占净值比例，小数）
+        """
+        self.fund_codes = fund_codes
+        self.methods = methods
+        self.securities = securities
+        self.rows = rows
+        self.cols = cols
+        self.weights = weights
+        self.built_at = time.time()
+        shape = (len(fund_codes), len(securities))
+        self._matrix = sparse.csr_matrix((weights, (rows, cols)), shape=shape) if HAS_SCIPY else None
+
+    @classmethod
+    def from_holdings(cls, portfolios, dataset=None, store=None):
+        """
+        由持仓数据构建权重矩阵
+
+        有持仓的基金按重仓股加权（进程内持仓优先于本地持仓库）；
+        没有持仓的指数型基金以权重1.0跟踪其指数或目标ETF
+
+        Parameters:
+        -----------
+        portfolios : dict
+            {基金代码: 持仓 DataFrame（包含'股票代码'、'占净值比例'列）}
+        dataset : FundDataset
+            基金信息，用于识别没有持仓的指数型基金，默认使用共享数据集
+        store : HoldingsStore
+            本地持仓库，默认不使用
+
+        Returns:
+        --------
+        HoldingsMatrix
+        """
+        if dataset is None:
+            dataset = get_fund_dataset()
+
+        fund_codes, methods = [], []
+        security_index = {}
+        rows, cols, weights = [], [], []
+
+        def column_of(security):
+            col = security_index.get(security)
+            if col is None:
+                col = security_index[security] = len(security_index)
+            return col
+
+        for fund_code, portfolio in portfolios.items():
+            if portfolio is None or portfolio.empty:
+                continue
+            row = len(fund_codes)
+            fund_codes.append(fund_code)
+            methods.append('holdings')
+            for stock_code, ratio in zip(portfolio['股票代码'].tolist(), portfolio['占净值比例'].tolist()):
+                stock_code = str(stock_code)
+                rows.append(row)
+                cols.append(column_of((holding_kind(stock_code), stock_code)))
+                weights.append(parse_percent(ratio))
+        parts = [(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                  np.asarray(weights, dtype=np.float64))]
+
+        # 本地持仓库整列向量化处理
+        if store is not None and len(store):
+            columns = store.columns
+            mask = ~np.isin(columns['fund_code'], list(portfolios))
+            store_funds, fund_rows = np.unique(columns['fund_code'][mask], return_inverse=True)
+            store_stocks, stock_cols = np.unique(columns['stock_code'][mask], return_inverse=True)
+            stock_columns = np.array([column_of((holding_kind(str(code)), str(code))) for code in store_stocks],
+                                     dtype=np.int64)
+            parts.append((fund_rows.astype(np.int64) + len(fund_codes), stock_columns[stock_cols],
+                          columns['weight'][mask].astype(np.float64) / 100))
+            fund_codes.extend(str(code) for code in store_funds)
+            methods.extend(['holdings'] * len(store_funds))
+
+        rows, cols, weights = [], [], []
+        for fund_code in dataset.codes:
+            if fund_code in portfolios or (store is not None and fund_code in store):
+                continue
+            if not dataset.get_type(fund_code).startswith(INDEX_FUND_TYPES):
+                continue
+            target = get_index_target(fund_code, dataset.get_name(fund_code))
+            if target is None:
+                continue
+            rows.append(len(fund_codes))
+            cols.append(column_of((target.get('kind', 'index'), target['code'])))
+            weights.append(1.0)
+            fund_codes.append(fund_code)
+            methods.append('index')
+        parts.append((np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                      np.asarray(weights, dtype=np.float64)))
+
+        return cls(
+            fund_codes, methods, list(security_index),
+            np.concatenate([part[0] for part in parts]),
+            np.concatenate([part[1] for part in parts]),
+            np.concatenate([part[2] for part in parts]),
+        )
+
+    def __len__(self):
+        return len(self.fund_codes)
+
+    def dot(self, vector):
+        """
+        计算 权重矩阵 × 证券向量
+
+        Parameters:
+        -----------
+        vector : np.ndarray
+            与 securities 对齐的向量
+
+        Returns:
+        --------
+        np.ndarray
+            与 fund_codes 对齐的结果
+        """
+        if self._matrix is not None:
+            return self._matrix @ vector
+        return np.bincount(self.rows, weights=self.weights * vector[self.cols], minlength=len(self.fund_codes))
+
+    def quote_vector(self):
+        """
+        从行情快照取出与 securities 对齐的涨跌幅向量
+
+        Returns:
+        --------
+        tuple
+            (涨跌幅向量（小数，缺失为0）, 是否有行情的布尔向量)
+        """
+        changes = np.full(len(self.securities), np.nan)
+        kinds = np.array([kind for kind, _ in self.securities])
+        codes = [code for _, code in self.securities]
+        for kind, snapshot in KIND_SNAPSHOTS.items():
+            positions = np.flatnonzero(kinds == kind)
+            if len(positions) == 0:
+                continue
+            table = snapshot.get_table()
+            if table is None or '涨跌幅' not in table.columns:
+                continue
+            kind_codes = [codes[position] for position in positions]
+            changes[positions] = table['涨跌幅'].reindex(kind_codes).to_numpy(dtype=np.float64) / 100
+        quoted = ~np.isnan(changes)
+        return np.where(quoted, changes, 0.0), quoted
+
+
+class ValuationEngine:
+    """全市场基金估值引擎（进程内共享）"""
+
+    def __init__(self, portfolio_source=get_known_portfolios, store_source=get_holdings_store,
+                 rebuild_seconds=MATRIX_REBUILD_SECONDS):
+        """
+        Parameters:
+        -----------
+        portfolio_source : callable
+            返回 {基金代码: 持仓 DataFrame} 的函数（进程内已加载的持仓）
+        store_source : callable
+            返回本地持仓库 HoldingsStore 的函数，为None时不使用持仓库
+        rebuild_seconds : float
+            权重矩阵的重建间隔（秒）
+        """
+        self.portfolio_source = portfolio_source
+        self.store_source = store_source
+        self.rebuild_seconds = rebuild_seconds
+        self._matrix = None
+        self._result = None
+        self._result_key = None
+        self._lock = threading.Lock()  # 只保护结果计算和缓存，不在等待行情下载期间持有
+        self._matrix_lock = threading.Lock()
+
+    def get_matrix(self, force=False):
+        """获取权重矩阵，超过重建间隔时重新构建"""
+        matrix = self._matrix
+        if not force and matrix is not None and time.time() - matrix.built_at < self.rebuild_seconds:
+            return matrix
+        with self._matrix_lock:
+            matrix = self._matrix
+            if not force and matrix is not None and time.time() - matrix.built_at < self.rebuild_seconds:
+                return matrix
+            start = time.time()
+            store = self.store_source() if self.store_source is not None else None
+            matrix = HoldingsMatrix.from_holdings(self.portfolio_source(), store=store)
+            self._matrix = matrix
+            logger.info("估值权重矩阵已构建: %s 只基金 × %s 只证券，%s 个非零元素，耗时 %.2f 秒",
+                        len(matrix), len(matrix.securities), len(matrix.weights), time.time() - start)
+        return matrix
+
+    def value_all(self):
+        """
+        计算所有可估值基金的实时估值（同一组行情快照只计算一次）
+
+        Returns:
+        --------
+        pd.DataFrame
+            以'基金代码'为索引，包含 基金名称、估算涨跌幅（小数）、持仓覆盖率、估值方式 列
+        """
+        matrix = self.get_matrix()
+        # 先启动各快照的后台刷新（首次使用时各市场并发下载），再读取行情；
+        # 等待首次下载时不持有引擎锁，其他请求不会因此排队
+        for kind in {kind for kind, _ in matrix.securities}:
+            KIND_SNAPSHOTS[kind].start_background_refresh()
+        changes, quoted = matrix.quote_vector()
+        result_key = (matrix.built_at, tuple(snapshot.fetched_at for snapshot in KIND_SNAPSHOTS.values()))
+        with self._lock:
+            if self._result is not None and self._result_key == result_key:
+                return self._result
+
+            start = time.time()
+            weighted_change = matrix.dot(changes)
+            total_weight = matrix.dot(np.ones(len(matrix.securities)))
+            quoted_weight = matrix.dot(quoted.astype(np.float64))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                coverage = np.where(total_weight > 0, quoted_weight / total_weight, 0.0)
+
+            dataset = get_fund_dataset()
+            result = pd.DataFrame({
+                '基金代码': matrix.fund_codes,
+                '基金名称': [dataset.get_name(fund_code) for fund_code in matrix.fund_codes],
+                '估算涨跌幅': weighted_change,
+                '持仓覆盖率': coverage,
+                '估值方式': matrix.methods,
+            }).set_index('基金代码')
+            logger.debug("全市场估值完成: %s 只基金，耗时 %.1f 毫秒", len(result), (time.time() - start) * 1000)
+
+            self._result = result
+            self._result_key = result_key
+            return result
+
+    def ranking(self, n=20, ascending=False, min_coverage=0.0):
+        """
+        按估算涨跌幅排序
+
+        Parameters:
+        -----------
+        n : int
+            返回数量
+        ascending : bool
+            是否升序（跌幅榜）
+        min_coverage : float
+            最低持仓覆盖率，过滤行情缺失较多的基金
+
+        Returns:
+        --------
+        pd.DataFrame
+            排序后的前 n 只基金
+        """
+        result = self.value_all()
+        if min_coverage > 0:
+            result = result[result['持仓覆盖率'] >= min_coverage]
+        return result.sort_values('估算涨跌幅', ascending=ascending).head(n)
+
+
+valuation_engine = ValuationEngine()
@@ -0,0 +1,358 @@
+"""
+基金日内估值序列
+每次计算出的估值按基金记录到当日的数组环形缓冲区（时间、估算涨跌幅），每只基金内存有上限；
+交易时间内定期、收盘后（以及午间休市时）整日数据以列式 npz 保存到 cache/valuation_series/，
+多进程部署时各进程保存时按 (基金, 时间) 合并，查询当日序列时合并内存与文件中其他进程记录的点；
+查询序列只读内存或磁盘（文件按修改时间缓存并建立基金索引），不会触发重新计算或上游请求。
+保存时只在锁内复制各基金的序列，读取、合并和写入文件都在锁外进行，不阻塞记录估值的请求
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from core.cache import TTLCache
+from core.holdings_store import atomic_savez
+from core.log import get_logger
+from core.process_lock import file_lock
+from core.trading_calendar import is_trading_time
+
+logger = get_logger(__name__)
+
+SERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'valuation_series')
+
+# 每只基金每日最多保存的点数（4小时交易时段按5秒一个点）
+SERIES_CAPACITY = 4 * 60 * 60 // 5
+# 缓冲区初始大小，按需倍增到 SERIES_CAPACITY
+SERIES_INITIAL_SIZE = 64
+# 同一基金两个点的最小间隔（秒），间隔内的新估值覆盖上一个点
+SERIES_MIN_INTERVAL = 5
+# 后台保存线程的检查间隔（秒）
+PERSIST_CHECK_SECONDS = 60
+# 交易时间内保存的间隔（秒），其他进程记录的点最多延迟该时间后可见
+PERSIST_TRADING_INTERVAL = 5 * 60
+# 缓存的序列文件数（当日及最近查询过的历史日期），文件更新后按修改时间重新加载
+SERIES_FILE_CACHE_SIZE = 4
+
+_EMPTY_TIMES = np.array([], dtype=np.int32)
+_EMPTY_CHANGES = np.array([], dtype=np.float32)
+
+
+def merge_points(fund_codes, times, changes):
+    """
+    按 (基金, 时间) 合并多个来源的点，同一时间的点保留后出现的
+
+    Returns:
+    --------
+    tuple
+        按基金、时间排序的 (基金代码数组, 时间数组, 涨跌幅数组)
+    """
+    if not len(fund_codes):
+        return fund_codes, times, changes
+    order = np.lexsort((times, fund_codes))
+    fund_codes, times, changes = fund_codes[order], times[order], changes[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (fund_codes[1:] != fund_codes[:-1]) | (times[1:] != times[:-1])
+    return fund_codes[last], times[last], changes[last]
+
+
+class SeriesFile:
+    """已加载的单日序列文件（按基金、时间排序，按基金代码二分查找）"""
+
+    def __init__(self, fund_codes, times, changes):
+        fund_codes = fund_codes.astype(str)
+        if np.any(fund_codes[1:] < fund_codes[:-1]):
+            # 保存时已按 (基金, 时间) 排序，只有格式不符的旧文件需要重新排序
+            fund_codes, times, changes = merge_points(fund_codes, times, changes)
+        self.times, self.changes = times, changes
+        # 只保留各基金的起止位置，不保留逐点的基金代码
+        self.starts = np.flatnonzero(np.concatenate([[len(fund_codes) > 0], fund_codes[1:] != fund_codes[:-1]]))
+        self.fund_codes = fund_codes[self.starts]
+        self.ends = np.append(self.starts[1:], len(fund_codes))
+
+    def get(self, fund_code):
+        """返回基金的 (时间数组, 涨跌幅数组)，没有数据时返回两个空数组"""
+        index = np.searchsorted(self.fund_codes, fund_code)
+        if index == len(self.fund_codes) or self.fund_codes[index] != fund_code:
+            return _EMPTY_TIMES, _EMPTY_CHANGES
+        start, end = self.starts[index], self.ends[index]
+        return self.times[start:end], self.changes[start:end]
+
+
+class FundSeries:
+    """单只基金单日的估值环形缓冲区"""
+
+    def __init__(self, capacity=SERIES_CAPACITY):
+        self.capacity = capacity
+        self.times = np.zeros(min(SERIES_INITIAL_SIZE, capacity), dtype=np.int32)
+        self.changes = np.zeros(len(self.times), dtype=np.float32)
+        self.count = 0
+        self.head = 0  # 缓冲区写满后，最早一个点的位置
+
+    @classmethod
+    def from_arrays(cls, times, changes, capacity=SERIES_CAPACITY):
+        """由按时间排序的数组创建（超出容量时只保留最近的点）"""
+        series = cls(capacity)
+        times, changes = times[-capacity:], changes[-capacity:]
+        series.times = np.zeros(max(len(times), len(series.times)), dtype=np.int32)
+        series.changes = np.zeros(len(series.times), dtype=np.float32)
+        series.times[:len(times)] = times
+        series.changes[:len(times)] = changes
+        series.count = len(times)
+        return series
+
+    def append(self, seconds, change, min_interval=SERIES_MIN_INTERVAL):
+        """
+        追加一个点
+
+        Parameters:
+        -----------
+        seconds : int
+            当日零点起的秒数
+        change : float
+            估算涨跌幅（小数）
+        min_interval : int
+            与上一个点间隔不足该秒数时覆盖上一个点
+        """
+        if self.count:
+            last = (self.head + self.count - 1) % len(self.times)
+            if seconds - self.times[last] < min_interval:
+                self.changes[last] = change
+                return
+        if self.count == len(self.times) and len(self.times) < self.capacity:
+            self._grow()
+        if self.count < len(self.times):
+            position = (self.head + self.count) % len(self.times)
+            self.count += 1
+        else:
+            position = self.head
+            self.head = (self.head + 1) % len(self.times)
+        self.times[position] = seconds
+        self.changes[position] = change
+
+    def _grow(self):
+        size = min(len(self.times) * 2, self.capacity)
+        times, changes = self.to_arrays()
+        self.times = np.zeros(size, dtype=np.int32)
+        self.changes = np.zeros(size, dtype=np.float32)
+        self.times[:self.count] = times
+        self.changes[:self.count] = changes
+        self.head = 0
+
+    def to_arrays(self):
+        """按时间顺序返回 (时间数组, 涨跌幅数组) 的副本"""
+        order = (self.head + np.arange(self.count)) % len(self.times)
+        return self.times[order], self.changes[order]
+
+
+class ValuationSeriesStore:
+    """按日记录所有基金的估值序列"""
+
+    def __init__(self, directory=SERIES_DIR, capacity=SERIES_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        self.day = None
+        self._series = {}
+        self._dirty = False
+        self._persisted_at = 0.0
+        self._lock = threading.Lock()
+        self._persister = None
+        # 日期 -> (文件修改时间, SeriesFile)
+        self._files = TTLCache(ttl=float('inf'), maxsize=SERIES_FILE_CACHE_SIZE)
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{day}.npz")
+
+    def record(self, fund_code, change, timestamp=None):
+        """
+        记录一只基金的估值
+
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+        change : float
+            估算涨跌幅（小数）
+        timestamp : float
+            时间戳，默认当前时间
+        """
+        now = datetime.fromtimestamp(timestamp if timestamp is not None else time.time())
+        day = now.strftime("%Y-%m-%d")
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        previous = None
+        with self._lock:
+            if day != self.day:
+                previous = self._roll_over(day)
+            series = self._series.get(fund_code)
+            if series is None:
+                series = self._series[fund_code] = FundSeries(self.capacity)
+            series.append(seconds, float(change))
+            self._dirty = True
+        if previous is not None:
+            self._write(*previous)
+
+    def _roll_over(self, day):
+        """
+        切换到新的一天（调用方持有锁）：载入当日已保存的数据（服务在盘中重启时接续之前的序列）
+
+        Returns:
+        --------
+        tuple
+            前一日未保存的数据（由调用方在锁外保存），没有时返回None
+        """
+        previous = self._snapshot_locked() if self._dirty else None
+        self.day = day
+        self._series = {}
+        self._dirty = False
+        saved = self._load_file(day)
+        if saved is None:
+            return previous
+        for fund_code in saved.fund_codes:
+            fund_code = str(fund_code)
+            self._series[fund_code] = FundSeries.from_arrays(*saved.get(fund_code), capacity=self.capacity)
+        return previous
+
+    def _load_file(self, day):
+        """
+        加载某日的序列文件（文件未修改时使用缓存）
+
+        Returns:
+        --------
+        SeriesFile
+            没有文件或读取失败时返回None
+        """
+        path = self._path(day)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._files.get(day)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                saved = SeriesFile(data['fund_code'], data['time'], data['change'])
+        except (OSError, ValueError):
+            return None
+        self._files.set(day, (mtime, saved))
+        return saved
+
+    def get_series(self, fund_code, day=None):
+        """
+        获取基金某日的估值序列（当日读内存，历史日期读磁盘）
+
+        Parameters:
+        -----------
+        fund_code : str
+            基金代码
+        day : str
+            日期，格式"YYYY-MM-DD"，默认当日
+
+        Returns:
+        --------
+        tuple
+            (当日零点起的秒数数组, 估算涨跌幅数组)，没有数据时返回两个空数组
+        """
+        if day is None:
+            day = datetime.now().strftime("%Y-%m-%d")
+        memory = None
+        with self._lock:
+            if day == self.day and fund_code in self._series:
+                memory = self._series[fund_code].to_arrays()
+        saved = self._load_file(day)
+        times, changes = saved.get(fund_code) if saved is not None else (_EMPTY_TIMES, _EMPTY_CHANGES)
+        if memory is None:
+            return times, changes
+        # 文件中包含其他进程记录的点，与本进程内存中的点合并（同一时间以内存为准）
+        memory_times, memory_changes = memory
+        _, times, changes = merge_points(
+            np.zeros(len(times) + len(memory_times), dtype=np.int8),
+            np.concatenate([times, memory_times]),
+            np.concatenate([changes, memory_changes]),
+        )
+        return times, changes
+
+    def persist(self):
+        """将当日所有基金的序列保存到磁盘"""
+        with self._lock:
+            snapshot = self._snapshot_locked()
+        if snapshot is not None:
+            self._write(*snapshot)
+
+    def _snapshot_locked(self):
+        """
+        复制当日所有基金的序列（调用方持有锁），复制后标记为已保存
+
+        Returns:
+        --------
+        tuple
+            (日期, [(基金代码, 时间数组, 涨跌幅数组)])，没有数据时返回None
+        """
+        arrays = [(fund_code, *series.to_arrays()) for fund_code, series in self._series.items()]
+        self._dirty = False
+        return (self.day, arrays) if arrays else None
+
+    def _write(self, day, arrays):
+        """与文件中的点按 (基金, 时间) 合并后写回（不持有 self._lock）"""
+        fund_codes = np.concatenate([np.full(len(times), fund_code) for fund_code, times, _ in arrays]).astype(str)
+        times = np.concatenate([times for _, times, _ in arrays])
+        changes = np.concatenate([changes for _, _, changes in arrays])
+        try:
+            # 保留其他进程记录的点；文件锁避免多个进程（及本进程的多个线程）同时读改写
+            with file_lock('valuation_series'):
+                try:
+                    with np.load(self._path(day), allow_pickle=False) as data:
+                        fund_codes = np.concatenate([data['fund_code'].astype(str), fund_codes])
+                        times = np.concatenate([data['time'], times])
+                        changes = np.concatenate([data['change'], changes])
+                except (OSError, ValueError):
+                    pass
+                merged_codes, merged_times, merged_changes = merge_points(fund_codes, times, changes)
+                atomic_savez(self._path(day), {
+                    'fund_code': merged_codes,
+                    'time': merged_times,
+                    'change': merged_changes,
+                })
+                # 写入的数据已排序，直接作为该日文件的缓存，查询时无需重新加载
+                self._files.set(day, (os.stat(self._path(day)).st_mtime_ns,
+                                      SeriesFile(merged_codes, merged_times, merged_changes)))
+        except Exception:
+            # 保存失败时保留未保存标记，下一轮重试
+            self._dirty = True
+            raise
+        self._persisted_at = time.time()
+        logger.info("已保存 %s 的估值序列: %s 个点", day, len(merged_times))
+
+    def start_persister(self, interval=PERSIST_CHECK_SECONDS):
+        """
+        启动后台保存线程（进程内只启动一次）：有新数据时，交易时间内每 PERSIST_TRADING_INTERVAL 秒保存一次，
+        非交易时间（收盘后和午间休市时）立即保存
+
+        Parameters:
+        -----------
+        interval : int
+            检查间隔（秒）
+        """
+        with self._lock:
+            if self._persister is not None and self._persister.is_alive():
+                return
+            self._persister = threading.Thread(target=self._persist_loop, args=(interval,),
+                                               name='valuation-series-persister', daemon=True)
+            self._persister.start()
+
+    def _persist_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                if not self._dirty:
+                    continue
+                if not is_trading_time() or time.time() - self._persisted_at >= PERSIST_TRADING_INTERVAL:
+                    self.persist()
+            except Exception as e:
+                logger.warning("保存估值序列失败: %s", e)
+
+
+valuation_series = ValuationSeriesStore()
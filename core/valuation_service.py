@@ -0,0 +1,322 @@
+"""
+单只基金估值服务
+封装 获取持仓 -> 获取行情 -> 计算估值 的流程，同一基金的并发请求合并为一次计算：
+开盘等高峰时刻大量用户同时查询热门基金，上游请求数随基金数增长而不随用户数增长
+
+估值结果按 stale-while-revalidate 方式缓存：
+- 软过期（VALUATION_SOFT_TTL）内直接返回缓存结果
+- 软过期后、硬过期（VALUATION_HARD_TTL）前返回缓存结果并标记为过期，同时在后台刷新一次
+- 硬过期后同步重新计算
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from core.cache import SingleFlight, TTLCache
+from core.closing_snapshot import closing_snapshot
+from core.fund_realtime_calc import FundRealtimeCalculator
+from core.log import get_logger
+from core.metrics import span
+
+logger = get_logger(__name__)
+
+# 估值结果软过期时间（秒），与行情快照刷新周期一致
+VALUATION_SOFT_TTL = 5
+# 估值结果硬过期时间（秒），超过后不再返回旧结果
+VALUATION_HARD_TTL = 60
+# 后台刷新估值的线程数
+VALUATION_REFRESH_WORKERS = 4
+
+_valuation_flight = SingleFlight()
+# 基金代码 -> (估值结果, 计算完成时间戳)
+_valuation_cache = TTLCache(ttl=VALUATION_HARD_TTL, maxsize=5000)
+_refresh_executor = ThreadPoolExecutor(max_workers=VALUATION_REFRESH_WORKERS, thread_name_prefix='valuation-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _compute_valuation(fund_code):
+    """执行一次完整的估值计算，返回 (结果, 错误信息)"""
+    # 每次计算使用独立的计算器实例（多线程部署时互不干扰）
+    calculator = FundRealtimeCalculator()
+
+    # 1. 获取基金持仓
+    portfolio = calculator.get_fund_portfolio(fund_code, year=None, auto_detect_latest=True)
+    if portfolio is None:
+        # 指数型基金没有持仓时，直接使用跟踪指数/ETF估算
+        if not calculator.is_index_fund():
+            return None, '获取基金持仓失败，请检查基金代码'
+    else:
+        # 2. 获取股票实时行情
+        with span('quotes'):
+            quotes = calculator.get_stock_realtime_quotes()
+        if quotes is None:
+            return None, '获取股票行情失败'
+
+    # 3. 计算估值
+    with span('calculate'):
+        result = calculator.calculate_realtime_value()
+    if result is None:
+        return None, '计算估值失败'
+    return result, None
+
+
+def _refresh_valuation(fund_code):
+    """计算估值并写入缓存（同一基金进行中的计算会被并发请求共享）"""
+    return compute_valuation_shared(fund_code, _compute_valuation, fund_code)
+
+
+def compute_valuation_shared(fund_code, compute, *args):
+    """
+    执行 compute(*args) 计算基金估值，成功时写入估值缓存；
+    同一基金进行中的计算（单只基金估值或组合估值）会被并发请求共享，不重复计算
+
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+    compute : callable
+        返回 (估值结果, 错误信息) 的计算函数
+
+    Returns:
+    --------
+    tuple
+        (估值结果, 错误信息)
+    """
+    (result, message), shared = _valuation_flight.do(fund_code, _compute_and_cache, fund_code, compute, *args)
+    if shared:
+        logger.debug("共享进行中的基金【%s】估值计算结果", fund_code)
+    return result, message
+
+
+def _compute_and_cache(fund_code, compute, *args):
+    result, message = compute(*args)
+    if result is not None:
+        store_valuation(fund_code, result)
+    return result, message
+
+
+def store_valuation(fund_code, result):
+    """
+    写入估值结果缓存
+
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+    result : dict
+        calculate_realtime_value 返回的估值结果
+    """
+    _valuation_cache.set(fund_code, (result, time.time()))
+    closing_snapshot.record_valuation(fund_code, result)
+
+
+def _background_refresh(fund_code):
+    try:
+        _refresh_valuation(fund_code)
+    except Exception as e:
+        logger.warning("后台刷新基金【%s】估值失败: %s", fund_code, e)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(fund_code)
+
+
+def _schedule_refresh(fund_code):
+    """提交一次后台刷新（同一基金已在后台刷新时跳过）"""
+    with _refreshing_lock:
+        if fund_code in _refreshing:
+            return
+        _refreshing.add(fund_code)
+    _refresh_executor.submit(_background_refresh, fund_code)
+
+
+def get_fund_valuation(fund_code):
+    """
+    获取基金实时估值（优先返回缓存结果，见模块说明）
+
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+
+    Returns:
+    --------
+    tuple
+        (估值结果, 错误信息, 是否为过期结果)：成功时错误信息为None，失败时估值结果为None。
+        估值结果会被多个请求共享，调用方只能读取不能修改；
+        过期结果的计算时间见结果中的 calc_time
+    """
+    cached = peek_valuation(fund_code)
+    if cached is not None:
+        result, stale = cached
+        return result, None, stale
+
+    result, message = _refresh_valuation(fund_code)
+    return result, message, False
+
+
+def peek_valuation(fund_code):
+    """
+    只查询估值结果缓存，不做同步计算（软过期后同样提交一次后台刷新）；
+    非交易时间优先返回收盘快照中休市后计算的估值
+
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+
+    Returns:
+    --------
+    tuple
+        (估值结果, 是否为过期结果)，没有未硬过期的缓存时返回None
+    """
+    closing = closing_snapshot.get_valuation(fund_code)
+    if closing is not None:
+        return closing, False
+
+    cached = _valuation_cache.get(fund_code)
+    if cached is None:
+        return None
+    result, computed_at = cached
+    if time.time() - computed_at < VALUATION_SOFT_TTL:
+        return result, False
+    _schedule_refresh(fund_code)
+    return result, True
+
+
+def cached_valuation(fund_code):
+    """
+    读取估值结果缓存（不检查软过期，也不触发后台刷新）
+
+    Returns:
+    --------
+    tuple
+        (估值结果, 计算完成时间戳)，没有未硬过期的缓存时返回None
+    """
+    return _valuation_cache.get(fund_code)
+
+
+def is_valuation_fresh(fund_code):
+    """估值结果缓存是否仍在软过期时间内"""
+    cached = _valuation_cache.get(fund_code)
+    return cached is not None and time.time() - cached[1] < VALUATION_SOFT_TTL
+
+
+def adopt_valuation(fund_code, result, computed_at):
+    """
+    写入其他进程计算的估值结果（比本进程缓存新时才写入，保留原计算时间）
+
+    Parameters:
+    -----------
+    fund_code : str
+        基金代码
+    result : dict
+        估值结果
+    computed_at : float
+        计算完成时间戳
+    """
+    if time.time() - computed_at >= VALUATION_HARD_TTL:
+        return
+    cached = _valuation_cache.get(fund_code)
+    if cached is None or cached[1] < computed_at:
+        _valuation_cache.set(fund_code, (result, computed_at), ttl=VALUATION_HARD_TTL - (time.time() - computed_at))
+
+
+def format_valuation(result, stale=False):
+    """
+    将估值结果转换为接口返回的数据格式（/api/calculate 的 data 字段）
+
+    Parameters:
+    -----------
+    result : dict
+        calculate_realtime_value 返回的估值结果
+    stale : bool
+        是否为过期结果
+
+    Returns:
+    --------
+    dict
+        可直接序列化为 JSON 的估值数据
+    """
+    stock_details = []
+    for _, row in result['stock_details'].iterrows():
+        change_str = str(row['涨跌幅'])  # 确保是字符串
+        # 处理 NaN 值，替换为 null
+        price = row['最新价']
+        if pd.isna(price):
+            price = None
+        ratio = row['占净值比例']
+        if pd.isna(ratio):
+            ratio = None
+        stock_details.append({
+            'code': row['股票代码'],
+            'name': row['股票名称'],
+            'ratio': ratio,
+            'price': price,
+            'change': change_str
+        })
+
+    # 格式化加权涨跌幅为字符串
+    change_value = result['weighted_change'] * 100
+    if change_value >= 0:
+        weighted_change_str = f"+{change_value:.2f}%"
+    else:
+        weighted_change_str = f"{change_value:.2f}%"
+
+    return {
+        'fund_code': result['fund_code'],
+        'fund_name': result['fund_name'],
+        'weighted_change': weighted_change_str,  # 确保是字符串格式
+        'calc_time': result['calc_time'],
+        'as_of': result['calc_time'],
+        'stale': stale,
+        'stock_details': stock_details
+    }
+
+
+def _column(details, name, percent=False):
+    """取出一列并将 NaN 替换为 None，percent 为 True 时将小数转换为保留4位小数的百分数"""
+    if name not in details.columns:
+        return []
+    column = details[name]
+    if percent:
+        column = (column.astype(float) * 100).round(4)
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def format_valuation_compact(result, stale=False):
+    """
+    将估值结果转换为紧凑格式：数值不再格式化为字符串（涨跌幅、持仓比例均为百分数），
+    持仓明细按列输出，不逐行遍历 DataFrame
+
+    Parameters:
+    -----------
+    result : dict
+        calculate_realtime_value 返回的估值结果
+    stale : bool
+        是否为过期结果
+
+    Returns:
+    --------
+    dict
+        {"fund_code", "fund_name", "change", "as_of", "stale",
+         "stocks": {"code": [...], "name": [...], "ratio": [...], "price": [...], "change": [...]}}
+    """
+    details = result['stock_details']
+    return {
+        'fund_code': result['fund_code'],
+        'fund_name': result['fund_name'],
+        'change': round(float(result['weighted_change']) * 100, 4),
+        'as_of': result['calc_time'],
+        'stale': stale,
+        'stocks': {
+            'code': _column(details, '股票代码'),
+            'name': _column(details, '股票名称'),
+            'ratio': _column(details, '持仓比例_num', percent=True),
+            'price': _column(details, '最新价'),
+            'change': _column(details, '涨跌幅_num', percent=True),
+        },
+    }
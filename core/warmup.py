@@ -0,0 +1,227 @@
+"""
+服务启动预热
+在接收流量前预先加载基金信息、指数基金跟踪标的、本地持仓库、交易日历、收盘快照、行情接口连接以及热门基金持仓，
+并维护就绪状态供 /readyz 探针使用：必需步骤（REQUIRED_STEPS）全部成功后才标记为就绪，
+失败时 /readyz 返回503并列出失败的步骤，后台预热每隔 WARM_UP_RETRY_SECONDS 重试未成功的步骤；
+就绪后启动热门基金预取线程（见 core/popularity.py）
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# 默认预热持仓的热门基金，可通过环境变量 FUNDBASE_WARM_FUNDS（逗号分隔）覆盖
+DEFAULT_WARM_FUNDS = ['110011', '000001', '161725', '005827', '003096', '110022', '260108', '161005']
+
+# 并发预热持仓的线程数
+WARM_UP_WORKERS = 4
+
+# 必需的预热步骤：基金信息和交易日历加载失败时无法正确估值，服务不标记为就绪
+REQUIRED_STEPS = ('fund_dataset', 'trade_calendar')
+# 后台预热未就绪时重试未成功步骤的间隔（秒）
+WARM_UP_RETRY_SECONDS = 30
+
+
+class WarmUpState:
+    """预热状态"""
+
+    def __init__(self):
+        self.started_at = None
+        self.finished_at = None
+        self.steps = {}
+        self._ready = threading.Event()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def record(self, step, ok, detail=''):
+        self.steps[step] = {'ok': bool(ok), 'detail': detail}
+
+    def succeeded(self, step):
+        return self.steps.get(step, {}).get('ok', False)
+
+    def failed_steps(self):
+        """执行过但失败的步骤"""
+        return [step for step, result in self.steps.items() if not result['ok']]
+
+    def finish(self):
+        """
+        一轮预热执行完毕：必需步骤全部成功时标记为就绪
+
+        Returns:
+        --------
+        bool
+            是否就绪
+        """
+        self.finished_at = time.time()
+        if all(self.succeeded(step) for step in REQUIRED_STEPS):
+            self._ready.set()
+        return self.ready
+
+    def to_dict(self):
+        return {
+            'ready': self.ready,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'required_steps': list(REQUIRED_STEPS),
+            'failed_steps': self.failed_steps(),
+            'steps': self.steps,
+        }
+
+
+warm_up_state = WarmUpState()
+_warm_up_lock = threading.Lock()
+
+
+def get_warm_funds():
+    """
+    获取需要预热持仓的基金代码列表
+
+    Returns:
+    --------
+    list
+        基金代码列表
+    """
+    env_funds = os.environ.get('FUNDBASE_WARM_FUNDS', '')
+    funds = [code.strip() for code in env_funds.split(',') if code.strip()]
+    return funds or list(DEFAULT_WARM_FUNDS)
+
+
+def _warm_fund_portfolio(fund_code):
+    """预热单只基金的持仓缓存"""
+    from core.fund_realtime_calc import FundRealtimeCalculator
+    portfolio = FundRealtimeCalculator().get_fund_portfolio(fund_code, year=None, auto_detect_latest=True)
+    return portfolio is not None and not portfolio.empty
+
+
+def _run_step(step, func):
+    """执行单个预热步骤，失败不影响后续步骤（重试时跳过已成功的步骤）"""
+    if warm_up_state.succeeded(step):
+        return
+    start = time.time()
+    try:
+        ok, detail = func()
+    except Exception as e:
+        ok, detail = False, str(e)
+    warm_up_state.record(step, ok, f"{detail} ({time.time() - start:.2f}s)".strip())
+    logger.log(logging.INFO if ok else logging.WARNING, "预热 %s: %s %s", step, '成功' if ok else '失败', detail)
+
+
+def warm_up(fund_codes=None):
+    """
+    执行预热（各步骤尽力而为，全部执行完后必需步骤均成功时标记为就绪；
+    未就绪时再次调用只重新执行失败的步骤）
+
+    Parameters:
+    -----------
+    fund_codes : list
+        需要预热持仓的基金代码，默认使用 get_warm_funds()
+
+    Returns:
+    --------
+    WarmUpState
+        预热状态
+    """
+    with _warm_up_lock:
+        if warm_up_state.ready:
+            return warm_up_state
+        if warm_up_state.started_at is None:
+            warm_up_state.started_at = time.time()
+
+        def load_dataset():
+            from core.fund_dataset import reload_fund_dataset, start_fund_dataset_watcher
+            dataset = reload_fund_dataset()
+            start_fund_dataset_watcher()
+            return len(dataset) > 0, f"{len(dataset)} 只基金"
+
+        def load_index_fund_map():
+            from core.index_fund_map import reload_index_fund_map
+            index_fund_map = reload_index_fund_map()
+            return len(index_fund_map) > 0, f"{len(index_fund_map)} 只指数型基金"
+
+        def load_holdings_store():
+            from core.holdings_store import reload_holdings_store
+            store = reload_holdings_store()
+            return True, f"{len(store)} 只基金持仓"
+
+        def load_calendar():
+            from core.trading_calendar import get_trade_dates
+            trade_dates = get_trade_dates()
+            return len(trade_dates) > 0, f"{len(trade_dates)} 个交易日"
+
+        def load_closing_snapshot():
+            from core.closing_snapshot import closing_snapshot
+            loaded = closing_snapshot.load()
+            closing_snapshot.start_persister()
+            if not loaded:
+                return True, '无'
+            return True, f"{len(closing_snapshot.symbols())} 只股票，{len(closing_snapshot.fund_codes())} 只基金"
+
+        def open_sessions():
+            from api.get_all_stock_quotes import warm_up_providers
+            return warm_up_providers(), ''
+
+        def load_portfolios():
+            codes = fund_codes if fund_codes is not None else get_warm_funds()
+            with ThreadPoolExecutor(max_workers=WARM_UP_WORKERS, thread_name_prefix='warm-up') as executor:
+                results = list(executor.map(_warm_fund_portfolio, codes))
+            return all(results), f"{sum(results)}/{len(codes)} 只基金"
+
+        # 依次执行：基金信息 -> 指数基金映射 -> 本地持仓库 -> 交易日历 -> 收盘快照 -> 行情连接 -> 热门基金持仓
+        _run_step('fund_dataset', load_dataset)
+        _run_step('index_fund_map', load_index_fund_map)
+        _run_step('holdings_store', load_holdings_store)
+        _run_step('trade_calendar', load_calendar)
+        _run_step('closing_snapshot', load_closing_snapshot)
+        _run_step('quote_sessions', open_sessions)
+        _run_step('portfolios', load_portfolios)
+
+        if not warm_up_state.finish():
+            logger.error("预热未就绪，失败的步骤: %s", ', '.join(warm_up_state.failed_steps()))
+            return warm_up_state
+        logger.info("预热完成，耗时 %.2f 秒", warm_up_state.finished_at - warm_up_state.started_at)
+
+        # 此后由热门基金预取线程在交易时间内保持热门基金估值常驻内存，并在开盘前预热
+        from core.popularity import hot_fund_prefetcher
+        hot_fund_prefetcher.start()
+        # 报告季内按热度探测并更新新公布的基金持仓
+        from core.holdings_refresh import holdings_refresher
+        holdings_refresher.start()
+        return warm_up_state
+
+
+def start_warm_up(background=True, fund_codes=None):
+    """
+    启动预热
+
+    Parameters:
+    -----------
+    background : bool
+        是否在后台线程执行（服务可立即响应 /healthz，就绪前 /readyz 返回503，未就绪时定期重试）
+    fund_codes : list
+        需要预热持仓的基金代码
+
+    Returns:
+    --------
+    WarmUpState
+        预热状态
+    """
+    if background:
+        threading.Thread(target=_warm_up_until_ready, kwargs={'fund_codes': fund_codes},
+                         name='warm-up', daemon=True).start()
+    else:
+        warm_up(fund_codes=fund_codes)
+    return warm_up_state
+
+
+def _warm_up_until_ready(fund_codes=None):
+    """后台预热：必需步骤失败时每隔 WARM_UP_RETRY_SECONDS 重试，直到就绪"""
+    while not warm_up(fund_codes=fund_codes).ready:
+        time.sleep(WARM_UP_RETRY_SECONDS)
@@ -0,0 +1,22 @@
+"""
+gunicorn 配置
+用法: gunicorn -c gunicorn.conf.py "wsgi:create_app()"
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('FUNDBASE_HOST', '0.0.0.0')}:{os.environ.get('FUNDBASE_PORT', '5000')}"
+
+# 估值请求以等待上游接口为主，使用多进程 + 多线程
+worker_class = 'gthread'
+workers = int(os.environ.get('FUNDBASE_WORKERS', min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get('FUNDBASE_THREADS', '16'))
+
+# 不使用 preload_app：预热线程需要在每个 worker 进程内启动
+preload_app = False
+
+# 上游行情接口较慢，适当放宽超时
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指数型基金跟踪标的映射表生成脚本
+将 fund_info.json 中所有指数型基金（指数型-股票、指数型-海外股票）解析为跟踪的指数代码或目标ETF代码，
+保存到 cache/index_fund_map.json，供估值时直接查表
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.index_fund_map import (
+    INDEX_FUND_MAP_JSON, INDEX_FUND_TYPES, match_index_by_name, normalize_index_name,
+)
+from scripts.update_fund_info import atomic_write, load_fund_store
+
+
+def load_index_name_table():
+    """
+    构建 归一化指数名称 -> 目标信息 的对照表
+
+    Returns:
+        dict: {归一化名称: {'code': ..., 'kind': 'index', 'name': ...}}
+    """
+    import akshare as ak
+
+    name_table = {}
+    try:
+        index_info = ak.index_stock_info()
+        for code, name in zip(index_info['index_code'].astype(str), index_info['display_name'].astype(str)):
+            name_table.setdefault(normalize_index_name(name), {'code': code, 'kind': 'index', 'name': name})
+        print(f"获取到 {len(index_info)} 个指数名称")
+    except Exception as e:
+        print(f"获取指数列表失败: {e}")
+    return name_table
+
+
+def load_tracking_targets():
+    """
+    获取指数型基金的跟踪标的名称
+
+    Returns:
+        dict: {基金代码: 跟踪标的名称}
+    """
+    import akshare as ak
+
+    try:
+        index_funds = ak.fund_info_index_em(symbol="全部", indicator="全部")
+        if '跟踪标的' not in index_funds.columns:
+            print("指数基金列表中没有'跟踪标的'字段")
+            return {}
+        index_funds = index_funds.dropna(subset=['跟踪标的'])
+        print(f"获取到 {len(index_funds)} 只指数基金的跟踪标的")
+        return dict(zip(index_funds['基金代码'].astype(str), index_funds['跟踪标的'].astype(str)))
+    except Exception as e:
+        print(f"获取指数基金跟踪标的失败: {e}")
+        return {}
+
+
+def build_index_fund_map():
+    """
+    生成指数型基金跟踪标的映射表
+
+    解析顺序：跟踪标的名称精确匹配 -> 跟踪标的名称包含内置常用指数（代码已人工核对，按原名匹配）
+    -> 跟踪标的名称包含匹配 -> 基金名称包含内置常用指数 -> 基金名称包含匹配
+
+    Returns:
+        dict: {基金代码: {'code': ..., 'kind': ..., 'name': ..., 'source': ...}}
+    """
+    print("开始生成指数型基金跟踪标的映射表...")
+    start_time = time.time()
+
+    fund_dict = load_fund_store()
+    index_funds = {
+        code: info for code, info in fund_dict.items()
+        if isinstance(info, dict) and info.get('类型', '').startswith(INDEX_FUND_TYPES)
+    }
+    print(f"本地基金信息中共有 {len(index_funds)} 只指数型基金")
+
+    name_table = load_index_name_table()
+    tracking_targets = load_tracking_targets()
+
+    result = {}
+    for fund_code, fund_info in index_funds.items():
+        target = None
+        source = None
+        tracking_name = tracking_targets.get(fund_code)
+        if tracking_name:
+            target = name_table.get(normalize_index_name(tracking_name))
+            source = '跟踪标的'
+            if target is None:
+                target = match_index_by_name(tracking_name) or match_index_by_name(tracking_name, name_table)
+        if target is None:
+            fund_name = fund_info.get('名称', '')
+            target = match_index_by_name(fund_name) or match_index_by_name(fund_name, name_table)
+            source = '基金名称'
+        if target is not None:
+            result[fund_code] = dict(target, source=source)
+
+    atomic_write(INDEX_FUND_MAP_JSON, lambda f: json.dump({
+        'build_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'index_fund_count': len(index_funds),
+        'resolved_count': len(result),
+        'funds': result,
+    }, f, ensure_ascii=False, indent=2))
+
+    print(f"成功解析 {len(result)}/{len(index_funds)} 只指数型基金，耗时 {time.time() - start_time:.2f} 秒")
+    print(f"映射表已保存到 {INDEX_FUND_MAP_JSON}")
+    return result
+
+
+if __name__ == "__main__":
+    build_index_fund_map()
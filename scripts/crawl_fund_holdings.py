@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基金持仓批量爬虫脚本
+并发抓取所有股票型、混合型及股票指数型基金的最新重仓股持仓，保存为列式持仓库 cache/fund_holdings.npz，
+供服务进程直接加载（见 core/holdings_store.py）
+
+- 有界线程池 + 全局限速，避免对上游接口造成突发压力
+- 每完成一只基金即追加写入当天的检查点，当天中断后再次运行自动从检查点继续（之前的检查点作废）
+- 单只基金失败时指数退避重试，最终仍失败的基金保留持仓库中的旧数据
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.holdings_store import (
+    HOLDINGS_COLUMNS, HOLDINGS_LOCK, HOLDINGS_NPZ, load_holdings_store, save_holdings_store,
+)
+from core.process_lock import file_lock
+from scripts.update_fund_info import CACHE_DIR, load_fund_store
+
+# 检查点按运行日期区分，只用于续跑当天中断的抓取
+HOLDINGS_CHECKPOINT_PATTERN = os.path.join(CACHE_DIR, 'fund_holdings_checkpoint_{run_date}.jsonl')
+
+# 需要抓取持仓的基金类型前缀
+HOLDINGS_FUND_TYPES = ('股票型', '混合型', '指数型-股票')
+
+# 默认并发数、每秒请求数和重试次数
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 5.0
+DEFAULT_RETRIES = 3
+
+
+class RateLimiter:
+    """线程安全的匀速限流器（每秒最多 rate 次请求）"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def normalize_quarter(value):
+    """
+    将报告期统一为 YYYY-MM-DD 格式
+
+    Args:
+        value: "2024-09-30"、"2024年3季度股票投资明细" 等
+
+    Returns:
+        str: 报告期末日期，无法识别时返回原字符串
+    """
+    text = str(value)
+    match = re.search(r'(\d{4})年(\d)季度', text)
+    if match:
+        year, quarter = int(match.group(1)), int(match.group(2))
+        return f"{year}-{['03-31', '06-30', '09-30', '12-31'][quarter - 1]}"
+    match = re.search(r'(\d{4})-?(\d{2})-?(\d{2})', text)
+    if match:
+        return '-'.join(match.groups())
+    return text
+
+
+def fetch_holdings(fund_code):
+    """
+    获取单只基金最新一期的重仓股持仓
+
+    Args:
+        fund_code (str): 基金代码
+
+    Returns:
+        tuple: (报告期, [[股票代码, 股票名称, 占净值比例], ...])，没有持仓时列表为空
+    """
+    try:
+        import efinance as ef
+        data = ef.fund.get_invest_position(fund_code)
+        if data is not None and not data.empty:
+            quarter = normalize_quarter(data['公布日期'].iloc[0]) if '公布日期' in data.columns else ''
+            holdings = [[str(code), str(name), float(weight)]
+                        for code, name, weight in zip(data['股票代码'], data['股票简称'], data['持仓占比'])]
+            return quarter, holdings
+    except ImportError:
+        pass
+
+    import akshare as ak
+    for year in (datetime.now().year, datetime.now().year - 1):
+        data = ak.fund_portfolio_hold_em(symbol=fund_code, date=str(year))
+        if data is None or data.empty:
+            continue
+        quarters = data['季度'].map(normalize_quarter)
+        latest = quarters.max()
+        data = data[quarters == latest]
+        holdings = [[str(code), str(name), float(weight)]
+                    for code, name, weight in zip(data['股票代码'], data['股票名称'], data['占净值比例'])]
+        return latest, holdings
+    return '', []
+
+
+def fetch_with_retry(fund_code, limiter, retries):
+    """限流并按指数退避重试获取单只基金持仓"""
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return fetch_holdings(fund_code)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def checkpoint_path(run_date=None):
+    """
+    获取检查点文件路径
+
+    Args:
+        run_date (str): 运行日期 YYYYMMDD，默认今天
+
+    Returns:
+        str: 检查点文件路径
+    """
+    return HOLDINGS_CHECKPOINT_PATTERN.format(run_date=run_date or datetime.now().strftime('%Y%m%d'))
+
+
+def discard_stale_checkpoints(current_path):
+    """删除之前运行遗留的检查点（其中的持仓已过时，不能视为本次已完成）"""
+    for path in glob.glob(HOLDINGS_CHECKPOINT_PATTERN.format(run_date='*')):
+        if os.path.abspath(path) != os.path.abspath(current_path):
+            os.remove(path)
+            print(f"已删除过期检查点: {os.path.basename(path)}")
+
+
+def load_checkpoint(path):
+    """
+    读取检查点
+
+    Returns:
+        dict: {基金代码: {'quarter': ..., 'holdings': [...]}}
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断时可能写了半行，忽略
+                continue
+            records[record['fund_code']] = record
+    return records
+
+
+def get_target_funds():
+    """
+    获取需要抓取持仓的基金代码列表
+
+    Returns:
+        list: 基金代码列表
+    """
+    fund_dict = load_fund_store()
+    return [
+        code for code, info in fund_dict.items()
+        if isinstance(info, dict) and info.get('类型', '').startswith(HOLDINGS_FUND_TYPES)
+    ]
+
+
+def build_store_columns(records, previous_store=None):
+    """
+    将检查点记录合并为持仓库列数据（本次未成功抓取或上游返回空持仓的基金沿用旧持仓）
+
+    Args:
+        records (dict): 检查点记录
+        previous_store (HoldingsStore): 旧持仓库
+
+    Returns:
+        dict: HOLDINGS_COLUMNS 各列对应的列表
+    """
+    columns = {name: [] for name in HOLDINGS_COLUMNS}
+    for fund_code, record in records.items():
+        for stock_code, stock_name, weight in record['holdings']:
+            columns['fund_code'].append(fund_code)
+            columns['quarter'].append(record['quarter'])
+            columns['stock_code'].append(stock_code)
+            columns['stock_name'].append(stock_name)
+            columns['weight'].append(weight)
+
+    if previous_store is not None:
+        kept = 0
+        for fund_code in previous_store.fund_codes:
+            # 上游偶尔返回空持仓，不能因此删除已有的持仓
+            if records.get(fund_code, {}).get('holdings'):
+                continue
+            portfolio = previous_store.get_portfolio(fund_code)
+            columns['fund_code'].extend([fund_code] * len(portfolio))
+            columns['quarter'].extend(portfolio['季度'])
+            columns['stock_code'].extend(portfolio['股票代码'])
+            columns['stock_name'].extend(portfolio['股票名称'])
+            columns['weight'].extend(portfolio['占净值比例'])
+            kept += 1
+        if kept:
+            print(f"{kept} 只基金本次未获取到持仓，沿用持仓库中的旧数据")
+    return columns
+
+
+def crawl_fund_holdings(workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, retries=DEFAULT_RETRIES,
+                        restart=False, limit=None):
+    """
+    批量抓取基金持仓并生成持仓库
+
+    Args:
+        workers (int): 并发线程数
+        rate (float): 每秒最多请求数
+        retries (int): 单只基金失败后的重试次数
+        restart (bool): 是否丢弃已有检查点重新抓取
+        limit (int): 只抓取前 limit 只基金（调试用）
+
+    Returns:
+        dict: 抓取统计
+    """
+    start_time = time.time()
+    checkpoint_file = checkpoint_path()
+    discard_stale_checkpoints(checkpoint_file)
+    if restart and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+    fund_codes = get_target_funds()
+    if limit is not None:
+        fund_codes = fund_codes[:limit]
+    records = load_checkpoint(checkpoint_file)
+    pending = [code for code in fund_codes if code not in records]
+    print(f"共 {len(fund_codes)} 只基金需要持仓，检查点中已完成 {len(fund_codes) - len(pending)} 只，"
+          f"本次抓取 {len(pending)} 只（{workers} 线程，每秒最多 {rate} 次请求）")
+
+    limiter = RateLimiter(rate)
+    failed = []
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(checkpoint_file, 'a', encoding='utf-8') as checkpoint, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='holdings') as executor:
+        futures = {executor.submit(fetch_with_retry, code, limiter, retries): code for code in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            fund_code = futures[future]
+            try:
+                quarter, holdings = future.result()
+            except Exception as e:
+                failed.append(fund_code)
+                print(f"基金 {fund_code} 持仓获取失败: {e}")
+                continue
+            record = {'fund_code': fund_code, 'quarter': quarter, 'holdings': holdings}
+            records[fund_code] = record
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + '\n')
+            checkpoint.flush()
+            if done % 100 == 0:
+                print(f"进度: {done}/{len(pending)}，失败 {len(failed)} 只")
+
+    # 与服务进程的报告季持仓刷新互斥：读取旧持仓库到写回之间持有文件锁
+    with file_lock(HOLDINGS_LOCK):
+        try:
+            previous_store = load_holdings_store()
+        except FileNotFoundError:
+            previous_store = None
+        target_funds = set(fund_codes)
+        columns = build_store_columns(
+            {code: record for code, record in records.items() if code in target_funds}, previous_store
+        )
+        save_holdings_store(columns)
+
+    # 全部成功后清除检查点，存在失败时保留，当天再次运行只重试失败的基金
+    if not failed and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+    stats = {
+        'fund_count': len(fund_codes),
+        'fetched': len(pending) - len(failed),
+        'failed': len(failed),
+        'rows': len(columns['fund_code']),
+        'elapsed': round(time.time() - start_time, 2),
+    }
+    print(f"持仓库已保存到 {HOLDINGS_NPZ}: {stats}")
+    if failed:
+        print(f"失败的基金（当天再次运行将自动重试）: {failed[:20]}{' ...' if len(failed) > 20 else ''}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='批量抓取基金持仓并生成本地持仓库')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并发线程数')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='每秒最多请求数')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help='失败重试次数')
+    parser.add_argument('--restart', action='store_true', help='丢弃检查点重新抓取')
+    parser.add_argument('--limit', type=int, default=None, help='只抓取前N只基金（调试用）')
+    args = parser.parse_args()
+    crawl_fund_holdings(workers=args.workers, rate=args.rate, retries=args.retries,
+                        restart=args.restart, limit=args.limit)
@@ -7,6 +7,14 @@
 
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core.fund_dataset import FundDataset, get_fund_dataset
+
+# 最近一次传入的基金信息字典及其数据集（同一字典重复搜索时不再重建索引）
+_dict_dataset = (None, None)
 
 def load_fund_info():
     """
@@ -30,50 +38,31 @@ def search_funds(keyword, fund_dict=None):
     多关键字搜索基金
     
     Args:
-        keyword (str): 搜索关键字（基金代码、简称、拼音缩写）
-        fund_dict (dict): 基金信息字典，默认自动加载
+        keyword (str): 搜索关键字（基金代码、简称、拼音缩写），多个关键字用空格分隔
+        fund_dict (dict): 基金信息字典，默认使用服务共用的基金信息数据集；
+            传入时按字典对象缓存搜索索引（修改字典内容后需传入新的字典）
         
     Returns:
         list: 匹配的基金列表
     """
+    global _dict_dataset
     if fund_dict is None:
-        fund_dict = load_fund_info()
-        if fund_dict is None:
-            return []
+        dataset = get_fund_dataset()
+    else:
+        cached_dict, dataset = _dict_dataset
+        if cached_dict is not fund_dict:
+            dataset = FundDataset(fund_dict)
+            _dict_dataset = (fund_dict, dataset)
     
     results = []
-    keyword_lower = keyword.lower()
-    
-    for fund_code, fund_info in fund_dict.items():
-        # 检查基金代码
-        if keyword_lower in fund_code.lower():
-            results.append({
-                '代码': fund_code,
-                '名称': fund_info['名称'],
-                '拼音缩写': fund_info['拼音缩写'],
-                '类型': fund_info['类型']
-            })
-            continue
-        
-        # 检查基金简称
-        if keyword_lower in fund_info['名称'].lower():
-            results.append({
-                '代码': fund_code,
-                '名称': fund_info['名称'],
-                '拼音缩写': fund_info['拼音缩写'],
-                '类型': fund_info['类型']
-            })
-            continue
-        
-        # 检查拼音缩写
-        if keyword_lower in fund_info['拼音缩写'].lower():
-            results.append({
-                '代码': fund_code,
-                '名称': fund_info['名称'],
-                '拼音缩写': fund_info['拼音缩写'],
-                '类型': fund_info['类型']
-            })
-            continue
+    for fund_code in dataset.search(keyword):
+        fund_info = dataset.get(fund_code)
+        results.append({
+            '代码': fund_code,
+            '名称': fund_info['名称'],
+            '拼音缩写': fund_info['拼音缩写'],
+            '类型': fund_info['类型']
+        })
     
     return results
 
@@ -100,6 +89,6 @@ def print_search_results(results):
 
 if __name__ == "__main__":
     # 示例使用
-    keyword = input("请输入搜索关键字（基金代码、简称、拼音缩写）: ")
+    keyword = input("请输入搜索关键字（基金代码、简称、拼音缩写，多个关键字用空格分隔）: ")
     results = search_funds(keyword)
     print_search_results(results)
\ No newline at end of file
@@ -2,90 +2,223 @@
 # -*- coding: utf-8 -*-
 """
 基金信息更新脚本
-当查询的基金代码不在本地缓存中时，自动更新基金信息
+统一的基金信息刷新流程：下载全量基金列表，与本地缓存比对，
+仅在有变化时通过原子替换写入 fund_info.json / fund_info.csv，并记录数据集版本号
 """
 
+import argparse
+import hashlib
 import json
 import os
-import akshare as ak
+import tempfile
+import time
 from datetime import datetime
 
-def update_fund_info():
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache')
+FUND_INFO_JSON = os.path.join(CACHE_DIR, 'fund_info.json')
+FUND_INFO_CSV = os.path.join(CACHE_DIR, 'fund_info.csv')
+FUND_INFO_METADATA = os.path.join(CACHE_DIR, 'fund_info_metadata.json')
+
+# akshare 列名 -> 本地缓存字段名
+FIELD_MAPPING = {
+    '基金简称': '名称',
+    '拼音缩写': '拼音缩写',
+    '基金类型': '类型',
+}
+
+# 新列表基金数量低于本地缓存的该比例时，视为上游数据不完整，放弃本次写入
+MIN_RETAIN_RATIO = 0.9
+
+
+def atomic_write(path, write_func, encoding='utf-8'):
+    """
+    原子写入文件：先写入同目录临时文件，再通过 os.replace 替换目标文件
+
+    读取方要么看到旧文件，要么看到完整的新文件，不会读到写了一半的内容
+
+    Args:
+        path (str): 目标文件路径
+        write_func (callable): 接收文件对象并写入内容的函数
+        encoding (str): 文件编码
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as f:
+            write_func(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 默认权限为 0600，改为常规权限以便 Web 应用进程读取
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def build_fund_dict(fund_info):
+    """
+    将 ak.fund_name_em() 返回的 DataFrame 转换为基金信息字典（向量化处理）
+
+    Args:
+        fund_info (pd.DataFrame): 全量基金列表
+
+    Returns:
+        dict: {基金代码: {'名称': ..., '拼音缩写': ..., '类型': ...}}
+    """
+    df = fund_info[['基金代码', *FIELD_MAPPING]].rename(columns=FIELD_MAPPING)
+    df = df.fillna('').astype(str)
+    # 与逐行写入字典的行为一致：重复代码以最后一条为准
+    df = df.drop_duplicates(subset='基金代码', keep='last')
+    return df.set_index('基金代码').to_dict('index')
+
+
+def diff_fund_dict(old_dict, new_dict):
+    """
+    比对新旧基金信息字典
+
+    Args:
+        old_dict (dict): 本地缓存中的基金信息
+        new_dict (dict): 最新下载的基金信息
+
+    Returns:
+        dict: 包含 added / removed / changed 三个代码列表
+    """
+    old_codes = old_dict.keys()
+    new_codes = new_dict.keys()
+    return {
+        'added': sorted(new_codes - old_codes),
+        'removed': sorted(old_codes - new_codes),
+        'changed': sorted(code for code in new_codes & old_codes if old_dict[code] != new_dict[code]),
+    }
+
+
+def load_fund_store():
+    """
+    读取本地基金信息缓存
+
+    Returns:
+        dict: 基金信息字典，文件不存在或损坏时返回空字典
+    """
+    try:
+        with open(FUND_INFO_JSON, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"读取本地基金信息缓存失败: {e}")
+        return {}
+
+
+def load_metadata():
     """
-    更新基金信息缓存
+    读取基金信息元数据
+
+    Returns:
+        dict: 元数据字典，文件不存在时返回空字典
+    """
+    try:
+        with open(FUND_INFO_METADATA, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def get_dataset_version():
+    """
+    获取当前基金信息数据集版本号
+
+    Returns:
+        int: 数据集版本号，从未刷新过时返回 0
+    """
+    return int(load_metadata().get('dataset_version', 0))
+
+
+def update_fund_info(force=False):
+    """
+    刷新基金信息缓存
+
+    下载全量基金列表并与本地缓存比对，仅在有新增、删除或变更时写入文件。
+    所有文件均通过原子替换写入，运行中的 Web 应用不会读到不完整的文件。
+
+    Args:
+        force (bool): 即使无变化也重写文件（首次爬取时使用）
+
+    Returns:
+        dict: 最新的基金信息字典，失败时返回 None
     """
-    print("开始更新基金信息缓存...")
-    
+    import akshare as ak
+
+    print("开始刷新基金信息缓存...")
+    start_time = time.time()
+
     try:
-        # 使用akshare获取全部基金信息
         fund_info = ak.fund_name_em()
         print(f"成功获取 {len(fund_info)} 只基金信息")
-        
-        # 转换为字典格式，方便快速查询
-        fund_dict = {}
-        for _, row in fund_info.iterrows():
-            fund_code = row['基金代码']
-            fund_name = row['基金简称']
-            fund_pinyin = row['拼音缩写']
-            fund_type = row['基金类型']
-            fund_dict[fund_code] = {
-                '名称': fund_name,
-                '拼音缩写': fund_pinyin,
-                '类型': fund_type
-            }
-        
-        # 保存为JSON文件
-        json_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info.json')
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(fund_dict, f, ensure_ascii=False, indent=2)
-        print(f"基金信息已保存到 {json_path}")
-        
-        # 保存为CSV文件（可选）
-        csv_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info.csv')
-        fund_info.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        print(f"基金信息已保存到 {csv_path}")
-        
-        # 保存爬取元数据
-        metadata = {
-            "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "fund_count": len(fund_dict),
-            "version": "1.0"
-        }
-        metadata_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info_metadata.json')
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
-        
+
+        fund_dict = build_fund_dict(fund_info)
+        old_dict = load_fund_store()
+        changes = diff_fund_dict(old_dict, fund_dict)
+        has_changes = any(changes.values())
+
+        print(f"新增 {len(changes['added'])} 只，删除 {len(changes['removed'])} 只，"
+              f"变更 {len(changes['changed'])} 只")
+
+        if old_dict and len(fund_dict) < len(old_dict) * MIN_RETAIN_RATIO:
+            print(f"最新基金数量 {len(fund_dict)} 明显少于本地缓存 {len(old_dict)}，疑似数据不完整，放弃写入")
+            return old_dict
+
+        metadata = load_metadata()
+        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        if has_changes or force or not os.path.exists(FUND_INFO_JSON):
+            content = json.dumps(fund_dict, ensure_ascii=False, indent=2)
+            atomic_write(FUND_INFO_JSON, lambda f: f.write(content))
+            print(f"基金信息已保存到 {FUND_INFO_JSON}")
+
+            atomic_write(FUND_INFO_CSV, lambda f: fund_info.to_csv(f, index=False), encoding='utf-8-sig')
+            print(f"基金信息已保存到 {FUND_INFO_CSV}")
+
+            metadata.update({
+                "crawl_time": now_str,
+                "fund_count": len(fund_dict),
+                "version": "1.0",
+                "dataset_version": int(metadata.get('dataset_version', 0)) + 1,
+                "content_hash": hashlib.sha1(content.encode('utf-8')).hexdigest(),
+                "changes": {key: len(codes) for key, codes in changes.items()},
+            })
+        else:
+            print("基金信息无变化，跳过写入")
+
+        # 元数据最后写入：版本号变化时，基金信息文件已经是新内容
+        metadata["check_time"] = now_str
+        atomic_write(FUND_INFO_METADATA, lambda f: json.dump(metadata, f, ensure_ascii=False, indent=2))
+
+        print(f"刷新完成，数据集版本 {metadata.get('dataset_version', 0)}，耗时 {time.time() - start_time:.2f} 秒")
         return fund_dict
-        
+
     except Exception as e:
         print(f"更新基金信息失败: {e}")
         return None
 
+
 def check_fund_code(fund_code):
     """
     检查基金代码是否在本地缓存中
-    
+
     Args:
         fund_code (str): 基金代码
-        
+
     Returns:
         bool: True表示在缓存中，False表示不在
     """
-    try:
-        # 检查JSON文件是否存在
-        json_path = os.path.join(os.path.dirname(__file__), '..', 'cache', 'fund_info.json')
-        if not os.path.exists(json_path):
-            return False
-        
-        # 读取JSON文件
-        with open(json_path, 'r', encoding='utf-8') as f:
-            fund_dict = json.load(f)
-        
-        return fund_code in fund_dict
-        
-    except Exception as e:
-        print(f"检查基金代码失败: {e}")
-        return False
+    return fund_code in load_fund_store()
+
 
 if __name__ == "__main__":
-    update_fund_info()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="刷新本地基金信息缓存")
+    parser.add_argument('--force', action='store_true', help="即使无变化也重写缓存文件")
+    args = parser.parse_args()
+    update_fund_info(force=args.force)
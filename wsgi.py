@@ -0,0 +1,58 @@
+"""
+基金实时估值 Web 应用 - 生产环境入口
+
+多进程部署（推荐，每个 worker 进程启动后各自预热）:
+    gunicorn -c gunicorn.conf.py "wsgi:create_app()"
+
+单进程多线程部署（未安装 gunicorn 时，例如 Windows）:
+    python wsgi.py
+
+负载均衡健康检查请使用 /readyz，预热完成前返回503，不会接收流量
+"""
+
+import os
+
+try:
+    from waitress import serve
+    HAS_WAITRESS = True
+except ImportError:
+    HAS_WAITRESS = False
+
+
+def create_app(warm_up=True, background=True):
+    """
+    WSGI 应用工厂
+
+    Parameters:
+    -----------
+    warm_up : bool
+        是否执行启动预热，默认True
+    background : bool
+        是否在后台线程预热，默认True（预热期间 /readyz 返回503）
+
+    Returns:
+    --------
+    Flask
+        Flask 应用实例
+    """
+    from app import app
+    from core.warmup import start_warm_up
+
+    if warm_up:
+        start_warm_up(background=background)
+    return app
+
+
+if __name__ == '__main__':
+    host = os.environ.get('FUNDBASE_HOST', '0.0.0.0')
+    port = int(os.environ.get('FUNDBASE_PORT', '5000'))
+    threads = int(os.environ.get('FUNDBASE_THREADS', '16'))
+
+    application = create_app()
+    if HAS_WAITRESS:
+        print(f"使用 waitress 启动服务: http://{host}:{port}（{threads} 线程）")
+        serve(application, host=host, port=port, threads=threads)
+    else:
+        from werkzeug.serving import run_simple
+        print(f"未安装 waitress，使用 werkzeug 多线程模式启动服务: http://{host}:{port}")
+        run_simple(host, port, application, threaded=True)